@@ -6,15 +6,43 @@ Supports three difficulty levels:
 - Expert: LLM-based reasoning
 """
 
-import random
-import copy
-from typing import Tuple, List, Optional, Dict, Any
+import logging
+import os
+import re
+from collections import deque
+
+import board as board_module
+import llm_client
+import metrics
+from board import (BOARD_SIZE, POLARITY_SYMBOLS, apply_turn, find_cluster, get_board, get_dice,
+                   get_polarities, get_state, next_player, roll_dice)
+
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================
+#   TURN HELPERS
+# ==============================================================
+#
+# AI moves go through board.apply_turn, the same path as /submit_turn:
+# it validates the move, spends a dice pip and passes the turn once the
+# dice runs out.
+
+def _move_action(cluster, dr, dc):
+    return {"type": "move", "cluster": cluster, "dr": dr, "dc": dc}
+
+
+def _pass_turn(player):
+    """End the AI's turn unless apply_turn already handed it over."""
+    if get_state()["current_player"] == player:
+        next_player()
 
 
 # ==============================================================
 #   EASY: HEURISTIC-BASED AI
 # ==============================================================
 
+@metrics.timed("ai_decision_seconds", tier="easy")
 def easy_ai_move():
     """
     Simple heuristic-based AI that follows good general rules:
@@ -23,9 +51,6 @@ def easy_ai_move():
     3. Avoid leaving pieces isolated
     4. Prefer moves that increase cluster size
     """
-    from board import (find_cluster, move_cluster_cells, get_dice, BOARD_SIZE, 
-                       get_board, get_polarities, get_state, roll_dice, next_player)
-    import board as board_module
     
     # Get current game state
     board = get_board()
@@ -73,21 +98,19 @@ def easy_ai_move():
                     best_move = (cluster, dr, dc)
         
         if not best_move or best_score <= -1000:
-            print(f"AI: No valid moves found (best score: {best_score})")
+            logger.debug("AI: No valid moves found (best score: %s)", best_score)
             break  # No valid moves
         
         # Execute the best move
         cluster, dr, dc = best_move
-        print(f"AI attempting move: cluster size={len(cluster)}, direction=({dr},{dc})")
-        success, message, new_cluster = move_cluster_cells(cluster, dr, dc, actor_player=player)
+        logger.debug("AI attempting move: cluster size=%d, direction=(%d,%d)", len(cluster), dr, dc)
+        success, message, new_cluster = apply_turn([_move_action(cluster, dr, dc)], actor_player=player)
         
         if not success:
-            print(f"AI move failed: {message}")
+            logger.debug("AI move failed: %s", message)
             break
         
-        # Decrement dice manually (dice_value is module-level in board.py)
-        board_module.dice_value -= 1
-        print(f"AI move successful. Dice remaining: {board_module.dice_value}")
+        logger.debug("AI move successful. Dice remaining: %d", board_module.dice_value)
         
         moves_made += 1
         
@@ -106,13 +129,14 @@ def easy_ai_move():
                         visited.update(tuple(pos) for pos in cluster)
     
     # After all moves, switch to next player
-    print(f"AI completed {moves_made} moves")
-    next_player()
+    logger.debug("AI completed %d moves", moves_made)
+    _pass_turn(player)
     return True
 
 
 def evaluate_move_heuristic(board, polarities, cluster, dr, dc, player):
     """Evaluate a move using simple heuristics"""
+    metrics.inc("ai_nodes_total")
     score = 0
     
     # Check if move is valid
@@ -128,14 +152,13 @@ def evaluate_move_heuristic(board, polarities, cluster, dr, dc, player):
     neutrals_adjacent = 0
     for r, c in cluster:
         nr, nc = r + dr, c + dc
-        pol = polarities[r][c]  # polarities is always a 2D list in board.py
+        pol = polarities[r][c]  # board.py's polarity plane: +1 / -1, 0 when empty
         
         # Check adjacent cells to new position
         for ar, ac in [(nr+1, nc), (nr-1, nc), (nr, nc+1), (nr, nc-1)]:
             if 0 <= ar < len(board) and 0 <= ac < len(board[0]):
                 if board[ar][ac] == 3:  # Neutral
-                    adj_pol = polarities[ar][ac]
-                    if adj_pol in ('+', '-') and adj_pol != pol:
+                    if polarities[ar][ac] * pol < 0:
                         neutrals_adjacent += 1
     
     score += neutrals_adjacent * 10  # Prioritize conversion opportunities
@@ -165,6 +188,7 @@ class MCTSNode:
         self.visits = 0
         self.untried_moves = None
         self.player = game_state.get("current_player")
+        metrics.inc("ai_nodes_total")
     
     def uct_value(self, exploration=1.41):
         if self.visits == 0:
@@ -173,8 +197,6 @@ class MCTSNode:
     
     def get_possible_moves(self):
         """Get all legal moves from current state"""
-        from board import find_cluster, BOARD_SIZE
-        
         moves = []
         visited = set()
         player = self.game_state.get("current_player")
@@ -191,12 +213,11 @@ class MCTSNode:
                             if self._is_valid_move(cluster, dr, dc):
                                 moves.append((cluster, dr, dc))
         
+        metrics.inc("ai_moves_generated_total", len(moves))
         return moves
     
     def _find_cluster_in_state(self, start_r, start_c):
         """Find cluster in this node's state"""
-        from collections import deque
-        
         player = self.board[start_r][start_c]
         if player not in (1, 2):
             return []
@@ -225,13 +246,13 @@ class MCTSNode:
                 neighbor_pol = self.polarities[nr][nc]
                 
                 # Player-owned with alternating polarity
-                if neighbor_owner == player and neighbor_pol in ('+', '-'):
-                    if neighbor_pol != curr_pol:
+                if neighbor_owner == player:
+                    if neighbor_pol * curr_pol < 0:
                         visited.add((nr, nc))
                         queue.append((nr, nc))
                 # Neutral with opposite polarity can join
-                elif neighbor_owner == 3 and neighbor_pol in ('+', '-'):
-                    if neighbor_pol != start_pol:
+                elif neighbor_owner == 3:
+                    if neighbor_pol * start_pol < 0:
                         visited.add((nr, nc))
                         queue.append((nr, nc))
         
@@ -250,8 +271,6 @@ class MCTSNode:
     
     def apply_move(self, cluster, dr, dc):
         """Apply move and return new node"""
-        import copy
-        
         # Create new state
         new_board = [row[:] for row in self.board]
         new_polarities = [row[:] for row in self.polarities]
@@ -267,7 +286,7 @@ class MCTSNode:
         # Clear old positions
         for r, c in moving_positions:
             new_board[r][c] = 0
-            new_polarities[r][c] = ""
+            new_polarities[r][c] = 0
         
         # Place at new positions
         for r, c in moving_positions:
@@ -282,8 +301,8 @@ class MCTSNode:
             pol = new_polarities[nr][nc]
             for ar, ac in [(nr+1, nc), (nr-1, nc), (nr, nc+1), (nr, nc-1)]:
                 if 0 <= ar < len(new_board) and 0 <= ac < len(new_board[0]):
-                    if new_board[ar][ac] == 3 and new_polarities[ar][ac] in ('+', '-'):
-                        if new_polarities[ar][ac] != pol:
+                    if new_board[ar][ac] == 3:
+                        if new_polarities[ar][ac] * pol < 0:
                             new_board[ar][ac] = player
                             break  # Only one conversion per move
         
@@ -309,13 +328,11 @@ class MCTSNode:
             return 0  # Draw
 
 
+@metrics.timed("ai_decision_seconds", tier="normal")
 def normal_ai_move(simulations=100):
     """
     MCTS-based AI that simulates games to find the best move
     """
-    from board import get_board, get_polarities, get_state, get_dice, roll_dice, move_cluster_cells, next_player, BOARD_SIZE
-    import board as board_module
-    import random
     
     # Get current state
     board = get_board()
@@ -331,19 +348,21 @@ def normal_ai_move(simulations=100):
         next_player()
         return False
     
-    print(f"MCTS: Starting with {simulations} simulations")
+    logger.debug("MCTS: Starting with %d simulations", simulations)
     
     # Create root node
     root = MCTSNode(board, polarities, game_state)
     root.untried_moves = root.get_possible_moves()
     
     if not root.untried_moves:
-        print("MCTS: No legal moves available")
+        logger.debug("MCTS: No legal moves available")
         next_player()
         return False
     
-    # Run MCTS simulations
+    # Run MCTS simulations, drawing from the game's "ai" stream
+    rng = board_module.game_rng("ai")
     for i in range(simulations):
+        metrics.inc("ai_rollouts_total")
         node = root
         
         # Selection: traverse tree using UCT
@@ -352,7 +371,7 @@ def normal_ai_move(simulations=100):
         
         # Expansion: add new child node
         if node.untried_moves:
-            move = random.choice(node.untried_moves)
+            move = rng.choice(node.untried_moves)
             node.untried_moves.remove(move)
             cluster, dr, dc = move
             child = node.apply_move(cluster, dr, dc)
@@ -367,7 +386,7 @@ def normal_ai_move(simulations=100):
             possible_moves = sim_node.get_possible_moves()
             if not possible_moves:
                 break
-            move = random.choice(possible_moves)
+            move = rng.choice(possible_moves)
             cluster, dr, dc = move
             sim_node = sim_node.apply_move(cluster, dr, dc)
             depth += 1
@@ -384,12 +403,12 @@ def normal_ai_move(simulations=100):
     
     # Choose best move
     if not root.children:
-        print("MCTS: No children expanded, using first available move")
+        logger.debug("MCTS: No children expanded, using first available move")
         best_move = root.untried_moves[0] if root.untried_moves else None
     else:
         best_child = max(root.children, key=lambda n: n.visits)
         best_move = best_child.move
-        print(f"MCTS: Best move has {best_child.visits} visits, {best_child.wins:.1f} wins")
+        logger.debug("MCTS: Best move has %d visits, %.1f wins", best_child.visits, best_child.wins)
     
     if not best_move:
         next_player()
@@ -400,15 +419,14 @@ def normal_ai_move(simulations=100):
     while board_module.dice_value > 0 and moves_made < 20:
         cluster, dr, dc = best_move
         
-        print(f"MCTS executing move: cluster size={len(cluster)}, direction=({dr},{dc})")
-        success, message, new_cluster = move_cluster_cells(cluster, dr, dc, actor_player=player)
+        logger.debug("MCTS executing move: cluster size=%d, direction=(%d,%d)", len(cluster), dr, dc)
+        success, message, new_cluster = apply_turn([_move_action(cluster, dr, dc)], actor_player=player)
         
         if not success:
-            print(f"MCTS move failed: {message}")
+            logger.debug("MCTS move failed: %s", message)
             break
         
-        board_module.dice_value -= 1
-        print(f"MCTS move successful. Dice remaining: {board_module.dice_value}")
+        logger.debug("MCTS move successful. Dice remaining: %d", board_module.dice_value)
         moves_made += 1
         
         if board_module.dice_value <= 0:
@@ -432,8 +450,8 @@ def normal_ai_move(simulations=100):
                 best_score = score
                 best_move = m
     
-    print(f"MCTS completed {moves_made} moves")
-    next_player()
+    logger.debug("MCTS completed %d moves", moves_made)
+    _pass_turn(player)
     return True
 
 
@@ -463,7 +481,7 @@ def serialize_game_state_for_llm(board, polarities, game_state, player):
             val = board[r][c]
             pol = polarities[r][c]
             row_pieces.append(str(val) if val != 0 else ".")
-            row_pols.append(pol if pol else " ")
+            row_pols.append(POLARITY_SYMBOLS[pol] or " ")
         lines.append(f"{r:2d} {' '.join(row_pieces)}")
         lines.append(f"   {' '.join(row_pols)}")
     
@@ -475,8 +493,6 @@ def serialize_game_state_for_llm(board, polarities, game_state, player):
     lines.append(f"\nPiece Counts: Player1={p1_count}, Player2(You)={p2_count}, Neutral={neutral_count}")
     
     # Find clusters
-    from board import find_cluster, BOARD_SIZE
-    
     lines.append(f"\nYour Clusters (Player {player}):")
     visited = set()
     cluster_num = 1
@@ -485,7 +501,6 @@ def serialize_game_state_for_llm(board, polarities, game_state, player):
             if board[r][c] == player and (r, c) not in visited:
                 cluster = []
                 # Simple BFS for cluster
-                from collections import deque
                 queue = deque([(r, c)])
                 temp_visited = set()
                 temp_visited.add((r, c))
@@ -510,14 +525,10 @@ def serialize_game_state_for_llm(board, polarities, game_state, player):
 
 def parse_llm_response(response_text, board, player):
     """Extract move commands from LLM response"""
-    from board import find_cluster, BOARD_SIZE
-    
     # Look for move patterns in response
     # Expected format: "MOVE cluster_at(row,col) direction(dr,dc)"
     # Or: "MOVE (r,c) UP/DOWN/LEFT/RIGHT"
     
-    import re
-    
     # Try to find coordinate patterns
     coord_pattern = r'\((\d+)\s*,\s*(\d+)\)'
     direction_pattern = r'(UP|DOWN|LEFT|RIGHT|up|down|left|right)'
@@ -580,71 +591,24 @@ def parse_llm_response(response_text, board, player):
     return (cluster, dr, dc)
 
 
+class PositionChanged(Exception):
+    """The game changed while expert_ai_move waited for the LLM without the lock."""
+
+
 def call_llm_api(prompt, api_key=None, model="gpt-4", provider="openai"):
-    """Call LLM API with the game state prompt"""
-    import os
-    import json
-    
-    # Get API key from environment if not provided
-    if not api_key:
-        if provider == "openai":
-            api_key = os.environ.get("OPENAI_API_KEY")
-        elif provider == "anthropic":
-            api_key = os.environ.get("ANTHROPIC_API_KEY")
-    
-    if not api_key:
-        print(f"LLM: No API key found for {provider}. Set OPENAI_API_KEY or ANTHROPIC_API_KEY environment variable.")
-        return None
-    
-    try:
-        if provider == "openai":
-            import openai
-            client = openai.OpenAI(api_key=api_key)
-            
-            response = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": "You are an expert FluxWars player. Analyze the board and suggest the best move. Use format: MOVE (row,col) DIRECTION where DIRECTION is UP/DOWN/LEFT/RIGHT."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content
-            
-        elif provider == "anthropic":
-            import anthropic
-            client = anthropic.Anthropic(api_key=api_key)
-            
-            response = client.messages.create(
-                model=model if "claude" in model else "claude-3-sonnet-20240229",
-                max_tokens=500,
-                messages=[
-                    {"role": "user", "content": f"You are an expert FluxWars player. {prompt}\n\nSuggest your move using format: MOVE (row,col) DIRECTION where DIRECTION is UP/DOWN/LEFT/RIGHT."}
-                ]
-            )
-            
-            return response.content[0].text
-            
-    except ImportError as e:
-        print(f"LLM: Missing library for {provider}. Install with: pip install {provider}")
-        return None
-    except Exception as e:
-        print(f"LLM: API call failed: {e}")
-        return None
+    """Call LLM API with the game state prompt (pooled, cached and time-limited; see llm_client.py)"""
+    return llm_client.complete(prompt, provider=provider, model=model, api_key=api_key)
 
 
+@metrics.timed("ai_decision_seconds", tier="expert")
 def expert_ai_move():
     """
     LLM-based AI that uses language model reasoning
-    Requires API key and model configuration (OPENAI_API_KEY or ANTHROPIC_API_KEY)
+    Requires API key and model configuration (OPENAI_API_KEY or ANTHROPIC_API_KEY),
+    or LLM_PROVIDER=local for the offline stand-in
     Falls back to MCTS if LLM unavailable
+    Raises PositionChanged if the game moved on while the LLM was thinking
     """
-    from board import (get_board, get_polarities, get_state, get_dice, roll_dice, 
-                       move_cluster_cells, next_player, BOARD_SIZE)
-    import board as board_module
-    import os
     
     # Get current state
     board = get_board()
@@ -660,7 +624,7 @@ def expert_ai_move():
         next_player()
         return False
     
-    print("LLM: Analyzing game state...")
+    logger.debug("LLM: Analyzing game state...")
     
     # Serialize game state for LLM
     prompt = serialize_game_state_for_llm(board, polarities, game_state, player)
@@ -672,35 +636,41 @@ def expert_ai_move():
     prompt += "\n- Protect your pieces from being stolen by opponent"
     prompt += f"\n\nYou have {get_dice()} moves remaining. Suggest your best move."
     
-    # Try to get LLM response
-    llm_response = call_llm_api(
-        prompt,
-        model=os.environ.get("LLM_MODEL", "gpt-4"),
-        provider=os.environ.get("LLM_PROVIDER", "openai")
-    )
+    # Try to get LLM response. The game lock is let go while the provider
+    # thinks, so other requests aren't stalled; if the game moved on
+    # meanwhile, the reply is for a stale position.
+    version = board_module.get_state_version()
+    with board_module.released():
+        llm_response = call_llm_api(
+            prompt,
+            model=os.environ.get("LLM_MODEL", "gpt-4"),
+            provider=os.environ.get("LLM_PROVIDER", "openai")
+        )
+    if board_module.get_state_version() != version:
+        logger.info("LLM: Game changed while waiting for the reply; dropping it")
+        raise PositionChanged()
     
     if llm_response:
-        print(f"LLM: Response received: {llm_response[:100]}...")
+        logger.debug("LLM: Response received: %s...", llm_response[:100])
         
         # Parse the response
         move = parse_llm_response(llm_response, board, player)
         
         if move:
             cluster, dr, dc = move
-            print(f"LLM: Parsed move - cluster size={len(cluster)}, direction=({dr},{dc})")
+            logger.debug("LLM: Parsed move - cluster size=%d, direction=(%d,%d)", len(cluster), dr, dc)
             
             # Execute moves until dice runs out
             moves_made = 0
             while board_module.dice_value > 0 and moves_made < 20:
-                print(f"LLM executing move: cluster size={len(cluster)}, direction=({dr},{dc})")
-                success, message, new_cluster = move_cluster_cells(cluster, dr, dc, actor_player=player)
+                logger.debug("LLM executing move: cluster size=%d, direction=(%d,%d)", len(cluster), dr, dc)
+                success, message, new_cluster = apply_turn([_move_action(cluster, dr, dc)], actor_player=player)
                 
                 if not success:
-                    print(f"LLM move failed: {message}")
+                    logger.debug("LLM move failed: %s", message)
                     break
                 
-                board_module.dice_value -= 1
-                print(f"LLM move successful. Dice remaining: {board_module.dice_value}")
+                logger.debug("LLM move successful. Dice remaining: %d", board_module.dice_value)
                 moves_made += 1
                 
                 if board_module.dice_value <= 0:
@@ -709,7 +679,6 @@ def expert_ai_move():
                 # For subsequent moves, use heuristics
                 board = get_board()
                 polarities = get_polarities()
-                from board import find_cluster
                 
                 # Find new clusters and pick best heuristic move
                 visited = set()
@@ -733,16 +702,16 @@ def expert_ai_move():
                 
                 cluster, dr, dc = best_move
             
-            print(f"LLM completed {moves_made} moves")
-            next_player()
+            logger.debug("LLM completed %d moves", moves_made)
+            _pass_turn(player)
             return True
         else:
-            print("LLM: Failed to parse valid move from response")
+            logger.info("LLM: Failed to parse valid move from response")
     else:
-        print("LLM: API call failed")
+        logger.info("LLM: API call failed")
     
     # Fallback to MCTS if LLM fails
-    print("LLM: Falling back to MCTS")
+    logger.info("LLM: Falling back to MCTS")
     return normal_ai_move(simulations=100)
 
 
@@ -1,38 +1,319 @@
-from flask import Flask, render_template, request, jsonify
-from dotenv import load_dotenv
+import time
+
+# Startup is timed from here (interpreter start-up itself is not included)
+_IMPORT_START = time.perf_counter()
+
+import functools
+import logging
+import os
+import traceback
+
+from flask import Flask, render_template, request, jsonify, g, Response
 from board import (
     get_board,
     get_state,
     get_state_serializable,
     toggle_piece,
-    get_polarities,
+    polarity_strings,
+    POLARITY_SYMBOLS,
     reset_board,
     roll_dice,
-    find_cluster,
-    get_cluster,
-    can_move_cluster,
     rotate_cluster_cells,
     get_dice,
+    get_game_seed,
+    get_delta,
+    get_state_version,
+    legal_moves,
+    add_change_listener,
+    game_lock,
+    next_player,
+    get_stealable_neutrals_for_player,
+    select_cluster,
+    preview_moves,
+    move_cluster_cells,
+    apply_turn,
+    register_selection,
+    resolve_selection,
+    SELECTION_EXPIRED,
+    BOARD_SIZE,
+    SEED_LIMIT,
+    get_steal_placements,
+    steal_and_place_magnet,
 )
 
-# Load environment variables from .env file
-load_dotenv()
+import encoding
+import events
+import metrics
+
+# Load environment variables from the .env file next to this one. python-dotenv
+# is only imported when there is such a file to read.
+ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+if os.path.exists(ENV_FILE):
+    from dotenv import load_dotenv
+
+    load_dotenv(ENV_FILE)
+
+logging.basicConfig(
+    level=os.environ.get("FLUXWARS_LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
 
+# --- JSON encoding ---
+# orjson is optional: when installed it replaces Flask's stdlib encoder for
+# every jsonify() response. Set FLUXWARS_JSON=std to force the stdlib path.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+if orjson is not None and os.environ.get("FLUXWARS_JSON", "fast") != "std":
+    from flask.json.provider import DefaultJSONProvider
+
+    class OrjsonProvider(DefaultJSONProvider):
+        # game_state dicts use int player keys, which orjson rejects by default
+        options = orjson.OPT_NON_STR_KEYS
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, default=self.default, option=self.options).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(
+                orjson.dumps(obj, default=self.default, option=self.options),
+                mimetype=self.mimetype,
+            )
+
+    app.json = OrjsonProvider(app)
+
+# Per-request cProfile capture is opt-in: start the server with
+# FLUXWARS_PROFILE=1, then add ?profile=1 (or an X-Profile: 1 header) to a
+# request. Stats are dumped to FLUXWARS_PROFILE_DIR and summarized in the log.
+PROFILE_ENABLED = os.environ.get("FLUXWARS_PROFILE", "") == "1"
+PROFILE_DIR = os.environ.get("FLUXWARS_PROFILE_DIR", "profiles")
+
+
+# --- Persistence ---
+# With a data directory the game survives restarts: every committed change
+# goes to a write-ahead log (see store.py). `python app.py` persists to
+# ./data by default; imported apps (tests, benchmarks) only when
+# FLUXWARS_DATA_DIR is set.
+store = None
+
+
+def enable_persistence(directory):
+    global store
+    from store import GameStore
+
+    if store is None:
+        store = GameStore(directory)
+        store.recover()
+        store.attach()
+    return store
+
+
+if os.environ.get("FLUXWARS_DATA_DIR"):
+    enable_persistence(os.environ["FLUXWARS_DATA_DIR"])
+
+
+# --- Instrumentation ---
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+    if PROFILE_ENABLED and (request.args.get("profile") == "1" or request.headers.get("X-Profile") == "1"):
+        import cProfile
+
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+@app.after_request
+def _record_request_metrics(response):
+    endpoint = request.endpoint or "unknown"
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        response.headers["X-Profile-File"] = _dump_profile(profiler, endpoint)
+    start = g.pop("request_start", None)
+    if start is not None:
+        metrics.observe("http_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+    metrics.inc("http_requests_total", endpoint=endpoint, status=response.status_code)
+    return response
+
+
+def _dump_profile(profiler, endpoint):
+    import io
+    import pstats
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{endpoint}-{time.strftime('%Y%m%d-%H%M%S')}-{time.perf_counter_ns()}.prof")
+    profiler.dump_stats(path)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(20)
+    logger.info("Profile for %s written to %s\n%s", endpoint, path, out.getvalue())
+    return path
+
+
+@app.route("/metrics")
+def metrics_route():
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+# --- Concurrency ---
+def exclusive(view):
+    """
+    Run a route under board.game_lock, so its engine calls and the response
+    built from them see one consistent game on threaded servers.
+
+    A body with "expected_version" is a precondition: if the game has
+    moved past that version the request is refused with 409 and a full
+    snapshot, so a double-submitted action (a double-clicked End Turn)
+    cannot apply twice.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not game_lock.acquire(blocking=False):
+            start = time.perf_counter()
+            game_lock.acquire()
+            metrics.observe("game_lock_wait_seconds", time.perf_counter() - start, endpoint=request.endpoint)
+        try:
+            data = request.get_json(silent=True)
+            if data is not None and not isinstance(data, dict):
+                return jsonify({"success": False, "message": "Request body must be a JSON object."}), 400
+            expected = (data or {}).get("expected_version")
+            if expected is not None and expected != get_state_version():
+                return stale_response()
+            return view(*args, **kwargs)
+        finally:
+            game_lock.release()
+    return wrapper
+
+
+def stale_response():
+    """409 with a full snapshot, for a request overtaken by another change."""
+    metrics.inc("stale_requests_total", endpoint=request.endpoint)
+    return jsonify({
+        "success": False,
+        "stale": True,
+        "message": "The game changed in the meantime; please try again.",
+        "version": get_state_version(),
+        "board": get_board(),
+        "polarities": polarity_strings(),
+        "state": get_state_serializable(),
+        "dice": get_dice(),
+    }), 409
+
+
+# --- Board deltas ---
+def json_changes(changes):
+    """Changed cells from board.get_delta / listeners, with polarity as '+', '-' or ''."""
+    symbols = POLARITY_SYMBOLS
+    return [[r, c, owner, symbols[pol], mid] for r, c, owner, pol, mid in changes]
+
+
+def board_update():
+    """
+    Board fields for a mutating route's response. When the request carries
+    the client's last known `version` and it is still in the server's
+    history, only the changed cells are sent; otherwise a full snapshot.
+    """
+    data = request.get_json(silent=True) or {}
+    since = data.get("version", request.args.get("version"))
+    try:
+        delta = get_delta(int(since)) if since is not None else None
+    except (TypeError, ValueError):
+        delta = None
+    if delta is None:
+        return {"version": get_state_version(), "board": get_board(), "polarities": polarity_strings()}
+    return {"version": delta["version"], "delta": {**delta, "changes": json_changes(delta["changes"])}}
+
+
+@app.route("/sync")
+@exclusive
+def sync_route():
+    """
+    Full snapshot for clients that lost track of the board.
+    ?format=binary returns the compact encoding from encoding.py instead,
+    with the version in the X-State-Version header.
+    """
+    if request.args.get("format") == "binary":
+        resp = Response(encoding.encode_live(), mimetype="application/octet-stream")
+        resp.headers["X-State-Version"] = str(get_state_version())
+        return resp
+    return jsonify({
+        "version": get_state_version(),
+        "board": get_board(),
+        "polarities": polarity_strings(),
+        "state": get_state_serializable(),
+        "dice": get_dice(),
+    })
+
+
+# --- Push channel ---
+def _publish_change(version, kind, changes, effects):
+    """Board listener: stream every committed change to /events subscribers."""
+    if not events.subscriber_count():
+        return
+    events.publish("board", {
+        "version": version,
+        "since": version - 1,
+        "kind": kind,
+        "changes": json_changes(changes),
+        "converted": effects["converted"],
+        "pulls": effects["pulls"],
+        "state": get_state_serializable(),
+        "dice": get_dice(),
+    }, event_id=version)
+
+
+add_change_listener(_publish_change)
+
+
+@app.route("/events")
+def events_route():
+    """
+    Server-sent event stream for the game: a "sync" snapshot first, then
+    "board" (committed changes, including turn changes), "ai" (AI turn
+    progress) and "resync" events.
+    """
+    with game_lock:
+        # subscribe and snapshot together, so no change falls between them
+        q = events.subscribe()
+        hello = events.format_event("sync", {
+            "version": get_state_version(),
+            "board": get_board(),
+            "polarities": polarity_strings(),
+            "state": get_state_serializable(),
+            "dice": get_dice(),
+        }, event_id=get_state_version())
+    return Response(
+        events.stream(q, hello),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route("/")
+@exclusive
 def index():
     return render_template(
         "index.html",
         board=get_board(),
-        polarities=get_polarities(),
+        polarities=polarity_strings(),
         state=get_state_serializable(),
     )
 
 
 # --- Placement Phase ---
 @app.route("/toggle", methods=["POST"])
+@exclusive
 def toggle():
     try:
         data = request.get_json()
@@ -48,15 +329,13 @@ def toggle():
         
         if vs_ai and current_player == ai_player and phase == "home_setup":
             # AI should place automatically during home setup
-            from board import PIECES, BOARD_SIZE
             # Place AI piece at bottom right
             ai_row, ai_col, ai_orient = 9, 10, 0
             success, message = toggle_piece(ai_row, ai_col, ai_orient)
             return jsonify({
                 "success": success,
                 "message": f"AI placed home piece automatically",
-                "board": get_board(),
-                "polarities": get_polarities(),
+                **board_update(),
                 "state": get_state_serializable(),
                 "ai_placed": True
             })
@@ -67,8 +346,7 @@ def toggle():
         result = {
             "success": success,
             "message": message,
-            "board": get_board(),
-            "polarities": get_polarities(),
+            **board_update(),
             "state": get_state_serializable(),
         }
         
@@ -80,8 +358,6 @@ def toggle():
         
         return jsonify(result)
     except Exception as e:
-        import traceback
-
         tb = traceback.format_exc()
         # return error to client for easier debugging
         return (
@@ -97,25 +373,36 @@ def toggle():
 
 
 @app.route("/reset", methods=["POST"])
+@exclusive
 def reset():
-    reset_board()
+    # An explicit seed replays a logged game's dice and neutral layout
+    seed = (request.get_json(silent=True) or {}).get("seed")
+    if isinstance(seed, str) and seed.isdigit():
+        seed = int(seed)
+    if seed is not None and (type(seed) is not int or not 0 <= seed < SEED_LIMIT):
+        return jsonify({"success": False, "message": f"Seed must be an integer from 0 to {SEED_LIMIT - 1}."}), 400
+    reset_board(seed)
+    logger.info("New game, seed %d", get_game_seed())
     return jsonify(
         {
             "success": True,
             "message": "Board reset.",
-            "board": get_board(),
-            "polarities": get_polarities(),
+            "seed": get_game_seed(),
+            **board_update(),
             "state": get_state_serializable(),
         }
     )
 
 
 @app.route("/update_settings", methods=["POST"])
+@exclusive
 def update_settings():
     try:
         data = request.get_json() or {}
         vs_ai = data.get("vs_ai", False)
         difficulty = data.get("difficulty", "normal")
+        if difficulty not in encoding.DIFFICULTIES:
+            return jsonify({"success": False, "message": f"Unknown difficulty: {difficulty!r}"}), 400
         
         state = get_state()
         state["vs_ai"] = vs_ai
@@ -128,7 +415,6 @@ def update_settings():
             "state": get_state_serializable()
         })
     except Exception as e:
-        import traceback
         return jsonify({
             "success": False,
             "message": f"Error updating settings: {str(e)}",
@@ -136,11 +422,11 @@ def update_settings():
         }), 500
 
 @app.route("/ai_move", methods=["POST"])
+@exclusive
 def ai_move_route():
     """Execute an AI move based on current game state."""
     try:
-        from board import get_state, get_board, get_polarities, get_dice
-        from ai_player import get_ai_move
+        from ai_player import PositionChanged, get_ai_move
         
         state = get_state()
         
@@ -153,17 +439,25 @@ def ai_move_route():
         
         # Get AI move based on difficulty
         difficulty = state.get("ai_difficulty", "normal")
-        print(f"AI attempting move with difficulty: {difficulty}")
+        logger.debug("AI attempting move with difficulty: %s", difficulty)
         
         ai_move_func = get_ai_move(difficulty)
-        print(f"AI move function: {ai_move_func.__name__}")
+        logger.debug("AI move function: %s", ai_move_func.__name__)
         
-        # Execute the AI move
-        move_result = ai_move_func()
-        print(f"AI move result: {move_result}")
+        # Execute the AI move; each move it makes is pushed as a "board" event
+        ai = state["current_player"]
+        events.publish("ai", {"status": "thinking", "player": ai, "difficulty": difficulty})
+        try:
+            move_result = ai_move_func()
+        except PositionChanged:
+            # the expert AI lets go of the game while its LLM thinks
+            events.publish("ai", {"status": "failed", "player": ai})
+            return stale_response()
+        events.publish("ai", {"status": "done" if move_result else "failed", "player": ai})
+        logger.debug("AI move result: %s", move_result)
         
         if not move_result:
-            print("AI move returned False/None")
+            logger.info("AI move returned False/None")
             return jsonify({
                 "success": False,
                 "message": "AI could not find a valid move"
@@ -172,15 +466,12 @@ def ai_move_route():
         return jsonify({
             "success": True,
             "message": f"AI ({difficulty}) made a move",
-            "board": get_board(),
-            "polarities": get_polarities(),
+            **board_update(),
             "state": get_state_serializable(),
             "dice": get_dice()
         })
     except Exception as e:
-        import traceback
-        print(f"AI move exception: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("AI move exception: %s", e)
         return jsonify({
             "success": False,
             "message": f"AI move error: {str(e)}",
@@ -190,59 +481,46 @@ def ai_move_route():
 
 # --- Movement Phase ---
 @app.route("/roll_dice", methods=["POST"])
+@exclusive
 def roll_dice_route():
     # roll the dice; do NOT switch player here — player keeps the turn until moves exhausted
     try:
-        from board import roll_dice, get_board, get_polarities, get_state, next_player
-        from board import get_state, get_stealable_neutrals_for_player
-
-        value = roll_dice()
+        # a 6 marks the roller as the allowed stealer, in the roll's own commit
+        value = roll_dice(grant_steal=True)
         state = get_state()
         steal_targets = None
         if value == 6:
             cp = state["current_player"]
-            # mark allowed stealer on server state
-            state["steal_allowed_player"] = cp
             steal_targets = get_stealable_neutrals_for_player(cp)
             
-            # DEBUG: Log steal target detection details
-            print(f"\n=== STEAL TARGET DEBUG ===")
-            print(f"Current player: {cp}")
-            print(f"Phase: {state['phase']}")
-            print(f"Steal targets found: {steal_targets}")
-            print(f"Number of targets: {len(steal_targets) if steal_targets else 0}")
-            
-            # Log opponent positions
-            opponent = 2 if cp == 1 else 1
-            board_state = get_board()
-            pols = get_polarities()
-            opponent_pieces = []
-            for r in range(len(board_state)):
-                for c in range(len(board_state[0])):
-                    if board_state[r][c] == opponent:
-                        opponent_pieces.append((r, c, pols[r][c]))
-            print(f"Opponent (player {opponent}) pieces: {opponent_pieces[:10]}")  # limit output
-            
-            # Log player pieces
-            player_pieces = []
-            for r in range(len(board_state)):
-                for c in range(len(board_state[0])):
-                    if board_state[r][c] == cp:
-                        player_pieces.append((r, c, pols[r][c]))
-            print(f"Player {cp} pieces: {player_pieces[:10]}")  # limit output
-            print(f"=========================\n")
+            # DEBUG: Log steal target detection details (skipped entirely unless DEBUG is on)
+            if logger.isEnabledFor(logging.DEBUG):
+                opponent = 2 if cp == 1 else 1
+                board_state = get_board()
+                pols = polarity_strings()
+                opponent_pieces = []
+                player_pieces = []
+                for r in range(len(board_state)):
+                    for c in range(len(board_state[0])):
+                        if board_state[r][c] == opponent:
+                            opponent_pieces.append((r, c, pols[r][c]))
+                        elif board_state[r][c] == cp:
+                            player_pieces.append((r, c, pols[r][c]))
+                logger.debug(
+                    "Steal targets for player %s (phase %s): %d found %s; "
+                    "opponent (player %s) pieces: %s; player pieces: %s",
+                    cp, state["phase"], len(steal_targets or []), steal_targets,
+                    opponent, opponent_pieces[:10], player_pieces[:10],
+                )
 
         return jsonify({
             "success": True,
             "dice": value,
-            "board": get_board(),
-            "polarities": get_polarities(),
+            **board_update(),
             "state": get_state_serializable(),
             "steal_targets": [list(x) for x in (steal_targets or [])],
         })
     except Exception as e:
-        import traceback
-
         tb = traceback.format_exc()
         return (
             jsonify(
@@ -256,27 +534,62 @@ def roll_dice_route():
         )
 
 
+def json_legal_moves(cluster):
+    """board.legal_moves for the current player, JSON-ready (None without a cluster)."""
+    if not cluster:
+        return None
+    legal = legal_moves(cluster)
+    return {"directions": [list(d) for d in legal["directions"]], "rotate": legal["rotate"]}
+
+
 @app.route("/select_cluster", methods=["POST"])
+@exclusive
 def select_cluster_route():
     data = request.get_json()
     row, col = data["row"], data["col"]
-    # Allow selecting neutral clusters (owner == 3) as well as player clusters
-    board = get_board()
-    owner = None
-    try:
-        owner = board[row][col]
-    except Exception:
-        owner = None
-
-    if owner == 3:
-        cluster = get_cluster(row, col)
+    # Allow selecting neutral clusters (owner == 3) as well as player clusters.
+    # The handle lets /submit_turn reuse the resolved cluster until the state changes.
+    handle, cluster = select_cluster(row, col)
+    return jsonify({"cluster": cluster, "selection": handle, "legal": json_legal_moves(cluster)})
+
+
+@app.route("/preview_moves", methods=["POST"])
+@exclusive
+def preview_moves_route():
+    """
+    What each legal move and the rotation of a cluster would do, for hover
+    previews. Read-only. Takes the "selection" handle from /select_cluster,
+    or a "cluster" of [row, col] cells.
+    """
+    data = request.get_json(silent=True) or {}
+    if data.get("selection") is not None:
+        resolved = resolve_selection(data["selection"], get_state()["current_player"])
+        if resolved is None:
+            return jsonify({"success": False, "stale_selection": True, "message": SELECTION_EXPIRED}), 400
+        cluster = resolved[0]
     else:
-        cluster = find_cluster(row, col)
-
-    return jsonify({"cluster": cluster})
+        cluster = cluster_cells(data.get("cluster"))
+        if cluster is None:
+            return jsonify({"success": False, "message": "No valid cluster selected."}), 400
+    preview = preview_moves(cluster)
+    return jsonify({"success": True, "version": get_state_version(), **preview})
+
+
+def cluster_cells(raw):
+    """A client-supplied cluster as distinct in-bounds (row, col) tuples, or None if malformed."""
+    if not isinstance(raw, list) or not raw:
+        return None
+    cells = []
+    for cell in raw:
+        if (not isinstance(cell, list) or len(cell) != 2
+                or not all(type(x) is int and 0 <= x < BOARD_SIZE for x in cell)):
+            return None
+        cells.append(tuple(cell))
+    return cells if len(set(cells)) == len(cells) else None
 
 
 @app.route("/move_cluster", methods=["POST"])
+@exclusive
 def move_cluster_route():
     try:
         data = request.get_json()
@@ -285,7 +598,6 @@ def move_cluster_route():
         dc = data["dc"]
         # Do NOT switch player on roll; player keeps the turn until they exhaust moves.
         remaining_moves = data.get("remaining_moves", None)
-        from board import move_cluster_cells, get_board, get_polarities, get_state, next_player
 
         # actor is the player who is making this move (before any next_player call)
         state_before = get_state()
@@ -304,15 +616,12 @@ def move_cluster_route():
             {
                 "success": success,
                 "message": message,
-                "board": get_board(),
-                "polarities": get_polarities(),
+                **board_update(),
                     "state": get_state_serializable(),
                     "new_cluster": [[int(r), int(c)] for (r, c) in new_cluster] if new_cluster else None,
             }
         )
     except Exception as e:
-        import traceback
-
         tb = traceback.format_exc()
         return (
             jsonify(
@@ -327,12 +636,12 @@ def move_cluster_route():
 
 
 @app.route("/rotate_cluster", methods=["POST"])
+@exclusive
 def rotate_cluster_route():
     try:
         data = request.get_json()
         cluster = data["cluster"]
         remaining_moves = data.get("remaining_moves", None)
-        from board import rotate_cluster_cells, get_board, get_polarities, get_state, next_player
 
         state_before = get_state()
         actor = state_before["current_player"]
@@ -348,15 +657,12 @@ def rotate_cluster_route():
             {
                 "success": success,
                 "message": message,
-                "board": get_board(),
-                "polarities": get_polarities(),
+                **board_update(),
                 "state": get_state_serializable(),
                 "new_cluster": [[int(r), int(c)] for (r, c) in new_cluster] if new_cluster else None,
             }
         )
     except Exception as e:
-        import traceback
-
         tb = traceback.format_exc()
         return (
             jsonify(
@@ -370,27 +676,89 @@ def rotate_cluster_route():
         )
 
 
+@app.route("/submit_turn", methods=["POST"])
+@exclusive
+def submit_turn_route():
+    """
+    Apply a batch of moves/rotations for the current player in one request.
+
+    Body: {"actions": [{"type": "move", "cluster": [[r, c], ...], "dr": 0, "dc": 1},
+                       {"type": "rotate"}, ...],
+           "end_turn": false, "version": 12}
+    The first action may carry {"selection": handle} from /select_cluster
+    instead of "cluster". Actions after the first may omit both to keep
+    moving the cluster the previous action produced. All actions apply or
+    none do. The response carries a handle for the resulting cluster.
+    """
+    try:
+        data = request.get_json() or {}
+        actions = turn_actions(data.get("actions") or [])
+        if actions is None:
+            return jsonify({"success": False, "message": "Malformed actions."}), 400
+
+        actor = get_state()["current_player"]
+        success, message, new_cluster = apply_turn(actions, actor_player=actor, end_turn=bool(data.get("end_turn")))
+
+        return jsonify({
+            "success": success,
+            "message": message,
+            **board_update(),
+            "state": get_state_serializable(),
+            "dice": get_dice(),
+            "new_cluster": [[int(r), int(c)] for (r, c) in new_cluster] if new_cluster else None,
+            "selection": register_selection(new_cluster) if new_cluster else None,
+            "legal": json_legal_moves(new_cluster),
+            "stale_selection": not success and message.endswith(SELECTION_EXPIRED),
+        }), (200 if success else 400)
+    except Exception as e:
+        tb = traceback.format_exc()
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"Server error during submit_turn: {str(e)}",
+                    "traceback": tb,
+                }
+            ),
+            500,
+        )
+
+
+def turn_actions(raw):
+    """Client-supplied /submit_turn actions with their clusters checked (see cluster_cells), or None if malformed."""
+    if not isinstance(raw, list):
+        return None
+    actions = []
+    for action in raw:
+        if not isinstance(action, dict):
+            return None
+        if action.get("cluster") is not None:
+            cells = cluster_cells(action["cluster"])
+            if cells is None:
+                return None
+            action = {**action, "cluster": cells}
+        actions.append(action)
+    return actions
+
+
 @app.route("/get_dice", methods=["GET"])
+@exclusive
 def get_dice_route():
     return jsonify({"dice": get_dice()})
 
 
 @app.route("/end_turn", methods=["POST"])
+@exclusive
 def end_turn_route():
     try:
-        from board import next_player, get_board, get_polarities, get_state_serializable
-
         next_player()
         return jsonify({
             "success": True,
             "message": "Turn ended by player.",
-            "board": get_board(),
-            "polarities": get_polarities(),
+            **board_update(),
             "state": get_state_serializable(),
         })
     except Exception as e:
-        import traceback
-
         tb = traceback.format_exc()
         return (
             jsonify(
@@ -404,22 +772,35 @@ def end_turn_route():
         )
 
 
+def board_cell(data, name):
+    """(row, col) from data["<name>_row"] and data["<name>_col"], or None unless both are in bounds (see cluster_cells)."""
+    cells = cluster_cells([[data.get(f"{name}_row"), data.get(f"{name}_col")]])
+    return cells[0] if cells else None
+
+
+@app.route("/steal_placements", methods=["POST"])
+@exclusive
+def steal_placements_route():
+    """Where the current player could put the magnet at (source_row, source_col) if they stole it."""
+    data = request.get_json() or {}
+    source = board_cell(data, "source")
+    if source is None:
+        return jsonify({"success": False, "message": "Missing or invalid source coordinates."}), 400
+    placements = get_steal_placements(get_state()["current_player"], source)
+    return jsonify({
+        "success": True,
+        "placements": [
+            {"target": list(target), "partner_target": list(partner), "orientation": orientation}
+            for target, partner, orientation in placements
+        ],
+    })
+
+
 @app.route("/steal", methods=["POST"])
+@exclusive
 def steal_route():
     try:
         data = request.get_json() or {}
-        source_row = data.get("source_row")
-        source_col = data.get("source_col")
-        target_row = data.get("target_row")
-        target_col = data.get("target_col")
-
-        from board import (
-            get_state,
-            steal_and_place_magnet,
-            get_board,
-            get_polarities,
-            get_state_serializable,
-        )
 
         state = get_state()
         actor = state["current_player"]
@@ -428,29 +809,28 @@ def steal_route():
         if state.get("steal_allowed_player") != actor:
             return jsonify({"success": False, "message": "Steal not allowed right now."}), 400
 
-        if source_row is None or source_col is None or target_row is None or target_col is None:
-            return jsonify({"success": False, "message": "Missing source or target coordinates."}), 400
-
-        source = (int(source_row), int(source_col))
-        target = (int(target_row), int(target_col))
-
-        success, message, moved_cells = steal_and_place_magnet(actor, source, target)
+        source = board_cell(data, "source")
+        target = board_cell(data, "target")
+        if source is None or target is None:
+            return jsonify({"success": False, "message": "Missing or invalid source or target coordinates."}), 400
+        partner_target = None
+        if data.get("partner_row") is not None or data.get("partner_col") is not None:
+            partner_target = board_cell(data, "partner")
+            if partner_target is None:
+                return jsonify({"success": False, "message": "Invalid partner coordinates."}), 400
+
+        success, message, moved_cells = steal_and_place_magnet(actor, source, target, partner_target)
         if success:
-            # clear steal permission after use
-            state["steal_allowed_player"] = None
             return jsonify({
                 "success": True,
                 "message": message,
                 "moved_cells": [list(x) for x in moved_cells],
-                "board": get_board(),
-                "polarities": get_polarities(),
+                **board_update(),
                 "state": get_state_serializable(),
             })
         else:
             return jsonify({"success": False, "message": message}), 400
     except Exception as e:
-        import traceback
-
         tb = traceback.format_exc()
         return (
             jsonify(
@@ -464,5 +844,15 @@ def steal_route():
         )
 
 
+# --- Startup time ---
+STARTUP_SECONDS = time.perf_counter() - _IMPORT_START
+metrics.set_gauge("startup_seconds", STARTUP_SECONDS)
+logger.info("App ready in %.0f ms", STARTUP_SECONDS * 1000)
+
+
 if __name__ == "__main__":
+    # The debug reloader re-runs this file in a child process that does the
+    # serving; only that process should own the store.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        enable_persistence(os.environ.get("FLUXWARS_DATA_DIR", "data"))
     app.run(debug=True)
@@ -0,0 +1,382 @@
+"""
+Game record archive for FluxWars
+
+Finished games are stored as fixed-size records in an append-only data
+file, with a fixed-size index next to it, so millions of games can be
+scanned or randomly accessed through mmap without reading the archive
+into memory. Positions use the compact encoding from encoding.py; moves
+are the actions behind each board commit (board.last_action), so any
+position in a game can be rebuilt by replaying them through board.py.
+
+Data file (<path>):
+    header   b"FWAR", u16 format, u16 position slot, u16 move size, 6 pad
+    per game initial position slot, move records..., final position slot
+
+    position slot   POSITION_SLOT bytes: u16 length + encoded position
+    move record     MOVE_SIZE bytes: u8 op, u8 actor, i8 a, i8 b,
+                    u8 flags, u8 cell count, 26 cell indices (r * 15 + c);
+                    clusters longer than that continue in OP_MORE records
+
+Index file (<path>.idx), one ENTRY_SIZE entry per game:
+    12s label, u64 offset of the game, u32 move records, u32 seed,
+    u8 winner (0 none, 1, 2, 3 draw), u8 clusters acquired by 1 and 2, pad
+
+A game counts once its index entry is written, so a crash mid-append
+leaves at most an unreferenced tail in the data file.
+
+    rec = GameRecorder(label="ranked")
+    rec.start()            # position after setup / the last load or reset
+    ...play...
+    with ArchiveWriter("games.fwa") as writer:
+        writer.append(rec.finish())
+
+    with Archive("games.fwa") as archive:
+        for game in archive:
+            game.winner, game.final.state["acquired_clusters"]
+        replay(archive[42], upto=10)   # board.py now holds that position
+"""
+
+import mmap
+import os
+import struct
+
+import board
+from board import BOARD_SIZE
+from encoding import PositionView, encode_live
+
+FORMAT_VERSION = 1
+MAGIC = b"FWAR"
+
+POSITION_SLOT = 256
+MOVE_SIZE = 32
+ENTRY_SIZE = 32
+
+OP_ROLL = 1   # a = value, flags = 1 when the roll granted a steal
+OP_MOVE = 2
+OP_ROTATE = 3
+OP_STEAL = 4
+OP_TURN = 5
+OP_BATCH = 6  # apply_turn: a = end_turn, count = action records that follow
+OP_MORE = 7   # continuation of the previous record's cells
+
+_HEADER = struct.Struct("<4sHHH6x")
+_MOVE = struct.Struct("<BBbbBB26s")
+_MORE = struct.Struct("<B31s")
+_ENTRY = struct.Struct("<12sQIIBBBx")
+_SLOT_LEN = struct.Struct("<H")
+
+CELLS_PER_MOVE = 26
+CELLS_PER_MORE = 31
+
+# Commits that start a new game: the recording restarts after them
+RESTART_KINDS = ("reset", "load", "place")
+
+
+# ==============================================================
+#   ENCODING MOVES
+# ==============================================================
+
+def _cells(cells):
+    return bytes(r * BOARD_SIZE + c for (r, c) in cells)
+
+
+def _move_records(op, actor=0, a=0, b=0, flags=0, cells=b"", count=None):
+    """One record, plus OP_MORE records for cells that don't fit in it."""
+    out = _MOVE.pack(op, actor or 0, a, b, flags, len(cells) if count is None else count,
+                     cells[:CELLS_PER_MOVE])
+    rest = cells[CELLS_PER_MOVE:]
+    while rest:
+        out += _MORE.pack(OP_MORE, rest[:CELLS_PER_MORE])
+        rest = rest[CELLS_PER_MORE:]
+    return out
+
+
+def encode_action(kind, args):
+    """Move records for a board commit (kind, args); b"" for non-moves."""
+    if kind == "roll":
+        value, grant_steal = args
+        return _move_records(OP_ROLL, a=value, flags=int(grant_steal))
+    if kind == "turn":
+        return _move_records(OP_TURN)
+    if kind == "move":
+        actor, cells, dr, dc = args
+        return _move_records(OP_MOVE, actor, dr, dc, cells=_cells(cells))
+    if kind == "rotate":
+        actor, cells = args
+        return _move_records(OP_ROTATE, actor, cells=_cells(cells))
+    if kind == "steal":
+        actor, source, target, partner_target = args
+        return _move_records(OP_STEAL, actor, cells=_cells((source, target, partner_target)))
+    if kind == "batch":
+        actor, end_turn, actions = args
+        out = _move_records(OP_BATCH, actor, int(bool(end_turn)), count=len(actions))
+        for action_kind, cells, dr, dc in actions:
+            op = OP_MOVE if action_kind == "move" else OP_ROTATE
+            out += _move_records(op, actor, dr, dc, cells=_cells(cells))
+        return out
+    return b""
+
+
+def decode_moves(buf):
+    """
+    Yield (op, actor, a, b, flags, cells) per logical move from a buffer
+    of move records; cells is a list of (row, col).
+    """
+    pos = 0
+    end = len(buf)
+    while pos < end:
+        op, actor, a, b, flags, count, packed = _MOVE.unpack_from(buf, pos)
+        pos += MOVE_SIZE
+        cells = list(packed[:min(count, CELLS_PER_MOVE)])
+        if op != OP_BATCH:
+            while len(cells) < count:
+                _, more = _MORE.unpack_from(buf, pos)
+                pos += MOVE_SIZE
+                cells.extend(more[:count - len(cells)])
+            cells = [divmod(i, BOARD_SIZE) for i in cells]
+        else:
+            cells = count  # number of actions that follow
+        yield op, actor, a, b, flags, cells
+
+
+def _slot(position):
+    if len(position) > POSITION_SLOT - _SLOT_LEN.size:
+        raise ValueError(f"encoded position of {len(position)} bytes does not fit a {POSITION_SLOT} byte slot")
+    return _SLOT_LEN.pack(len(position)) + position.ljust(POSITION_SLOT - _SLOT_LEN.size, b"\0")
+
+
+# ==============================================================
+#   RECORDING
+# ==============================================================
+
+class GameRecorder:
+    """
+    Collect one game from the live board: the starting position and every
+    commit after it. A reset, load or placement restarts the recording,
+    so records always begin from a complete position. The seed defaults
+    to the game's (board.game_seed); a record started right after a reset,
+    load or placement can be re-simulated from it (see replay).
+    """
+
+    def __init__(self, label="", seed=None):
+        self.label = label
+        self.seed = seed
+        self.game_seed = seed
+        self.initial = None
+        self.moves = bytearray()
+
+    def start(self):
+        self._restart()
+        board.add_change_listener(self._on_change)
+
+    def _restart(self):
+        self.initial = encode_live()
+        self.moves.clear()
+        self.game_seed = board.game_seed if self.seed is None else self.seed
+
+    def _on_change(self, version, kind, changes, effects):
+        kind, args = board.last_action
+        if kind in RESTART_KINDS:
+            self._restart()
+        else:
+            self.moves += encode_action(kind, args)
+
+    def finish(self):
+        """Stop recording; returns the game as a dict for ArchiveWriter.append."""
+        board.remove_change_listener(self._on_change)
+        return {
+            "label": self.label,
+            "seed": self.game_seed,
+            "initial": self.initial,
+            "moves": bytes(self.moves),
+            "final": encode_live(),
+        }
+
+
+class ArchiveWriter:
+    """
+    Append recorded games to an archive, creating it if needed. Data is
+    flushed before each index entry; close() makes both durable.
+    """
+
+    def __init__(self, path):
+        header = _HEADER.pack(MAGIC, FORMAT_VERSION, POSITION_SLOT, MOVE_SIZE)
+        self._data = open(path, "ab")
+        self._index = open(path + ".idx", "ab")
+        if self._data.tell() == 0:
+            self._data.write(header)
+        if self._index.tell() == 0:
+            self._index.write(header.ljust(ENTRY_SIZE, b"\0"))
+
+    def append(self, game):
+        label = game["label"].encode() if isinstance(game["label"], str) else game["label"]
+        if len(label) > 12:
+            raise ValueError(f"game label {game['label']!r} is longer than 12 bytes")
+        final = PositionView(game["final"]).state
+        winner = {None: 0, 1: 1, 2: 2, "draw": 3}[final["winner"]]
+        acquired = final["acquired_clusters"]
+
+        offset = self._data.tell()
+        self._data.write(_slot(game["initial"]) + game["moves"] + _slot(game["final"]))
+        self._data.flush()
+        self._index.write(_ENTRY.pack(label, offset, len(game["moves"]) // MOVE_SIZE, game["seed"],
+                                      winner, acquired[1], acquired[2]))
+        return offset
+
+    def close(self):
+        for f in (self._data, self._index):
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ==============================================================
+#   READING
+# ==============================================================
+
+class GameRecord:
+    """One archived game; positions and moves are read from the mmap on access."""
+
+    __slots__ = ("number", "label", "offset", "move_records", "seed", "winner", "acquired", "_data")
+
+    def __init__(self, number, entry, data):
+        label, self.offset, self.move_records, self.seed, winner, a1, a2 = entry
+        self.number = number
+        self.label = label.rstrip(b"\0").decode()
+        self.winner = (None, 1, 2, "draw")[winner]
+        self.acquired = {1: a1, 2: a2}
+        self._data = data
+
+    def _position(self, at):
+        (length,) = _SLOT_LEN.unpack_from(self._data, at)
+        return PositionView(self._data[at + _SLOT_LEN.size:at + _SLOT_LEN.size + length])
+
+    @property
+    def initial(self):
+        return self._position(self.offset)
+
+    @property
+    def final(self):
+        return self._position(self.offset + POSITION_SLOT + self.move_records * MOVE_SIZE)
+
+    def moves(self):
+        start = self.offset + POSITION_SLOT
+        return decode_moves(self._data[start:start + self.move_records * MOVE_SIZE])
+
+
+class Archive:
+    """Read-only, memory-mapped view of an archive written by ArchiveWriter."""
+
+    def __init__(self, path):
+        self._files = [open(path, "rb"), open(path + ".idx", "rb")]
+        self._maps = [mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) for f in self._files]
+        magic, version, slot, move_size = _HEADER.unpack_from(self._maps[0])
+        if magic != MAGIC or version != FORMAT_VERSION or slot != POSITION_SLOT or move_size != MOVE_SIZE:
+            raise ValueError(f"{path} is not a FluxWars v{FORMAT_VERSION} archive")
+        self._data = memoryview(self._maps[0])
+        self._index = memoryview(self._maps[1])
+        self._labels = None
+
+    def __len__(self):
+        return len(self._index) // ENTRY_SIZE - 1
+
+    def __getitem__(self, number):
+        if number < 0:
+            number += len(self)
+        if not 0 <= number < len(self):
+            raise IndexError(number)
+        entry = _ENTRY.unpack_from(self._index, (number + 1) * ENTRY_SIZE)
+        return GameRecord(number, entry, self._data)
+
+    def __iter__(self):
+        for number in range(len(self)):
+            yield self[number]
+
+    def find(self, label):
+        """Game with `label` (the latest one if repeated), or None."""
+        if self._labels is None:
+            self._labels = {}
+            for number, entry in enumerate(_ENTRY.iter_unpack(self._index[ENTRY_SIZE:])):
+                self._labels[entry[0].rstrip(b"\0").decode()] = number
+        number = self._labels.get(label)
+        return None if number is None else self[number]
+
+    def close(self):
+        """Unmap the archive. Positions read from it must be dropped first."""
+        self._data.release()
+        self._index.release()
+        for m in self._maps:
+            m.close()
+        for f in self._files:
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ==============================================================
+#   REPLAY
+# ==============================================================
+
+def replay(game, upto=None, resimulate=False):
+    """
+    Rebuild a game in board.py by applying its moves with the board rules,
+    starting from the recorded initial position. Stops after `upto`
+    moves when given. Returns the number of moves applied.
+
+    With `resimulate`, the game's random streams are reseeded from its
+    seed and the dice are rolled again instead of taken from the record;
+    a roll that comes out differently raises ValueError, so a clean run
+    proves the game re-runs bit for bit.
+
+    This drives the live board module, so run it offline (tests, analysis
+    scripts), not in the serving process.
+    """
+    start = game.initial
+    grid, pols, ids = start.grids()
+    board.restore_position(grid, pols, ids, start.next_magnet_id, start.state, start.dice, 0)
+    if resimulate:
+        board.seed_game(game.seed)
+
+    moves = game.moves()
+    applied = 0
+    for op, actor, a, b, flags, cells in moves:
+        if upto is not None and applied >= upto:
+            break
+        if op == OP_ROLL:
+            rolled = board.roll_dice(None if resimulate else a, grant_steal=bool(flags & 1))
+            if rolled != a:
+                raise ValueError(f"game {game.number}: roll {applied + 1} came out {rolled}, recorded {a}")
+            ok = True
+        elif op == OP_TURN:
+            board.next_player()
+            ok = True
+        elif op == OP_MOVE:
+            ok = board.move_cluster_cells(cells, a, b, actor_player=actor)[0]
+        elif op == OP_ROTATE:
+            ok = board.rotate_cluster_cells(cells, actor_player=actor)[0]
+        elif op == OP_STEAL:
+            partner_target = cells[2] if len(cells) > 2 else None
+            ok = board.steal_and_place_magnet(actor, cells[0], cells[1], partner_target)[0]
+        elif op == OP_BATCH:
+            actions = []
+            for _ in range(cells):
+                action_op, _, dr, dc, _, action_cells = next(moves)
+                kind = "move" if action_op == OP_MOVE else "rotate"
+                actions.append({"type": kind, "cluster": action_cells, "dr": dr, "dc": dc})
+            ok = board.apply_turn(actions, actor_player=actor, end_turn=bool(a))[0]
+        else:
+            raise ValueError(f"unknown move op {op} in game {game.number}")
+        if not ok:
+            raise ValueError(f"game {game.number}: move {applied + 1} no longer applies")
+        applied += 1
+    return applied
@@ -0,0 +1,239 @@
+"""
+Headless self-play arena for FluxWars AIs
+
+Plays many games between AI tiers (easy / normal / expert) across a
+process pool, without the browser. Every game starts from a seeded
+start position (see generator.py) and seeds the game's random streams
+(dice, MCTS) from the same game seed, so a run is reproducible. Each
+worker process owns its own copy of the board module, so games never
+share state. Nodes/sec comes from the
+ai_nodes_total counter in metrics.py.
+
+Tier specs are a difficulty name with an optional MCTS simulation count,
+e.g. "easy", "normal", "normal:200".
+
+Usage:
+    python arena.py --tiers easy normal normal:200 --games 200 --workers 8
+    python arena.py --tiers easy normal --games 50 --json results.json
+    python arena.py --tiers easy normal --games 1000 --record games.fwa
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import ai_player
+import archive
+import board
+import metrics
+from generator import generate_start_position
+
+
+ELO_BASE = 1500.0
+ELO_K = 16.0
+
+
+def parse_tier(spec):
+    """Split "normal:200" into ("normal", {"simulations": 200})."""
+    name, _, arg = spec.partition(":")
+    if name not in ("easy", "normal", "expert"):
+        raise ValueError(f"Unknown AI tier: {spec}")
+    kwargs = {}
+    if arg:
+        if name != "normal":
+            raise ValueError(f"Tier {name} takes no arguments: {spec}")
+        kwargs["simulations"] = int(arg)
+    return name, kwargs
+
+
+# ==============================================================
+#   SINGLE GAME (runs inside a worker process)
+# ==============================================================
+
+def play_game(seed, tiers, max_main_turns=None, max_plies=200, record=False):
+    """
+    Play one game from the start position for `seed`.
+
+    `tiers` maps player (1, 2) to a tier spec. Returns a dict with the
+    winner and per-player decision count, total decision time and nodes.
+    With `record`, "record" holds the game for archive.ArchiveWriter.
+    """
+    position = generate_start_position(seed)
+    board.load_start_position(position["homes"], position["neutrals"], seed=seed)
+    state = board.get_state()
+    if max_main_turns is not None:
+        state["max_main_turns"] = max_main_turns
+
+    recorder = archive.GameRecorder(seed=seed) if record else None
+    if recorder:
+        recorder.start()
+
+    moves = {p: parse_tier(tiers[p]) for p in (1, 2)}
+    stats = {p: {"decisions": 0, "time": 0.0, "nodes": 0} for p in (1, 2)}
+
+    for _ in range(max_plies):
+        state = board.get_state()
+        if state["phase"] == "ended":
+            break
+        player = state["current_player"]
+        state["ai_player"] = player
+        name, kwargs = moves[player]
+
+        nodes_before = metrics.value("ai_nodes_total")
+        start = time.perf_counter()
+        ai_player.get_ai_move(name)(**kwargs)
+        stats[player]["time"] += time.perf_counter() - start
+        stats[player]["nodes"] += metrics.value("ai_nodes_total") - nodes_before
+        stats[player]["decisions"] += 1
+
+    state = board.get_state()
+    winner = state.get("winner") if state["phase"] == "ended" else "draw"
+    result = {
+        "seed": seed,
+        "tiers": {1: tiers[1], 2: tiers[2]},
+        "winner": winner,
+        "acquired": dict(state["acquired_clusters"]),
+        "stats": stats,
+    }
+    if recorder:
+        result["record"] = recorder.finish()
+    return result
+
+
+def _play_task(task):
+    seed, tier1, tier2, max_main_turns, record = task
+    return play_game(seed, {1: tier1, 2: tier2}, max_main_turns, record=record)
+
+
+# ==============================================================
+#   SCHEDULING + RATINGS
+# ==============================================================
+
+def schedule(tiers, games, seed=0, max_main_turns=None, record=False):
+    """
+    Round robin over every pair of tiers. Each pair plays `games` games;
+    every start seed is played twice with seats swapped.
+    """
+    tasks = []
+    for a, b in combinations(tiers, 2):
+        for i in range(games):
+            game_seed = seed + i // 2
+            if i % 2 == 0:
+                tasks.append((game_seed, a, b, max_main_turns, record))
+            else:
+                tasks.append((game_seed, b, a, max_main_turns, record))
+    return tasks
+
+
+def compute_elo(results, tiers):
+    """Sequential Elo over `results` in schedule order."""
+    ratings = {t: ELO_BASE for t in tiers}
+    for res in results:
+        t1, t2 = res["tiers"][1], res["tiers"][2]
+        if res["winner"] == 1:
+            score = 1.0
+        elif res["winner"] == 2:
+            score = 0.0
+        else:
+            score = 0.5
+        expected = 1.0 / (1.0 + 10 ** ((ratings[t2] - ratings[t1]) / 400.0))
+        ratings[t1] += ELO_K * (score - expected)
+        ratings[t2] -= ELO_K * (score - expected)
+    return ratings
+
+
+def summarize(results, tiers):
+    """Aggregate per-tier win rates, Elo, decision time and nodes/sec."""
+    summary = {t: {"games": 0, "wins": 0, "losses": 0, "draws": 0,
+                   "decisions": 0, "time": 0.0, "nodes": 0} for t in tiers}
+    for res in results:
+        for player in (1, 2):
+            tier = res["tiers"][player]
+            row = summary[tier]
+            row["games"] += 1
+            if res["winner"] == player:
+                row["wins"] += 1
+            elif res["winner"] in (1, 2):
+                row["losses"] += 1
+            else:
+                row["draws"] += 1
+            st = res["stats"][player]
+            row["decisions"] += st["decisions"]
+            row["time"] += st["time"]
+            row["nodes"] += st["nodes"]
+
+    ratings = compute_elo(results, tiers)
+    for tier, row in summary.items():
+        games = row["games"] or 1
+        row["win_rate"] = (row["wins"] + 0.5 * row["draws"]) / games
+        row["elo"] = round(ratings[tier], 1)
+        row["avg_decision_ms"] = 1000.0 * row["time"] / row["decisions"] if row["decisions"] else 0.0
+        row["nodes_per_sec"] = row["nodes"] / row["time"] if row["time"] > 0 else 0.0
+    return summary
+
+
+def run_arena(tiers, games, workers=None, seed=0, max_main_turns=None, record=False):
+    tasks = schedule(tiers, games, seed, max_main_turns, record)
+    if workers == 1:
+        results = [_play_task(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))
+            results = list(pool.map(_play_task, tasks, chunksize=chunksize))
+    return results, summarize(results, tiers)
+
+
+def print_summary(summary, elapsed, total_games):
+    print(f"\n{total_games} games in {elapsed:.1f}s\n")
+    header = f"{'tier':<14}{'games':>7}{'W':>6}{'L':>6}{'D':>6}{'win%':>8}{'elo':>8}{'ms/dec':>9}{'nodes/s':>11}"
+    print(header)
+    print("-" * len(header))
+    for tier, row in sorted(summary.items(), key=lambda kv: -kv[1]["elo"]):
+        print(f"{tier:<14}{row['games']:>7}{row['wins']:>6}{row['losses']:>6}{row['draws']:>6}"
+              f"{100 * row['win_rate']:>7.1f}%{row['elo']:>8.0f}{row['avg_decision_ms']:>9.1f}"
+              f"{row['nodes_per_sec']:>11.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play FluxWars AI tiers against each other.")
+    parser.add_argument("--tiers", nargs="+", default=["easy", "normal"], help="tier specs, e.g. easy normal:200")
+    parser.add_argument("--games", type=int, default=100, help="games per pair of tiers")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first start position")
+    parser.add_argument("--max-turns", type=int, default=None, help="override max_main_turns")
+    parser.add_argument("--json", metavar="FILE", help="write summary and per-game results as JSON")
+    parser.add_argument("--record", metavar="FILE", help="append every game to a record archive (see archive.py)")
+    args = parser.parse_args(argv)
+
+    if len(set(args.tiers)) < 2:
+        parser.error("need at least two distinct tiers")
+    for spec in args.tiers:
+        parse_tier(spec)
+
+    start = time.perf_counter()
+    results, summary = run_arena(args.tiers, args.games, args.workers, args.seed, args.max_turns,
+                                 record=bool(args.record))
+    elapsed = time.perf_counter() - start
+    print_summary(summary, elapsed, len(results))
+
+    if args.record:
+        with archive.ArchiveWriter(args.record) as writer:
+            for n, res in enumerate(results):
+                game = res.pop("record")
+                game["label"] = f"game{n}"
+                writer.append(game)
+        print(f"\nRecorded {len(results)} games to {args.record}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summary, "games": results}, f, indent=2)
+        print(f"\nWrote {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
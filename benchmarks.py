@@ -0,0 +1,367 @@
+"""
+Performance benchmarks for FluxWars engine and AI hot paths
+
+Every case runs against fixed seeded start positions (generator.py), so
+numbers are comparable between commits. Mutating cases restore the board
+before each iteration, outside the timed region.
+
+Usage:
+    python benchmarks.py -o bench.json                 # run everything
+    python benchmarks.py -k cluster                    # only matching cases
+    python benchmarks.py -o new.json --compare old.json --threshold 0.15
+
+With --compare the exit status is 1 when any case's median regressed by
+more than the threshold, so it can gate a rollout.
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import ai_player
+import board
+from generator import generate_start_position
+
+
+SEEDS = (11, 23, 37, 41, 59)
+
+
+# ==============================================================
+#   STATE HELPERS
+# ==============================================================
+
+def load_position(seed, current_player=1, dice=3):
+    """Load the start position for `seed` and put `current_player` on move."""
+    position = generate_start_position(seed)
+    board.load_start_position(position["homes"], position["neutrals"])
+    state = board.get_state()
+    state["current_player"] = current_player
+    state["ai_player"] = current_player
+    board.dice_value = dice
+
+
+def snapshot():
+    return (
+        [row[:] for row in board.board],
+        [row[:] for row in board.polarities],
+        [row[:] for row in board.magnet_ids],
+        board.next_magnet_id,
+        copy.deepcopy(board.game_state),
+        board.dice_value,
+    )
+
+
+def restore(snap):
+    grid, pols, ids, next_id, state, dice = snap
+    board.board = [row[:] for row in grid]
+    board.polarities = [row[:] for row in pols]
+    board.magnet_ids = [row[:] for row in ids]
+    board.next_magnet_id = next_id
+    board.game_state = copy.deepcopy(state)
+    board.dice_value = dice
+    board.rebuild_indexes()
+
+
+def player_cells(player):
+    return [(r, c) for r in range(board.BOARD_SIZE) for c in range(board.BOARD_SIZE)
+            if board.board[r][c] == player]
+
+
+def first_legal_move(player):
+    """A (cluster, dr, dc) for `player` that move_cluster_cells accepts."""
+    snap = snapshot()
+    for (r, c) in player_cells(player):
+        cluster = board.find_cluster(r, c)
+        for dr, dc in ((0, 1), (0, -1), (1, 0), (-1, 0)):
+            ok, _, _ = board.move_cluster_cells(cluster, dr, dc, actor_player=player)
+            restore(snap)
+            if ok:
+                return cluster, dr, dc
+    return None
+
+
+# ==============================================================
+#   CASES
+# ==============================================================
+#
+# Each case is a function(seed) returning (setup, run). `setup` is called
+# before every iteration (untimed); `run` is the timed body.
+
+def case_find_cluster(seed):
+    load_position(seed)
+    cells = player_cells(1) + player_cells(2)
+
+    def run():
+        for (r, c) in cells:
+            board.find_cluster(r, c)
+    return None, run
+
+
+def case_get_cluster(seed):
+    load_position(seed)
+    cells = player_cells(3)
+
+    def run():
+        for (r, c) in cells:
+            board.get_cluster(r, c)
+    return None, run
+
+
+def case_move_cluster_cells(seed):
+    load_position(seed)
+    move = first_legal_move(1)
+    snap = snapshot()
+    cluster, dr, dc = move
+
+    def run():
+        board.move_cluster_cells(cluster, dr, dc, actor_player=1)
+    return (lambda: restore(snap)), run
+
+
+def case_apply_post_move_effects(seed):
+    load_position(seed)
+    cells = player_cells(1) + player_cells(2)
+    snap = snapshot()
+
+    def run():
+        board._apply_post_move_effects(cells, 1, cells, cells)
+    return (lambda: restore(snap)), run
+
+
+def case_preview_moves(seed):
+    load_position(seed)
+    cluster, _, _ = first_legal_move(1)
+
+    def run():
+        board.preview_moves(cluster)
+    return None, run
+
+
+def case_get_stealable_neutrals(seed):
+    load_position(seed)
+
+    def run():
+        board.get_stealable_neutrals_for_player(1)
+        board.get_stealable_neutrals_for_player(2)
+    return None, run
+
+
+def case_get_state_serializable(seed):
+    load_position(seed)
+
+    def run():
+        board.get_state_serializable()
+    return None, run
+
+
+def case_mcts_get_possible_moves(seed):
+    load_position(seed)
+    node = ai_player.MCTSNode(board.board, board.polarities, board.game_state)
+
+    def run():
+        node.get_possible_moves()
+    return None, run
+
+
+def case_normal_ai_turn(seed):
+    load_position(seed, current_player=2)
+    snap = snapshot()
+
+    def setup():
+        restore(snap)
+        board.seed_game(seed)
+
+    def run():
+        ai_player.normal_ai_move(simulations=50)
+    return setup, run
+
+
+def _client():
+    from app import app
+    app.config["TESTING"] = True
+    return app.test_client()
+
+
+def case_route_index(seed):
+    load_position(seed)
+    client = _client()
+
+    def run():
+        client.get("/")
+    return None, run
+
+
+def case_route_select_cluster(seed):
+    load_position(seed)
+    client = _client()
+    r, c = player_cells(1)[0]
+
+    def run():
+        client.post("/select_cluster", json={"row": r, "col": c})
+    return None, run
+
+
+def case_route_move_cluster(seed):
+    load_position(seed)
+    client = _client()
+    cluster, dr, dc = first_legal_move(1)
+    body = {"cluster": [list(x) for x in cluster], "dr": dr, "dc": dc, "remaining_moves": 2}
+    snap = snapshot()
+
+    def run():
+        client.post("/move_cluster", json=body)
+    return (lambda: restore(snap)), run
+
+
+def case_route_roll_dice(seed):
+    load_position(seed, dice=0)
+    client = _client()
+    snap = snapshot()
+
+    def setup():
+        restore(snap)
+        board.seed_game(seed)
+
+    def run():
+        client.post("/roll_dice")
+    return setup, run
+
+
+def case_route_end_turn(seed):
+    load_position(seed)
+    client = _client()
+    snap = snapshot()
+
+    def run():
+        client.post("/end_turn")
+    return (lambda: restore(snap)), run
+
+
+CASES = {
+    "engine.find_cluster": case_find_cluster,
+    "engine.get_cluster": case_get_cluster,
+    "engine.move_cluster_cells": case_move_cluster_cells,
+    "engine.apply_post_move_effects": case_apply_post_move_effects,
+    "engine.preview_moves": case_preview_moves,
+    "engine.get_stealable_neutrals": case_get_stealable_neutrals,
+    "engine.get_state_serializable": case_get_state_serializable,
+    "ai.mcts_get_possible_moves": case_mcts_get_possible_moves,
+    "ai.normal_ai_turn": case_normal_ai_turn,
+    "route.index": case_route_index,
+    "route.select_cluster": case_route_select_cluster,
+    "route.move_cluster": case_route_move_cluster,
+    "route.roll_dice": case_route_roll_dice,
+    "route.end_turn": case_route_end_turn,
+}
+
+# Slow cases get fewer iterations
+ITERATIONS = {"ai.normal_ai_turn": 5}
+
+
+# ==============================================================
+#   RUNNER
+# ==============================================================
+
+def run_case(name, iterations):
+    times = []
+    for seed in SEEDS:
+        setup, run = CASES[name](seed)
+        # one untimed warmup run per seed
+        if setup:
+            setup()
+        run()
+        for _ in range(iterations):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+    times.sort()
+    median = statistics.median(times)
+    return {
+        "samples": len(times),
+        "mean_us": statistics.fmean(times) * 1e6,
+        "median_us": median * 1e6,
+        "p95_us": times[int(0.95 * (len(times) - 1))] * 1e6,
+        "min_us": times[0] * 1e6,
+        "ops_per_sec": 1.0 / median if median > 0 else 0.0,
+    }
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_all(pattern=None, iterations=50):
+    results = {}
+    for name in CASES:
+        if pattern and pattern not in name:
+            continue
+        results[name] = run_case(name, ITERATIONS.get(name, iterations))
+        print(f"{name:<36}{results[name]['median_us']:>12.1f} us  (p95 {results[name]['p95_us']:.1f})")
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seeds": list(SEEDS),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Print median deltas against `baseline`; return names that regressed."""
+    regressions = []
+    print(f"\nComparison against {baseline['meta'].get('commit')} (threshold {threshold:.0%}):")
+    for name, res in current["results"].items():
+        old = baseline["results"].get(name)
+        if not old:
+            print(f"  {name:<36} (new)")
+            continue
+        delta = res["median_us"] / old["median_us"] - 1.0 if old["median_us"] else 0.0
+        flag = ""
+        if delta > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:<36}{old['median_us']:>10.1f} -> {res['median_us']:>10.1f} us  ({delta:+.1%}){flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark FluxWars hot paths.")
+    parser.add_argument("-k", dest="pattern", help="only run cases containing this substring")
+    parser.add_argument("-n", "--iterations", type=int, default=50, help="iterations per seed")
+    parser.add_argument("-o", "--output", help="write results JSON here")
+    parser.add_argument("--compare", metavar="FILE", help="baseline results JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed median slowdown")
+    args = parser.parse_args(argv)
+
+    current = run_all(args.pattern, args.iterations)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
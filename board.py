@@ -4,18 +4,157 @@
 
 BOARD_SIZE = 15
 
+import functools
+import itertools
+import logging
 import random
-from collections import deque
+import threading
+from array import array
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================
+#   CONCURRENCY
+# ==============================================================
+#
+# The game lives in module globals, and a threaded server runs requests
+# side by side, so every engine entry point holds `game_lock` while it
+# reads or changes the game. The lock is re-entrant: entry points call
+# each other (apply_turn -> move_cluster_cells -> next_player), and a
+# caller that needs several calls to be atomic, like a route that moves
+# and then serializes the result, holds it around all of them.
+
+game_lock = threading.RLock()
+
+
+def _locked(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with game_lock:
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def released():
+    """
+    Give up `game_lock` (every level this thread holds) for the duration,
+    e.g. while waiting on a slow external call, and take it back after.
+    The game may change meanwhile: compare get_state_version() before and
+    after. A no-op for a thread that doesn't hold the lock.
+    """
+    depth = 0
+    while True:
+        try:
+            game_lock.release()
+        except RuntimeError:
+            break
+        depth += 1
+    try:
+        yield
+    finally:
+        for _ in range(depth):
+            game_lock.acquire()
 
 dice_value = 0
 selected_cluster = []
 
-def roll_dice():
+
+# ==============================================================
+#   PER-GAME RANDOMNESS
+# ==============================================================
+#
+# A game draws from its own seeded streams instead of the global `random`
+# module: "dice", "neutrals" (the automatic neutral layout) and "ai"
+# (MCTS). Each stream depends only on `game_seed` and the calls made on
+# it, so the same seed and the same moves give the same game bit for bit
+# (see archive.replay and arena.play_game). reset_board(seed) starts a
+# new game; without a seed one is drawn at random.
+#
+# Each stream counts the 32-bit words it has drawn, so its position is
+# one number: stream_positions() reads them and restore_streams() rebuilds
+# the streams from the seed and those counts (used by store.py, so dice
+# stay reproducible after a crash recovery).
+
+STREAMS = ("dice", "neutrals", "ai")
+SEED_LIMIT = 2 ** 32  # seeds are stored as u32 (archive.py, store.py)
+
+game_seed = 0
+_streams = {}
+
+
+class _Stream(random.Random):
+    """random.Random counting the generator words it draws; the draws themselves are unchanged."""
+
+    def __init__(self, seed):
+        super().__init__(seed)
+        self.words = 0
+
+    def random(self):
+        self.words += 2
+        return super().random()
+
+    def getrandbits(self, k):
+        self.words += (k + 31) // 32
+        return super().getrandbits(k)
+
+
+def seed_game(seed=None):
+    """Start fresh random streams for a game; returns its seed."""
+    global game_seed
+    game_seed = random.getrandbits(32) if seed is None else seed
+    _streams.clear()
+    return game_seed
+
+
+def game_rng(stream):
+    """The current game's random.Random for `stream`."""
+    rng = _streams.get(stream)
+    if rng is None:
+        rng = _streams[stream] = _Stream(f"{game_seed}/{stream}")
+    return rng
+
+
+def stream_positions():
+    """Words drawn so far from each of STREAMS."""
+    return tuple(_streams[name].words if name in _streams else 0 for name in STREAMS)
+
+
+@_locked
+def restore_streams(seed, positions):
+    """Reseed the game with `seed` and advance each stream to its position from stream_positions()."""
+    seed_game(seed)
+    for name, words in zip(STREAMS, positions):
+        if words:
+            rng = game_rng(name)
+            while rng.words < words:  # a word per 32 bits, drawn in bounded chunks
+                rng.getrandbits(32 * min(words - rng.words, 1 << 16))
+
+
+seed_game()
+
+
+@_locked
+def roll_dice(value=None, grant_steal=False):
+    """
+    Roll for the current turn. `value` forces the result (used by replays).
+    With `grant_steal`, a 6 gives the current player the right to steal,
+    recorded in the same commit as the roll.
+    """
     global dice_value
     if dice_value != 0:
         # Dice already rolled this turn, return existing value
         return dice_value
-    dice_value = random.randint(1, 6)
+    dice_value = value if value is not None else game_rng("dice").randint(1, 6)
+    grant_steal = grant_steal and dice_value == 6
+    if grant_steal:
+        game_state["steal_allowed_player"] = game_state["current_player"]
+    _commit("roll", dice_value, grant_steal)
     return dice_value
 
 
@@ -34,6 +173,7 @@ def find_cluster(row, col):
     - Neutrals NEVER extend the cluster outward.
     """
 
+    metrics.inc("player_clusters_bfs_total")
     start_owner = board[row][col]
     start_pol = polarities[row][col]
 
@@ -69,7 +209,7 @@ def find_cluster(row, col):
             # -----------------------------
             if neigh_owner == start_owner:
                 # must be opposite polarity to be connected
-                if neigh_pol in ("+","-") and neigh_pol != cur_pol:
+                if neigh_pol * cur_pol < 0:
                     queue.append((nr, nc))
                 continue
 
@@ -80,7 +220,7 @@ def find_cluster(row, col):
                 # neutral joins cluster ONLY if touching a player piece
                 # AND opposite polarity
                 if cur_owner == start_owner:
-                    if neigh_pol in ("+","-") and neigh_pol != cur_pol:
+                    if neigh_pol * cur_pol < 0:
                         # ADD NEUTRAL, but DO NOT EXPAND FROM IT
                         if (nr, nc) not in visited:
                             cluster.append((nr, nc))
@@ -109,6 +249,7 @@ def get_cluster(row, col):
     if board[row][col] != 3:
         return []
 
+    metrics.inc("neutral_clusters_bfs_total")
     visited = set()
     cluster = []
     stack = [(row, col)]
@@ -144,13 +285,34 @@ def can_move_cluster(cluster, dr, dc):
     return True
 
 
+# Per-cell lookup tables, so the post-move pass does no bounds checks:
+# in-bound orthogonal neighbors, and pull rays (direction, middle cell,
+# far cell) that stay on the board.
+_NEIGHBORS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+_NEIGHBOR_TABLE = [
+    [tuple((r + dr, c + dc) for dr, dc in _NEIGHBORS
+           if 0 <= r + dr < BOARD_SIZE and 0 <= c + dc < BOARD_SIZE)
+     for c in range(BOARD_SIZE)]
+    for r in range(BOARD_SIZE)
+]
+_PULL_RAYS = [
+    [tuple((dr, dc, r + dr, c + dc, r + 2 * dr, c + 2 * dc) for dr, dc in _NEIGHBORS
+           if 0 <= r + 2 * dr < BOARD_SIZE and 0 <= c + 2 * dc < BOARD_SIZE)
+     for c in range(BOARD_SIZE)]
+    for r in range(BOARD_SIZE)
+]
+
+
+@metrics.timed("engine_seconds", op="post_move_effects")
 def _apply_post_move_effects(moved_positions, actor_player, cluster_positions, new_moving_positions):
     """
     Apply force-pull and conversion rules after tiles have been moved on the global `board`.
-    Returns list of converted tile positions (r,c).
+    Only the moved tiles and the cells within two steps of them are
+    looked at. Returns list of converted tile positions (r,c).
     """
-    global board, polarities, game_state
     converted_cells = []
+    grid = board
+    pols = polarities
 
     # --------------------------
     # FORCE-PULL: magnets attract if opposite polarity and exactly one cell between
@@ -159,41 +321,29 @@ def _apply_post_move_effects(moved_positions, actor_player, cluster_positions, n
     pulls = []  # list of tuples: (owner, [(fr,fc),(pr,pc)], [(t1r,t1c),(t2r,t2c)], [pol1,pol2])
     scheduled_targets = set()
 
-    rows = len(board)
-    cols = len(board[0])
     for (nr, nc) in moved_positions:
-        moved_pol = polarities[nr][nc]
-        moved_owner = board[nr][nc]
-        if moved_pol not in ("+","-"):
+        moved_owner = grid[nr][nc]
+        # Only allow player clusters to pull neutrals toward themselves
+        if moved_owner not in (1, 2):
             continue
-        for ddr, ddc in [(1,0),(-1,0),(0,1),(0,-1)]:
-            mid_r, mid_c = nr+ddr, nc+ddc
-            far_r, far_c = nr+2*ddr, nc+2*ddc
-            if not (0 <= mid_r < rows and 0 <= mid_c < cols and 0 <= far_r < rows and 0 <= far_c < cols):
-                continue
-            # middle must be empty
-            if board[mid_r][mid_c] != 0:
+        moved_pol = pols[nr][nc]
+        if not moved_pol:
+            continue
+        for ddr, ddc, mid_r, mid_c, far_r, far_c in _PULL_RAYS[nr][nc]:
+            # middle must be empty, far must be a neutral magnet with opposite polarity
+            if grid[mid_r][mid_c] != 0 or grid[far_r][far_c] != 3:
                 continue
-            # far must be a magnetic tile with opposite polarity
-            far_owner = board[far_r][far_c]
-            far_pol = polarities[far_r][far_c]
-            if far_pol not in ("+","-") or far_pol == moved_pol:
-                continue
-
-            # Only allow player clusters to pull neutrals toward themselves
-            if not (moved_owner in (1,2) and far_owner == 3):
+            far_pol = pols[far_r][far_c]
+            if far_pol * moved_pol >= 0:
                 continue
 
             # Find the paired tile for the far tile (its 2x1 piece partner)
             pair = None
-            for adr, adc in [(1,0),(-1,0),(0,1),(0,-1)]:
-                pr, pc = far_r+adr, far_c+adc
-                if not (0 <= pr < rows and 0 <= pc < cols):
-                    continue
+            for (pr, pc) in _NEIGHBOR_TABLE[far_r][far_c]:
                 if (pr, pc) == (nr, nc):
                     # skip the moved tile itself
                     continue
-                if board[pr][pc] == far_owner and polarities[pr][pc] in ("+","-") and polarities[pr][pc] != far_pol:
+                if grid[pr][pc] == 3 and pols[pr][pc] * far_pol < 0:
                     pair = (pr, pc)
                     break
             if not pair:
@@ -204,79 +354,57 @@ def _apply_post_move_effects(moved_positions, actor_player, cluster_positions, n
             target_pair = (pair[0]-ddr, pair[1]-ddc)
 
             # validate targets in bounds
-            if not (0 <= target_pair[0] < rows and 0 <= target_pair[1] < cols):
+            if not (0 <= target_pair[0] < BOARD_SIZE and 0 <= target_pair[1] < BOARD_SIZE):
                 continue
 
             # targets must be empty or be the current positions of the originals
+            # (target_far is the empty middle cell)
             original_cells = [(far_r, far_c), pair]
-            original_set = set(original_cells)
-            # allow moving into a slot currently occupied by one of the originals (it will be cleared)
-            if board[target_far[0]][target_far[1]] != 0 and (target_far not in original_set):
-                continue
-            if board[target_pair[0]][target_pair[1]] != 0 and (target_pair not in original_set):
+            if grid[target_pair[0]][target_pair[1]] != 0 and target_pair not in original_cells:
                 continue
             if target_far in scheduled_targets or target_pair in scheduled_targets:
                 continue
 
             # schedule this pull
             target_cells = [target_far, target_pair]
-            pulls.append((far_owner, original_cells, target_cells, [far_pol, polarities[pair[0]][pair[1]]]))
+            pulls.append((3, original_cells, target_cells, [far_pol, pols[pair[0]][pair[1]]]))
             scheduled_targets.add(target_far)
             scheduled_targets.add(target_pair)
 
     # Apply scheduled pulls (clear old cells then set new positions)
-    global magnet_ids
-    for owner, originals, targets, pols in pulls:
+    for owner, originals, targets, pull_pols in pulls:
         # preserve magnet ID
         magnet_id = magnet_ids[originals[0][0]][originals[0][1]]
         # clear originals
         for (or_r, or_c) in originals:
-            board[or_r][or_c] = 0
-            polarities[or_r][or_c] = ""
-            magnet_ids[or_r][or_c] = 0
+            _write_cell(or_r, or_c, 0, 0, 0)
         # set targets in same order with same magnet ID
-        for (t, p) in zip(targets, pols):
+        for (t, p) in zip(targets, pull_pols):
             tr, tc = t
-            board[tr][tc] = owner
-            polarities[tr][tc] = p
-            magnet_ids[tr][tc] = magnet_id
+            _write_cell(tr, tc, owner, p, magnet_id)
+        _pending_effects["pulls"].append([[list(x) for x in originals], [list(x) for x in targets]])
 
     # Only allow conversion if actor_player is 1 or 2 and the cluster includes player-owned tiles
-    if actor_player in (1,2) and any(board[r][c] == actor_player for (r,c) in cluster_positions):
+    if actor_player in (1,2) and any(grid[r][c] == actor_player for (r,c) in cluster_positions):
         for (nr, nc) in moved_positions:
-            moved_pol = polarities[nr][nc]
-            if moved_pol not in ("+","-"):
+            moved_pol = pols[nr][nc]
+            if not moved_pol:
                 continue
-            for ddr, ddc in [(1,0),(-1,0),(0,1),(0,-1)]:
-                ar, ac = nr+ddr, nc+ddc
-                if not (0 <= ar < rows and 0 <= ac < cols):
+            for (ar, ac) in _NEIGHBOR_TABLE[nr][nc]:
+                if grid[ar][ac] != 3:   # must be neutral
                     continue
-                if board[ar][ac] != 3:   # must be neutral
-                    continue
-                neigh_pol = polarities[ar][ac]
-                if neigh_pol in ("+","-") and neigh_pol != moved_pol:
-                    board[ar][ac] = actor_player
+                neigh_pol = pols[ar][ac]
+                if neigh_pol * moved_pol < 0:
                     # Keep the same magnet_id when converting ownership
+                    _write_cell(ar, ac, actor_player, neigh_pol, magnet_ids[ar][ac])
                     converted_cells.append((ar, ac))
 
         # update stats: recompute ownership of initial neutral clusters
         if converted_cells:
+            _pending_effects["converted"].extend([r, c] for (r, c) in converted_cells)
             game_state["last_cluster_acquirer"] = actor_player
-            # Re-evaluate each initial neutral cluster's owner and update counts
-            for idx, cl in enumerate(game_state.get("initial_neutral_clusters", [])):
-                owners = set(board[r][c] for (r, c) in cl)
-                owners.discard(0)
-                owners.discard(3)
-
-                if len(owners) == 1:
-                    owner = owners.pop()
-                    prev = game_state["neutral_cluster_owners"].get(idx)
-                    if prev != owner:
-                        if prev in (1, 2):
-                            game_state["acquired_clusters"][prev] -= 1
-
-                        game_state["neutral_cluster_owners"][idx] = owner
-                        game_state["acquired_clusters"][owner] += 1
+            # Re-evaluate the owners of the initial neutral clusters touched since the last check
+            _settle_cluster_owners(mark_acquirer=False)
 
             check_winner()
 
@@ -287,31 +415,13 @@ def _apply_post_move_effects(moved_positions, actor_player, cluster_positions, n
 #   MOVE EXECUTION WITH CORRECT SINGLE-TILE CONVERSION
 # ==============================================================
 
-def move_cluster_cells(cluster, dr, dc, actor_player=None):
+def _moving_positions(cluster_positions, actor_player):
     """
-    Move cluster by (dr,dc).
-    Only converts ONE neutral tile per touched opposite-polarity adjacency.
-    No chain conversions. No multi-tile cluster flips.
-    Returns: (success, message, new_cluster_or_none)
+    Determine which tiles should actually move:
+    - If the cluster includes any tiles owned by the actor_player, move the
+      whole cluster plus the 2x1 partners of its neutral tiles
+    - Otherwise (cluster is neutral-only), move the neutral tiles
     """
-    global board, polarities
-
-    if game_state.get("phase") == "ended":
-        return False, "Game over — no moves allowed.", None
-    # Only allow moves if dice has been rolled
-    if dice_value == 0:
-        return False, "You must roll the dice before moving.", None
-    # Only allow current player to move
-    if actor_player != game_state.get("current_player"):
-        return False, "It's not your turn.", None
-
-    cluster_positions = [tuple(x) for x in cluster]
-    cluster_set = set(cluster_positions)
-    # Determine which tiles should actually move:
-    # - If the cluster includes any tiles owned by the actor_player, only move those actor-owned tiles
-    # - Otherwise (cluster is neutral-only), allow moving the neutral tiles
-    global board, polarities
-
     rows = len(board)
     cols = len(board[0])
 
@@ -332,41 +442,69 @@ def move_cluster_cells(cluster, dr, dc, actor_player=None):
             for ddr, ddc in [(1,0),(-1,0),(0,1),(0,-1)]:
                 pr, pc = nr+ddr, nc+ddc
                 if 0 <= pr < rows and 0 <= pc < cols:
-                    if board[pr][pc] == 3 and polarities[pr][pc] in ("+","-") and polarities[pr][pc] != polarities[nr][nc]:
+                    if board[pr][pc] == 3 and polarities[pr][pc] * polarities[nr][nc] < 0:
                         # Add both blocks to moving_positions
                         moving_positions.add((pr, pc))
                         moving_positions.add((nr, nc))
-        moving_positions = list(moving_positions)
-    else:
-        moving_positions = list(cluster_positions)
+        return list(moving_positions)
+    return list(cluster_positions)
 
+
+def _move_error(moving_positions, dr, dc):
+    """Why shifting `moving_positions` by (dr, dc) is illegal on the board, or None."""
+    for (r, c) in moving_positions:
+        if not (0 <= r + dr < BOARD_SIZE and 0 <= c + dc < BOARD_SIZE):
+            return "Out of bounds."
+    # collision check against non-moving cells
+    # allow moving into neutral tiles (board == 3) so player pieces can displace/capture neutrals
     moving_set = set(moving_positions)
+    for (r, c) in moving_positions:
+        nr, nc = r + dr, c + dc
+        if (nr, nc) not in moving_set and board[nr][nc] not in (0, 3):
+            return "Blocked."
+    return None
 
-    rows = len(board)
-    cols = len(board[0])
 
-    # prevent moving opponent pieces
-    if actor_player in (1, 2):
-        for (r,c) in cluster_positions:
-            if board[r][c] not in (actor_player, 3):
-                return False, "Cannot move opponent pieces.", None
+@_locked
+@metrics.timed("engine_seconds", op="move_cluster")
+def move_cluster_cells(cluster, dr, dc, actor_player=None, moving_positions=None):
+    """
+    Move cluster by (dr,dc).
+    Only converts ONE neutral tile per touched opposite-polarity adjacency.
+    No chain conversions. No multi-tile cluster flips.
+    `moving_positions` comes from a live selection handle (see
+    resolve_selection); the board has not changed since it was resolved,
+    so partner lookup and the ownership check are skipped.
+    Returns: (success, message, new_cluster_or_none)
+    """
+    global board, polarities
 
-    # calculate target for only the moving positions
-    new_moving_positions = []
-    for (r,c) in moving_positions:
-        nr, nc = r+dr, c+dc
-        if not (0 <= nr < rows and 0 <= nc < cols):
-            return False, "Out of bounds.", None
-        new_moving_positions.append((nr, nc))
+    if game_state.get("phase") == "ended":
+        return False, "Game over — no moves allowed.", None
+    # Only allow moves if dice has been rolled
+    if dice_value == 0:
+        return False, "You must roll the dice before moving.", None
+    # Only allow current player to move
+    if actor_player != game_state.get("current_player"):
+        return False, "It's not your turn.", None
 
-    # collision check against non-moving cells
-    # allow moving into neutral tiles (board == 3) so player pieces can displace/capture neutrals
-    for pos in new_moving_positions:
-        if pos not in moving_set:
-            nr, nc = pos
-            # allow moving into empty or neutral cells; block other players' tiles
-            if board[nr][nc] != 0 and board[nr][nc] != 3:
-                return False, "Blocked.", None
+    cluster_positions = [tuple(x) for x in cluster]
+
+    if moving_positions is None:
+        moving_positions = _moving_positions(cluster_positions, actor_player)
+
+        # prevent moving opponent pieces
+        if actor_player in (1, 2):
+            for (r,c) in cluster_positions:
+                if board[r][c] not in (actor_player, 3):
+                    return False, "Cannot move opponent pieces.", None
+
+    error = _move_error(moving_positions, dr, dc)
+    if error:
+        return False, error, None
+
+    moving_set = set(moving_positions)
+    new_moving_positions = [(r + dr, c + dc) for (r, c) in moving_positions]
 
     # copy board
     global magnet_ids
@@ -377,7 +515,7 @@ def move_cluster_cells(cluster, dr, dc, actor_player=None):
     # clear old positions only for moving tiles
     for (r,c) in moving_positions:
         new_board[r][c] = 0
-        new_pol[r][c] = ""
+        new_pol[r][c] = 0
         new_ids[r][c] = 0
 
     # place moved tiles
@@ -386,9 +524,11 @@ def move_cluster_cells(cluster, dr, dc, actor_player=None):
         new_pol[nr][nc] = polarities[r][c]
         new_ids[nr][nc] = magnet_ids[r][c]
 
+    old_board = board
     board = new_board
     polarities = new_pol
     magnet_ids = new_ids
+    _note_owner_changes(old_board, moving_set.union(new_moving_positions))
 
     # derive moved positions from new board state (only for moved tiles)
     moved_positions = []
@@ -411,9 +551,45 @@ def move_cluster_cells(cluster, dr, dc, actor_player=None):
         elif owner_after in (1, 2):
             new_cluster = find_cluster(first_pos[0], first_pos[1])
 
+    _commit("move", actor_player, cluster_positions, dr, dc)
     return True, "Cluster moved." + (" Converted neutrals." if converted_cells else ""), new_cluster
 
 
+def _rotation_error(cluster_positions, actor_player):
+    """
+    Returns (error, rotated_cell): why rotating the 2-cell piece is
+    illegal on the board (None if it is legal), and the cell its second
+    half moves to.
+    """
+    if len(cluster_positions) != 2:
+        return "Can only rotate a single 2-cell piece.", None
+
+    (r1, c1), (r2, c2) = cluster_positions
+    # ensure adjacency
+    dr = r2 - r1
+    dc = c2 - c1
+    if (abs(dr) + abs(dc)) != 1:
+        return "Cells are not a 2-cell piece.", None
+
+    # require piece to belong to actor (do not rotate opponent pieces)
+    if board[r1][c1] != actor_player or board[r2][c2] != actor_player:
+        return "Can only rotate your own pieces.", None
+
+    # compute new offset for second cell after 90° clockwise rotation: (dr,dc) -> (dc, -dr)
+    new_r2 = r1 + dc
+    new_c2 = c1 - dr
+
+    if not (0 <= new_r2 < BOARD_SIZE and 0 <= new_c2 < BOARD_SIZE):
+        return "Rotation out of bounds.", None
+
+    # allow target if empty or current original cells (we'll clear originals)
+    if board[new_r2][new_c2] != 0 and (new_r2, new_c2) not in ((r1, c1), (r2, c2)):
+        return "Rotation blocked.", None
+    return None, (new_r2, new_c2)
+
+
+@_locked
+@metrics.timed("engine_seconds", op="rotate_cluster")
 def rotate_cluster_cells(cluster, actor_player=None):
     """
     Rotate a single 2-cell magnet (cluster of two adjacent cells) 90 degrees clockwise
@@ -430,35 +606,13 @@ def rotate_cluster_cells(cluster, actor_player=None):
         return False, "It's not your turn.", None
 
     cluster_positions = [tuple(x) for x in cluster]
-    if len(cluster_positions) != 2:
-        return False, "Can only rotate a single 2-cell piece.", None
+    error, rotated = _rotation_error(cluster_positions, actor_player)
+    if error:
+        return False, error, None
 
     (r1, c1), (r2, c2) = cluster_positions
-    # ensure adjacency
-    dr = r2 - r1
-    dc = c2 - c1
-    if (abs(dr) + abs(dc)) != 1:
-        return False, "Cells are not a 2-cell piece.", None
-
-    # require piece to belong to actor (do not rotate opponent pieces)
-    if board[r1][c1] != actor_player or board[r2][c2] != actor_player:
-        return False, "Can only rotate your own pieces.", None
-
-    rows = len(board)
-    cols = len(board[0])
-
-    # compute new offset for second cell after 90° clockwise rotation: (dr,dc) -> (dc, -dr)
-    ndr, ndc = dc, -dr
-    new_r2 = r1 + ndr
-    new_c2 = c1 + ndc
-
-    if not (0 <= new_r2 < rows and 0 <= new_c2 < cols):
-        return False, "Rotation out of bounds.", None
-
-    # allow target if empty or current original cells (we'll clear originals)
+    new_r2, new_c2 = rotated
     originals = {(r1, c1), (r2, c2)}
-    if board[new_r2][new_c2] != 0 and (new_r2, new_c2) not in originals:
-        return False, "Rotation blocked.", None
 
     # perform rotation: clear originals then set new positions
     global magnet_ids
@@ -472,7 +626,7 @@ def rotate_cluster_cells(cluster, actor_player=None):
     # clear originals
     for (or_r, or_c) in originals:
         new_board[or_r][or_c] = 0
-        new_pol[or_r][or_c] = ""
+        new_pol[or_r][or_c] = 0
         new_ids[or_r][or_c] = 0
 
     # pivot (r1,c1) stays; second cell moves to (new_r2,new_c2)
@@ -484,9 +638,11 @@ def rotate_cluster_cells(cluster, actor_player=None):
     new_pol[new_r2][new_c2] = polarities[r2][c2]
     new_ids[new_r2][new_c2] = magnet_id
 
+    old_board = board
     board = new_board
     polarities = new_pol
     magnet_ids = new_ids
+    _note_owner_changes(old_board, originals | {(new_r2, new_c2)})
 
     # moved positions list
     moved_positions = [(r1, c1), (new_r2, new_c2)]
@@ -503,6 +659,7 @@ def rotate_cluster_cells(cluster, actor_player=None):
     elif owner_after in (1, 2):
         new_cluster = find_cluster(r1, c1)
 
+    _commit("rotate", actor_player, cluster_positions)
     return True, "Rotated piece." + (" Converted neutrals." if converted_cells else ""), new_cluster
 
 
@@ -522,13 +679,35 @@ def get_state():
 def get_dice():
     return dice_value
 
+def get_game_seed():
+    return game_seed
+
 
 # ==============================================================
 #   STATE + PIECE PLACEMENT + PHASES
 # ==============================================================
 
+# Polarity is a signed byte per cell: PLUS, MINUS, or 0 on empty cells,
+# so "opposite polarity" is a * b < 0. The '+'/'-' strings only exist
+# at the JSON boundary (polarity_strings).
+PLUS = 1
+MINUS = -1
+POLARITY_SYMBOLS = {PLUS: "+", MINUS: "-", 0: ""}
+POLARITY_VALUES = {"+": PLUS, "-": MINUS, "": 0}
+
+
+def empty_polarities():
+    return [array("b", bytes(BOARD_SIZE)) for _ in range(BOARD_SIZE)]
+
+
+def polarity_strings(pols=None):
+    """A polarity plane (default: the live one) as rows of '+', '-' and ''."""
+    symbols = POLARITY_SYMBOLS
+    return [[symbols[p] for p in row] for row in (polarities if pols is None else pols)]
+
+
 board = [[0 for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
-polarities = [['' for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+polarities = empty_polarities()
 magnet_ids = [[0 for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
 next_magnet_id = 1
 
@@ -552,10 +731,10 @@ game_state = {
 }
 
 PIECES = {
-    0:   [((0, 0), '+'), ((0, 1), '-')],
-    90:  [((0, 0), '+'), ((1, 0), '-')],
-    180: [((0, 0), '+'), ((0, -1), '-')],
-    270: [((0, 0), '+'), ((-1, 0), '-')],
+    0:   [((0, 0), PLUS), ((0, 1), MINUS)],
+    90:  [((0, 0), PLUS), ((1, 0), MINUS)],
+    180: [((0, 0), PLUS), ((0, -1), MINUS)],
+    270: [((0, 0), PLUS), ((-1, 0), MINUS)],
 }
 
 def can_place(piece, row, col):
@@ -587,11 +766,10 @@ def place_piece(piece, row, col, value):
     next_magnet_id += 1
     
     for (dr, dc), polarity in piece:
-        r, c = row + dr, col + dc
-        board[r][c] = value
-        polarities[r][c] = polarity
-        magnet_ids[r][c] = magnet_id
+        _write_cell(row + dr, col + dc, value, polarity, magnet_id)
 
+@_locked
+@metrics.timed("engine_seconds", op="toggle_piece")
 def toggle_piece(row, col, orientation):
     state = game_state
     phase = state["phase"]
@@ -637,6 +815,7 @@ def toggle_piece(row, col, orientation):
             state["phase"] = "neutral_setup"
             state["current_player"] = 1
             ai_place_all_neutrals()
+        _commit("place", row, col, orientation)
         return True, "Placed home piece."
 
     elif phase == "neutral_setup":
@@ -649,7 +828,9 @@ def toggle_piece(row, col, orientation):
 #   RESET BOARD
 # ==============================================================
 
-def reset_board():
+@_locked
+def reset_board(seed=None):
+    """Start a new game (keeping the AI settings); `seed` fixes its random streams."""
     global board, polarities, magnet_ids, next_magnet_id, game_state, dice_value, selected_cluster
     # Preserve AI settings across resets
     vs_ai = game_state.get("vs_ai", False)
@@ -657,7 +838,7 @@ def reset_board():
     ai_player = game_state.get("ai_player", 2)
     
     board = [[0 for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
-    polarities = [['' for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+    polarities = empty_polarities()
     magnet_ids = [[0 for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
     next_magnet_id = 1
     dice_value = 0
@@ -680,12 +861,18 @@ def reset_board():
         "ai_difficulty": ai_difficulty,
         "ai_player": ai_player,
     }
+    _pending_effects["converted"].clear()
+    _pending_effects["pulls"].clear()
+    rebuild_indexes()
+    seed_game(seed)
+    _commit("reset")
 
 
 # ==============================================================
 #   TURN PROGRESSION
 # ==============================================================
 
+@_locked
 def next_player():
     if game_state.get("phase") == "ended":
         return game_state["current_player"]
@@ -712,12 +899,14 @@ def next_player():
                         game_state["winner"] = "draw"
 
             game_state["phase"] = "ended"
+            _commit("turn")
             return game_state["current_player"]
 
     # switch active player and reset dice for the new turn
     game_state["current_player"] = 2 if game_state["current_player"] == 1 else 1
     global dice_value
     dice_value = 0
+    _commit("turn")
     return game_state["current_player"]
 
 
@@ -725,108 +914,719 @@ def next_player():
 #   SERIALIZATION FOR CLIENT
 # ==============================================================
 
+# The initial neutral clusters never change during a game, so their JSON
+# form is built once and reused until start_main_phase assigns a new list.
+_static_cache = {"clusters": None, "serial": []}
+
+
+def _serial_initial_clusters():
+    clusters = game_state.get("initial_neutral_clusters")
+    if not clusters:
+        return []
+    if _static_cache["clusters"] is not clusters:
+        _static_cache["clusters"] = clusters
+        _static_cache["serial"] = [[list(x) for x in cluster] for cluster in clusters]
+    return _static_cache["serial"]
+
+
+@_locked
+@metrics.timed("serialize_seconds")
 def get_state_serializable():
-    import copy
-    s = copy.deepcopy(game_state)
-    inc = s.get("initial_neutral_clusters")
-    if inc:
-        serial = []
-        for cluster in inc:
-            serial.append([list(x) for x in cluster])
-        s["initial_neutral_clusters"] = serial
+    """
+    JSON-ready copy of game_state. Nested dicts are copied one level deep
+    (their values are ints/tuples/None); the cluster list is cached.
+    """
+    s = {}
+    for key, value in game_state.items():
+        s[key] = dict(value) if type(value) is dict else value
+    s["initial_neutral_clusters"] = _serial_initial_clusters()
     return s
 
 
 # ==============================================================
-#   AI NEUTRAL PLACEMENT
+#   STATE VERSIONING + DELTAS
 # ==============================================================
+#
+# Every successful mutation bumps `state_version` and records the cells it
+# changed as (row, col, owner, polarity, magnet_id), diffed against the
+# cells at the previous version. Conversions and force-pulls made along
+# the way are kept with the change. A client that presents a version
+# still in `_history` gets only the cells changed since then. Listeners
+# registered with add_change_listener() see every commit as it happens;
+# `last_action` holds the call behind it, (kind, args), so a recorder can
+# replay the game through the same rules (see archive.py).
 
-def ai_place_neutral_for_player(player, max_attempts=2000, min_distance=4):
-    cols = range(8, BOARD_SIZE) if player == 1 else range(0, 7)
-    attempts = 0
-    while attempts < max_attempts:
-        attempts += 1
-        orientation = random.choice(list(PIECES.keys()))
-        piece = PIECES[orientation]
-        col = random.choice(list(cols))
-        row = random.randrange(0, BOARD_SIZE)
-
-        touches_middle = any((col + dc) == 7 for (dr, dc), _ in piece)
-        if touches_middle:
-            continue
+HISTORY_LIMIT = 64
 
-        ok, _ = can_place(piece, row, col)
-        if not ok:
-            continue
+state_version = 0
+last_action = None
+_history = deque(maxlen=HISTORY_LIMIT)  # (version, kind, changes, effects)
+_pending_effects = {"converted": [], "pulls": []}
+_change_listeners = []
+_batch = None  # kinds of the changes folded into the batch apply_turn() is running
 
-        def too_close(r0, c0):
-            for r in range(BOARD_SIZE):
-                for c in range(BOARD_SIZE):
-                    if board[r][c] == 3:
-                        if abs(r-r0) + abs(c-c0) < min_distance:
-                            return True
-            return False
 
-        conflict = False
-        for (dr, dc), _ in piece:
-            rr, cc = row+dr, col+dc
-            if too_close(rr, cc):
-                conflict = True
-                break
-        if conflict:
+def _cell_snapshot():
+    return [cell for b, p, m in zip(board, polarities, magnet_ids) for cell in zip(b, p, m)]
+
+
+_version_cells = _cell_snapshot()
+
+
+def _commit(kind, *args):
+    """
+    Record the cells changed since the last version and bump the version.
+    `args` describe the action (see last_action).
+    """
+    global state_version, _version_cells, last_action
+    if _batch is not None:
+        _batch.append(kind)
+        return state_version
+    cells = _cell_snapshot()
+    changes = [
+        [i // BOARD_SIZE, i % BOARD_SIZE, *now]
+        for i, (before, now) in enumerate(zip(_version_cells, cells))
+        if before != now
+    ]
+    effects = {
+        "converted": _pending_effects["converted"][:],
+        "pulls": _pending_effects["pulls"][:],
+    }
+    _pending_effects["converted"].clear()
+    _pending_effects["pulls"].clear()
+    state_version += 1
+    _version_cells = cells
+    last_action = (kind, args)
+    _history.append((state_version, kind, changes, effects))
+    for listener in _change_listeners:
+        # the change is already applied; a failing listener must not undo
+        # the response or keep the others from hearing about it
+        try:
+            listener(state_version, kind, changes, effects)
+        except Exception:
+            logger.exception("Change listener %r failed on %s (version %d)", listener, kind, state_version)
+    return state_version
+
+
+@_locked
+def restore_position(grid, pols, ids, next_id, state, dice, version):
+    """
+    Install a complete position (e.g. recovered from disk) as the live game
+    at `version`. Delta history restarts there, so clients resync.
+    """
+    global board, polarities, magnet_ids, next_magnet_id, game_state, dice_value
+    global state_version, _version_cells
+    board = grid
+    polarities = pols
+    magnet_ids = ids
+    next_magnet_id = next_id
+    game_state = state
+    dice_value = dice
+    state_version = version
+    _history.clear()
+    _pending_effects["converted"].clear()
+    _pending_effects["pulls"].clear()
+    _selections.clear()
+    _version_cells = _cell_snapshot()
+    rebuild_indexes()
+
+
+def add_change_listener(fn):
+    """Call fn(version, kind, changes, effects) after every committed change."""
+    if fn not in _change_listeners:
+        _change_listeners.append(fn)
+
+
+def remove_change_listener(fn):
+    if fn in _change_listeners:
+        _change_listeners.remove(fn)
+
+
+# ==============================================================
+#   BATCHED TURNS
+# ==============================================================
+
+DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+
+
+def _snapshot():
+    return (
+        [row[:] for row in board],
+        [row[:] for row in polarities],
+        [row[:] for row in magnet_ids],
+        next_magnet_id,
+        {k: dict(v) if type(v) is dict else v for k, v in game_state.items()},
+        dice_value,
+    )
+
+
+def _restore(snap):
+    """Put back a _snapshot() in place, so references held by callers stay valid."""
+    global next_magnet_id, dice_value
+    grid, pols, ids, next_magnet_id, state, dice_value = snap
+    board[:] = grid
+    polarities[:] = pols
+    magnet_ids[:] = ids
+    game_state.clear()
+    game_state.update(state)
+    _pending_effects["converted"].clear()
+    _pending_effects["pulls"].clear()
+    rebuild_indexes()
+
+
+@_locked
+@metrics.timed("engine_seconds", op="apply_turn")
+def apply_turn(actions, actor_player=None, end_turn=False):
+    """
+    Apply an ordered list of moves and rotations as one unit: either all
+    of them succeed and are committed as a single version, or the board
+    is left exactly as it was.
+
+    actions: [{"type": "move", "cluster": [[r, c], ...], "dr": 0, "dc": 1},
+              {"type": "rotate", "cluster": [[r, c], [r, c]]}, ...]
+    The first action may name a selection handle ("selection") from
+    select_cluster() instead of a cluster. An action without either
+    continues with the cluster produced by the previous action. Each action uses one dice pip; the turn passes
+    to the next player when the dice runs out or `end_turn` is set. If a
+    move wins the game, the actions after it are dropped.
+
+    Returns (success, message, new_cluster).
+    """
+    global _batch, dice_value
+
+    if not actions and not end_turn:
+        return False, "No moves submitted.", None
+    if len(actions) > dice_value:
+        return False, f"Only {dice_value} move(s) left this turn.", None
+
+    snap = _snapshot()
+    _batch = []
+    cluster = None
+    applied = []  # (type, cells, dr, dc) as actually applied, for last_action
+    try:
+        for i, action in enumerate(actions, 1):
+            kind = action.get("type", "move")
+            target = action.get("cluster") or cluster
+            moving = None
+            if action.get("selection") is not None:
+                # only the first action sees the board the handle was resolved on
+                resolved = resolve_selection(action["selection"], actor_player) if i == 1 else None
+                if resolved is None:
+                    _restore(snap)
+                    return False, f"Move {i}: {SELECTION_EXPIRED}", None
+                target, moving = resolved
+            if not target:
+                ok, message = False, "No cluster selected."
+            elif kind == "move":
+                direction = (action.get("dr"), action.get("dc"))
+                cells = [tuple(x) for x in target]
+                if direction in DIRECTIONS:
+                    ok, message, cluster = move_cluster_cells(target, *direction, actor_player=actor_player,
+                                                              moving_positions=moving)
+                else:
+                    ok, message = False, f"Invalid direction {direction}."
+            elif kind == "rotate":
+                direction = (0, 0)
+                cells = [tuple(x) for x in target]
+                ok, message, cluster = rotate_cluster_cells(target, actor_player=actor_player)
+            else:
+                ok, message = False, f"Unknown action {kind!r}."
+            if not ok:
+                _restore(snap)
+                return False, f"Move {i}: {message}", None
+            dice_value -= 1
+            applied.append((kind, cells, *direction))
+            if game_state["phase"] == "ended":
+                break  # the game was won mid-turn; later moves no longer apply
+
+        if end_turn or dice_value <= 0:
+            next_player()
+    except Exception:
+        _restore(snap)
+        raise
+    finally:
+        kinds = _batch
+        _batch = None
+
+    _commit("batch", actor_player, end_turn, applied)
+    message = f"Applied {len(applied)} move(s)."
+    if "turn" in kinds:
+        message += " Turn ended."
+    return True, message, cluster
+
+
+def get_state_version():
+    return state_version
+
+
+@_locked
+def get_delta(since):
+    """
+    Cells changed after version `since`, merged so each cell appears once
+    with its latest value. Returns None when `since` is too old (or from
+    the future) and the client has to resync from a full snapshot.
+    """
+    if since == state_version:
+        return {"since": since, "version": state_version, "changes": [], "converted": [], "pulls": []}
+    if not _history or not (_history[0][0] - 1 <= since < state_version):
+        return None
+
+    merged = {}
+    converted = []
+    pulls = []
+    for version, _, changes, effects in _history:
+        if version <= since:
             continue
+        for change in changes:
+            merged[(change[0], change[1])] = change
+        converted.extend(effects["converted"])
+        pulls.extend(effects["pulls"])
+    return {
+        "since": since,
+        "version": state_version,
+        "changes": list(merged.values()),
+        "converted": converted,
+        "pulls": pulls,
+    }
 
-        place_piece(piece, row, col, 3)
-        game_state["neutral_counts"][player] += 1
-        return True
 
-    return False
+# ==============================================================
+#   SELECTION HANDLES
+# ==============================================================
+#
+# /select_cluster resolves a cluster once and hands the client a short
+# handle instead of making it echo the coordinates back with every move.
+# A handle is only valid at the state_version it was issued for: any
+# committed change makes it stale and the client selects again.
+
+SELECTION_LIMIT = 32
+SELECTION_EXPIRED = "Selection expired; select the cluster again."
+
+_selections = OrderedDict()  # handle -> (version, actor, cluster, moving_positions)
+_selection_ids = itertools.count(1)
+
+
+@_locked
+def register_selection(cluster):
+    """Cache an already resolved cluster and return its handle."""
+    positions = [tuple(x) for x in cluster]
+    actor = game_state["current_player"]
+    moving = None
+    if all(board[r][c] in (actor, 3) for (r, c) in positions):
+        moving = _moving_positions(positions, actor)
+    handle = f"{state_version}.{next(_selection_ids)}"
+    _selections[handle] = (state_version, actor, positions, moving)
+    while len(_selections) > SELECTION_LIMIT:
+        _selections.popitem(last=False)
+    return handle
+
+
+@_locked
+def select_cluster(row, col):
+    """
+    Resolve the cluster at (row, col) the same way /select_cluster always
+    has (neutral clusters by adjacency, player clusters by polarity).
+    Returns (handle, cluster), or (None, []) when there is nothing there.
+    """
+    if not (0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE):
+        return None, []
+    if board[row][col] == 3:
+        cluster = get_cluster(row, col)
+    else:
+        cluster = find_cluster(row, col)
+    if not cluster:
+        return None, []
+    return register_selection(cluster), cluster
+
+
+@_locked
+def resolve_selection(handle, actor_player):
+    """(cluster, moving_positions) for a live handle, or None once it is stale."""
+    entry = _selections.get(handle)
+    if entry is None or entry[0] != state_version or entry[1] != actor_player:
+        return None
+    return entry[2], entry[3]
+
+
+# Which of the four directions (and whether a rotation) the board allows
+# for a cluster, cached per position: state_version identifies the
+# position, and rebuild_indexes() clears the cache whenever the grids
+# are replaced wholesale (restores may reuse a version number). Dice,
+# turn and phase are left out; they are checked when the move is made.
+
+LEGAL_MOVES_LIMIT = 256
+
+_legal_moves = OrderedDict()  # (version, actor, cells) -> {"directions", "rotate"}
+
 
+@_locked
+def legal_moves(cluster, actor_player=None):
+    """
+    {"directions": [(dr, dc), ...], "rotate": bool} for moving `cluster`
+    as `actor_player` (default: the current player) on the current board.
+    """
+    actor = game_state["current_player"] if actor_player is None else actor_player
+    positions = [tuple(x) for x in cluster]
+    key = (state_version, actor, frozenset(positions))
+    cached = _batch is None and _legal_moves.get(key)
+    if cached:
+        metrics.inc("legal_moves_cache_total", result="hit")
+        _legal_moves.move_to_end(key)
+        return cached
+    metrics.inc("legal_moves_cache_total", result="miss")
+
+    directions = []
+    if positions and all(board[r][c] in (actor, 3) for (r, c) in positions):
+        moving = _moving_positions(positions, actor)
+        directions = [d for d in DIRECTIONS if _move_error(moving, *d) is None]
+    result = {
+        "directions": directions,
+        "rotate": _rotation_error(positions, actor)[0] is None,
+    }
+    if _batch is None:
+        _legal_moves[key] = result
+        while len(_legal_moves) > LEGAL_MOVES_LIMIT:
+            _legal_moves.popitem(last=False)
+    return result
+
+
+# ==============================================================
+#   MOVE PREVIEW
+# ==============================================================
+#
+# What each legal move of a cluster would do, without committing it.
+# Every candidate is played on the live grids through _write_cell, which
+# logs the cells it overwrites in `_undo`, and is then rolled back cell
+# by cell. The post-move rules are the engine's own, and a preview of
+# all five moves touches a few dozen cells instead of copying the grids.
+
+_undo = None  # (r, c, owner, pol, mid) before each _write_cell while previewing
+
+
+def _play_scratch(moves, actor, cluster_positions):
+    """
+    Write `moves` ((r, c) -> (nr, nc)) and run the post-move effects,
+    then undo everything. Returns the preview entry for that move.
+    """
+    global _undo
+    state = {k: dict(v) if type(v) is dict else v for k, v in game_state.items()}
+    touched = set(_touched_clusters)
+    _undo = []
+    try:
+        cells = [(board[r][c], polarities[r][c], magnet_ids[r][c]) for (r, c), _ in moves]
+        for (r, c), _ in moves:
+            _write_cell(r, c, 0, 0, 0)
+        for (_, (nr, nc)), cell in zip(moves, cells):
+            _write_cell(nr, nc, *cell)
+        moved = [(nr, nc) for _, (nr, nc) in moves if board[nr][nc] in (actor, 3)]
+        _apply_post_move_effects(moved, actor, cluster_positions, [t for _, t in moves])
+        preview = {
+            "cells": [list(t) for _, t in moves],
+            "converted": _pending_effects["converted"][:],
+            "pulls": _pending_effects["pulls"][:],
+        }
+    finally:
+        log, _undo = _undo, None
+        for r, c, owner, pol, mid in reversed(log):
+            _write_cell(r, c, owner, pol, mid)
+        game_state.clear()
+        game_state.update(state)
+        _touched_clusters.clear()
+        _touched_clusters.update(touched)
+        _pending_effects["converted"].clear()
+        _pending_effects["pulls"].clear()
+    return preview
+
+
+@_locked
+@metrics.timed("engine_seconds", op="preview_moves")
+def preview_moves(cluster, actor_player=None):
+    """
+    The outcome of every legal move of `cluster` (see legal_moves):
+    {"moves": [{"dr", "dc", "cells", "converted", "pulls"}, ...],
+     "rotate": {"cells", "converted", "pulls"} or None}. "cells" is where
+    the moved pieces end up; "converted" and "pulls" are shaped like the
+    effects of a committed change. Nothing is committed.
+    """
+    actor = game_state["current_player"] if actor_player is None else actor_player
+    positions = [tuple(x) for x in cluster]
+    legal = legal_moves(positions, actor)
+    moves = []
+    if legal["directions"]:
+        moving = _moving_positions(positions, actor)
+        for dr, dc in legal["directions"]:
+            entry = _play_scratch([((r, c), (r + dr, c + dc)) for (r, c) in moving], actor, positions)
+            moves.append({"dr": dr, "dc": dc, **entry})
+    rotate = None
+    if legal["rotate"]:
+        _, rotated = _rotation_error(positions, actor)
+        pivot, second = positions
+        rotate = _play_scratch([(pivot, pivot), (second, rotated)], actor, positions)
+    return {"moves": moves, "rotate": rotate}
 
-def ai_place_all_neutrals(threshold=4):
-    players = [1,2]
-    attempts = 0
-    max_attempts = 20000
 
-    while (game_state["neutral_counts"][1] < threshold or 
-           game_state["neutral_counts"][2] < threshold) and attempts < max_attempts:
+# ==============================================================
+#   AI NEUTRAL PLACEMENT
+# ==============================================================
 
-        for p in players:
-            if game_state["neutral_counts"][p] >= threshold:
+@functools.lru_cache(maxsize=None)
+def _neutral_anchors():
+    """
+    Static table of geometrically valid neutral anchors per player:
+    (orientation, row, col, (cell_a, cell_b)) with flat cell indices
+    row * BOARD_SIZE + col. The anchor column lies in the opponent's half
+    and no cell leaves the board or touches column 7. Built on first use,
+    so processes that never place neutrals don't pay for it at import.
+    """
+    anchors = {}
+    for player, cols in ((1, range(8, BOARD_SIZE)), (2, range(0, 7))):
+        entries = []
+        for orientation, piece in PIECES.items():
+            for row in range(BOARD_SIZE):
+                for col in cols:
+                    cells = []
+                    for (dr, dc), _ in piece:
+                        r, c = row + dr, col + dc
+                        if c == 7 or not (0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE):
+                            break
+                        cells.append(r * BOARD_SIZE + c)
+                    else:
+                        entries.append((orientation, row, col, tuple(cells)))
+        anchors[player] = entries
+    return anchors
+
+
+class NeutralAnchorPool:
+    """
+    Live set of candidate neutral anchors for one player.
+
+    Sampling draws from the live set and checks the two anchor cells
+    against the exclusion mask in O(1); anchors found blocked are dropped
+    for good, so no anchor is ever rejected twice. Because blocked cells
+    only accumulate, the accepted anchor is uniform over the valid ones.
+    """
+
+    def __init__(self, player):
+        self.anchors = _neutral_anchors()[player]
+        self.live = list(range(len(self.anchors)))
+        self.pos = list(self.live)
+
+    def _drop(self, k):
+        live, pos = self.live, self.pos
+        p = pos[k]
+        last = live.pop()
+        if last != k:
+            live[p] = last
+            pos[last] = p
+
+    def sample(self, mask, rng=random):
+        """Return a valid anchor for the current `mask`, or None."""
+        while self.live:
+            k = rng.choice(self.live)
+            anchor = self.anchors[k]
+            a, b = anchor[3]
+            if mask[a] or mask[b]:
+                self._drop(k)
                 continue
-            placed = ai_place_neutral_for_player(p)
-            attempts += 1
+            return anchor
+        return None
+
+
+def neutral_exclusion_mask(grid, min_distance=4):
+    """
+    Flat bytearray (row * BOARD_SIZE + col) marking every occupied cell and
+    every cell closer than `min_distance` (Manhattan) to a neutral tile.
+    """
+    mask = bytearray(BOARD_SIZE * BOARD_SIZE)
+    for r in range(BOARD_SIZE):
+        for c in range(BOARD_SIZE):
+            if grid[r][c] == 3:
+                mark_neutral_exclusion(mask, r, c, min_distance)
+            elif grid[r][c] != 0:
+                mask[r * BOARD_SIZE + c] = 1
+    return mask
+
+
+def _exclusion_spans(min_distance):
+    """Per flat cell, the (lo, hi, fill) row slices of its exclusion diamond."""
+    spans = _EXCLUSION_SPANS.get(min_distance)
+    if spans is None:
+        reach = min_distance - 1
+        spans = []
+        for r0 in range(BOARD_SIZE):
+            for c0 in range(BOARD_SIZE):
+                cell = []
+                for dr in range(-reach, reach + 1):
+                    r = r0 + dr
+                    if not (0 <= r < BOARD_SIZE):
+                        continue
+                    span = reach - abs(dr)
+                    lo = r * BOARD_SIZE + max(0, c0 - span)
+                    hi = r * BOARD_SIZE + min(BOARD_SIZE - 1, c0 + span) + 1
+                    cell.append((lo, hi, b"\x01" * (hi - lo)))
+                spans.append(cell)
+        _EXCLUSION_SPANS[min_distance] = spans
+    return spans
+
+
+_EXCLUSION_SPANS = {}
+
+
+def mark_neutral_exclusion(mask, r0, c0, min_distance=4):
+    """Mark the diamond of cells within `min_distance - 1` of (r0, c0)."""
+    for lo, hi, fill in _exclusion_spans(min_distance)[r0 * BOARD_SIZE + c0]:
+        mask[lo:hi] = fill
+
+
+def plan_neutral_layout(grid, counts=None, threshold=4, min_distance=4, rng=random):
+    """
+    Choose neutral placements for both players without touching `grid`.
+
+    Players alternate, each drawing uniformly from its valid anchors, until
+    both reach `threshold` pieces or run out of anchors. `counts` is how
+    many neutrals each player already has. Returns a list of
+    (player, orientation, row, col) in placement order.
+    """
+    counts = dict(counts or {1: 0, 2: 0})
+    mask = neutral_exclusion_mask(grid, min_distance)
+    pools = {p: NeutralAnchorPool(p) for p in (1, 2)}
+    placements = []
+
+    while counts[1] < threshold or counts[2] < threshold:
+        placed_any = False
+        for p in (1, 2):
+            if counts[p] >= threshold:
+                continue
+            anchor = pools[p].sample(mask, rng)
+            if anchor is None:
+                continue
+            orientation, row, col, _ = anchor
+            for (dr, dc), _ in PIECES[orientation]:
+                mark_neutral_exclusion(mask, row + dr, col + dc, min_distance)
+            placements.append((p, orientation, row, col))
+            counts[p] += 1
+            placed_any = True
+        if not placed_any:
+            # No valid anchors left for the remaining pieces
+            break
+
+    return placements
+
+
+def ai_place_neutral_for_player(player, min_distance=4, mask=None, pool=None, rng=None):
+    """
+    Place one neutral piece for `player`.
+
+    Samples uniformly from the valid anchors, the same layout distribution
+    the old rejection sampler produced, but each check is two mask lookups
+    instead of a full-board distance scan. `mask` and `pool` may be passed
+    in to reuse them across placements; both are updated in place.
+    """
+    if mask is None:
+        mask = neutral_exclusion_mask(board, min_distance)
+    if pool is None:
+        pool = NeutralAnchorPool(player)
+
+    anchor = pool.sample(mask, rng or game_rng("neutrals"))
+    if anchor is None:
+        return False
+
+    orientation, row, col, _ = anchor
+    piece = PIECES[orientation]
+    place_piece(piece, row, col, 3)
+    for (dr, dc), _ in piece:
+        mark_neutral_exclusion(mask, row + dr, col + dc, min_distance)
+    game_state["neutral_counts"][player] += 1
+    return True
+
+
+@metrics.timed("engine_seconds", op="place_neutrals")
+def ai_place_all_neutrals(threshold=4, min_distance=4, rng=None):
+    layout = plan_neutral_layout(board, game_state["neutral_counts"], threshold, min_distance,
+                                 rng or game_rng("neutrals"))
+    for player, orientation, row, col in layout:
+        place_piece(PIECES[orientation], row, col, 3)
+        game_state["neutral_counts"][player] += 1
 
-    # Compute neutral clusters
     if (game_state["neutral_counts"][1] >= threshold and 
         game_state["neutral_counts"][2] >= threshold):
+        start_main_phase()
 
-        visited = set()
-        total = 0
-        initial_clusters = []
 
-        for r in range(BOARD_SIZE):
-            for c in range(BOARD_SIZE):
-                if board[r][c] == 3 and (r, c) not in visited:
-                    cluster = get_cluster(r, c)
-                    coords = [tuple(x) for x in cluster]
-                    for (rr,cc) in coords:
-                        visited.add((rr,cc))
-                    total += 1
-                    initial_clusters.append(frozenset(coords))
+def start_main_phase():
+    """Group the placed neutrals into the initial clusters and enter the main phase."""
+    visited = set()
+    total = 0
+    initial_clusters = []
 
-        game_state["total_neutral_clusters"] = total
-        game_state["initial_neutral_clusters"] = initial_clusters
-        game_state["neutral_cluster_owners"] = {i: None for i in range(len(initial_clusters))}
-        game_state["phase"] = "main"
-        game_state["current_player"] = 1
-        game_state["main_turns"] = 0
+    for r in range(BOARD_SIZE):
+        for c in range(BOARD_SIZE):
+            if board[r][c] == 3 and (r, c) not in visited:
+                cluster = get_cluster(r, c)
+                coords = [tuple(x) for x in cluster]
+                for (rr,cc) in coords:
+                    visited.add((rr,cc))
+                total += 1
+                initial_clusters.append(frozenset(coords))
+
+    game_state["total_neutral_clusters"] = total
+    game_state["initial_neutral_clusters"] = initial_clusters
+    game_state["neutral_cluster_owners"] = {i: None for i in range(len(initial_clusters))}
+    game_state["phase"] = "main"
+    game_state["current_player"] = 1
+    game_state["main_turns"] = 0
+    rebuild_indexes()
+
+
+@_locked
+def load_start_position(homes, neutrals, seed=None):
+    """
+    Reset the board and set up a pre-generated start position directly,
+    skipping the toggle_piece setup flow.
+
+    homes:    {player: (row, col, orientation)}
+    neutrals: [(player, orientation, row, col), ...] as returned by
+              plan_neutral_layout
+    seed:     seed of the game's random streams (see seed_game)
+    """
+    reset_board(seed)
+    for player in (1, 2):
+        row, col, orientation = homes[player]
+        place_piece(PIECES[orientation], row, col, player)
+        game_state["homes"][player] = (row, col, orientation)
+    for player, orientation, row, col in neutrals:
+        place_piece(PIECES[orientation], row, col, 3)
+        game_state["neutral_counts"][player] += 1
+    start_main_phase()
+    _commit("load")
 
 
 # ==============================================================
 #   STEAL MECHANICS
 # ==============================================================
 
+def _home_cells(player):
+    """Cells of `player`'s home piece (empty before it is placed)."""
+    home_info = game_state.get("homes", {}).get(player)
+    if not home_info:
+        return frozenset()
+    return _piece_cells(*home_info)
+
+
+@functools.lru_cache(maxsize=None)
+def _piece_cells(row, col, orientation):
+    return frozenset((row + dr, col + dc) for (dr, dc), _ in PIECES[orientation])
+
+
+def _is_stealable(player, r, c):
+    """Whether the opponent's piece at (r, c) may be stolen by `player`, given `player` has pieces."""
+    opponent = 2 if player == 1 else 1
+    return (board[r][c] == opponent and polarities[r][c] != 0
+            and (r, c) not in _home_cells(opponent))
+
+
+@_locked
+@metrics.timed("engine_seconds", op="stealable_neutrals")
 def get_stealable_neutrals_for_player(player):
     """
     Return opponent-owned cells that can be stolen by `player`.
@@ -834,47 +1634,103 @@ def get_stealable_neutrals_for_player(player):
     Stealing rules:
     - Can steal ANY opponent piece EXCEPT their home piece
     - Player must have at least one piece on the board
-    - Opponent piece must have a polarity ('+' or '-')
+    - Opponent piece must have a polarity (PLUS or MINUS)
     
-    Returns list of (row, col) tuples for all opponent pieces.
+    Returns list of (row, col) tuples for all opponent pieces, in row-major
+    order. Reads the opponent's indexed cells rather than scanning the board.
     """
     opponent = 2 if player == 1 else 1
-    res = []
-    
-    # Check if player has any pieces on the board
-    player_has_pieces = False
-    for r in range(BOARD_SIZE):
-        for c in range(BOARD_SIZE):
-            if board[r][c] == player:
-                player_has_pieces = True
-                break
-        if player_has_pieces:
-            break
-    
-    if not player_has_pieces:
+    if not count_pieces(player):
         return []
-    
-    # Get opponent's home piece coordinates to exclude them
-    home_info = game_state.get("homes", {}).get(opponent)
-    home_cells = set()
-    if home_info:
-        home_row, home_col, home_orientation = home_info
-        piece_offsets = PIECES[home_orientation]
-        for (dr, dc), _ in piece_offsets:
-            home_cells.add((home_row + dr, home_col + dc))
-    
-    # Return all opponent pieces with polarity (excluding home pieces)
-    for r in range(BOARD_SIZE):
-        for c in range(BOARD_SIZE):
-            if board[r][c] == opponent and (r, c) not in home_cells:
-                pol = polarities[r][c]
-                if pol in ('+', '-'):
-                    res.append((r, c))
-    
-    return res
+    return sorted(cell for cell in _player_cells[opponent] if _is_stealable(player, *cell))
+
 
+def _magnet_partner(r, c, likely_cells=()):
+    """
+    The other cell carrying (r, c)'s magnet id. Halves of a magnet are
+    usually adjacent, or at least share an owner, so those cells are
+    tried before falling back to a board scan.
+    """
+    mid = magnet_ids[r][c]
+    for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+        pr, pc = r + dr, c + dc
+        if 0 <= pr < BOARD_SIZE and 0 <= pc < BOARD_SIZE and magnet_ids[pr][pc] == mid:
+            return (pr, pc)
+    for (pr, pc) in likely_cells:
+        if (pr, pc) != (r, c) and magnet_ids[pr][pc] == mid:
+            return (pr, pc)
+    for pr in range(BOARD_SIZE):
+        for pc in range(BOARD_SIZE):
+            if (pr, pc) != (r, c) and magnet_ids[pr][pc] == mid:
+                return (pr, pc)
+    return None
+
+
+def _steal_frontier(player, source_cells):
+    """Cells a stolen magnet may land on: free (or vacated by the steal) and next to `player`'s pieces."""
+    frontier = set()
+    for (r, c) in _player_cells[player]:
+        for dr, dc in _NEIGHBORS:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < BOARD_SIZE and 0 <= nc < BOARD_SIZE and (board[nr][nc] == 0 or (nr, nc) in source_cells):
+                frontier.add((nr, nc))
+    return frontier
+
+
+def _steal_partner_cells(tr, tc, source_cells):
+    """Free neighbors of a steal target, in the order steals try them."""
+    out = []
+    for dr, dc in _NEIGHBORS:
+        pr, pc = tr + dr, tc + dc
+        if 0 <= pr < BOARD_SIZE and 0 <= pc < BOARD_SIZE and (board[pr][pc] == 0 or (pr, pc) in source_cells):
+            out.append((pr, pc))
+    return out
+
+
+def _placed_orientation(plus_cell, minus_cell):
+    offset = (minus_cell[0] - plus_cell[0], minus_cell[1] - plus_cell[1])
+    for orientation, (_, ((dr, dc), _)) in PIECES.items():
+        if (dr, dc) == offset:
+            return orientation
+    return None
+
+
+@_locked
+def get_steal_placements(player, source):
+    """
+    Every way `player` could place the opponent magnet at `source` if
+    they stole it: a list of (target, partner_target, orientation), where
+    the source half lands on target, the other half on partner_target,
+    and orientation is the PIECES orientation of the placed magnet.
+    Sorted by target; empty when `source` can't be stolen.
+
+    Targets come from the frontier of cells next to `player`'s pieces,
+    so this costs O(player pieces), not a trial steal per board cell.
+    """
+    sr, sc = source
+    if not (count_pieces(player) and 0 <= sr < BOARD_SIZE and 0 <= sc < BOARD_SIZE
+            and _is_stealable(player, sr, sc)):
+        return []
+    opponent = 2 if player == 1 else 1
+    partner = _magnet_partner(sr, sc, _player_cells[opponent])
+    if partner is None or board[partner[0]][partner[1]] != opponent:
+        return []
+    source_cells = {(sr, sc), partner}
+    source_is_plus = polarities[sr][sc] == PLUS
+    placements = []
+    for target in sorted(_steal_frontier(player, source_cells)):
+        for partner_target in _steal_partner_cells(*target, source_cells):
+            if source_is_plus:
+                orientation = _placed_orientation(target, partner_target)
+            else:
+                orientation = _placed_orientation(partner_target, target)
+            placements.append((target, partner_target, orientation))
+    return placements
 
-def steal_and_place_magnet(actor_player, source, target):
+
+@_locked
+@metrics.timed("engine_seconds", op="steal")
+def steal_and_place_magnet(actor_player, source, target, partner_target=None):
     """
     Steal an opponent's magnet and place it at the target location.
     
@@ -882,6 +1738,9 @@ def steal_and_place_magnet(actor_player, source, target):
         actor_player: The player stealing (1 or 2)
         source: (row, col) of the opponent piece to steal
         target: (row, col) where to place the stolen magnet
+        partner_target: (row, col) next to target for the magnet's other
+            half; defaults to the first free neighbor of target
+            (see get_steal_placements for all choices)
     
     Returns:
         (success, message, moved_cells)
@@ -895,39 +1754,23 @@ def steal_and_place_magnet(actor_player, source, target):
     opponent = 2 if actor_player == 1 else 1
     
     # Check if source is a home piece - cannot steal home pieces
-    home_info = game_state.get("homes", {}).get(opponent)
-    if home_info:
-        home_row, home_col, home_orientation = home_info
-        piece_offsets = PIECES[home_orientation]
-        for (dr, dc), _ in piece_offsets:
-            if (home_row + dr, home_col + dc) == source:
-                return False, "Cannot steal opponent's home piece", []
-
-    eligible = get_stealable_neutrals_for_player(actor_player)
-    if not eligible:
-        return False, "No eligible pieces to steal", []
-
-    if source not in eligible:
-        return False, "Requested piece not eligible for stealing", []
+    if tuple(source) in _home_cells(opponent):
+        return False, "Cannot steal opponent's home piece", []
 
     sr, sc = source
     tr, tc = target
 
+    if not (count_pieces(actor_player) and 0 <= sr < BOARD_SIZE and 0 <= sc < BOARD_SIZE
+            and _is_stealable(actor_player, sr, sc)):
+        if not get_stealable_neutrals_for_player(actor_player):
+            return False, "No eligible pieces to steal", []
+        return False, "Requested piece not eligible for stealing", []
+
     # Find the partner cell of the source magnet using magnet ID
     source_pol = polarities[sr][sc]
     source_magnet_id = magnet_ids[sr][sc]
-    partner = None
-    partner_pol = None
-    
-    # Find the cell with the same magnet ID (the other half of the 2x1 magnet)
-    for r in range(BOARD_SIZE):
-        for c in range(BOARD_SIZE):
-            if (r, c) != (sr, sc) and magnet_ids[r][c] == source_magnet_id:
-                partner = (r, c)
-                partner_pol = polarities[r][c]
-                break
-        if partner:
-            break
+    partner = _magnet_partner(sr, sc, _player_cells[opponent])
+    partner_pol = polarities[partner[0]][partner[1]] if partner else None
     
     if not partner:
         return False, "Could not find partner cell for magnet", []
@@ -951,7 +1794,7 @@ def steal_and_place_magnet(actor_player, source, target):
         if 0 <= ar < BOARD_SIZE and 0 <= ac < BOARD_SIZE:
             if board[ar][ac] == actor_player:
                 adj_pol = polarities[ar][ac]
-                if adj_pol in ('+','-'):
+                if adj_pol:
                     # Target cell needs opposite polarity to connect
                     target_adjacent_valid = True
                     # We'll place source_pol at target if it's opposite to adjacent
@@ -965,62 +1808,157 @@ def steal_and_place_magnet(actor_player, source, target):
     # Determine orientation: which cell goes to target, which goes to partner location
     # We place source magnet at target, and need to find valid spot for partner
     # Partner must be adjacent to target
-    partner_target = None
-    for dr, dc in [(1,0),(-1,0),(0,1),(0,-1)]:
-        pr, pc = tr+dr, tc+dc
-        if 0 <= pr < BOARD_SIZE and 0 <= pc < BOARD_SIZE:
-            if board[pr][pc] == 0 or (pr, pc) in source_cells:
-                partner_target = (pr, pc)
-                break
-    
-    if not partner_target:
+    partner_cells = _steal_partner_cells(tr, tc, source_cells)
+    if not partner_cells:
         return False, "No space for partner cell near target", []
+    if partner_target is None:
+        partner_target = partner_cells[0]
+    elif tuple(partner_target) not in partner_cells:
+        return False, "Partner cell must go on a free cell next to the target", []
+    partner_target = tuple(partner_target)
 
     # Clear source cells
     global next_magnet_id
-    board[sr][sc] = 0
-    polarities[sr][sc] = ""
-    magnet_ids[sr][sc] = 0
-    board[partner[0]][partner[1]] = 0
-    polarities[partner[0]][partner[1]] = ""
-    magnet_ids[partner[0]][partner[1]] = 0
+    _write_cell(sr, sc, 0, 0, 0)
+    _write_cell(partner[0], partner[1], 0, 0, 0)
 
     # Assign new magnet ID for the stolen magnet
     new_magnet_id = next_magnet_id
     next_magnet_id += 1
 
     # Place stolen magnet at target with new ID
-    board[tr][tc] = actor_player
-    polarities[tr][tc] = source_pol
-    magnet_ids[tr][tc] = new_magnet_id
-    board[partner_target[0]][partner_target[1]] = actor_player
-    polarities[partner_target[0]][partner_target[1]] = partner_pol
-    magnet_ids[partner_target[0]][partner_target[1]] = new_magnet_id
+    _write_cell(tr, tc, actor_player, source_pol, new_magnet_id)
+    _write_cell(partner_target[0], partner_target[1], actor_player, partner_pol, new_magnet_id)
 
     moved_cells = [(tr, tc), partner_target]
 
     # Update cluster ownership
-    for idx, cl in enumerate(game_state.get("initial_neutral_clusters", [])):
-        owners = set(board[r][c] for (r,c) in cl)
-        owners.discard(0)
-        owners.discard(3)
-
-        if len(owners) == 1:
-            owner = owners.pop()
-            prev = game_state["neutral_cluster_owners"].get(idx)
-            if prev != owner:
-                if prev in (1,2):
-                    game_state["acquired_clusters"][prev] -= 1
-
-                game_state["neutral_cluster_owners"][idx] = owner
-                game_state["acquired_clusters"][owner] += 1
-                game_state["last_cluster_acquirer"] = owner
+    _settle_cluster_owners(mark_acquirer=True)
 
     check_winner()
 
+    # the steal right is used up; cleared before the commit so the log agrees
+    game_state["steal_allowed_player"] = None
+    _commit("steal", actor_player, (sr, sc), (tr, tc), partner_target)
     return True, f"Stole opponent magnet to ({tr},{tc}).", moved_cells
 
 
+# ==============================================================
+#   CLUSTER OWNERSHIP ACCOUNTING
+# ==============================================================
+#
+# Every cell of an initial neutral cluster maps to that cluster
+# (`_cell_cluster`), and each cluster counts the player pieces on its
+# cells. Owner changes on those cells update the counts and mark the
+# cluster touched, so settling ownership after a conversion or a steal
+# looks only at the touched clusters instead of rescanning all of them.
+# Untouched clusters would settle exactly as they did last time.
+#
+# The same hook keeps the set of cells each player owns, so piece counts
+# and steal targets come from a player's own pieces, not a board scan.
+
+_cell_cluster = [-1] * (BOARD_SIZE * BOARD_SIZE)
+_cluster_counts = []      # per initial cluster: [unused, pieces of player 1, pieces of player 2]
+_touched_clusters = set()
+_indexed_clusters = None  # the initial_neutral_clusters list the index was built for
+_player_cells = {1: set(), 2: set()}
+
+
+def rebuild_indexes():
+    """
+    Rebuild the board indexes from the grids and game_state. Needed only
+    after replacing or editing them directly rather than through the
+    engine (restoring a snapshot, setting up a test position).
+    """
+    global _cluster_counts, _indexed_clusters
+    clusters = game_state.get("initial_neutral_clusters", [])
+    _cell_cluster[:] = [-1] * (BOARD_SIZE * BOARD_SIZE)
+    _cluster_counts = [[0, 0, 0] for _ in clusters]
+    for player in (1, 2):
+        _player_cells[player].clear()
+    for r in range(BOARD_SIZE):
+        for c in range(BOARD_SIZE):
+            if board[r][c] in (1, 2):
+                _player_cells[board[r][c]].add((r, c))
+    for idx, cluster in enumerate(clusters):
+        for (r, c) in cluster:
+            _cell_cluster[r * BOARD_SIZE + c] = idx
+            owner = board[r][c]
+            if owner in (1, 2):
+                _cluster_counts[idx][owner] += 1
+    # the first settle after a rebuild checks every cluster once
+    _touched_clusters.clear()
+    _touched_clusters.update(range(len(clusters)))
+    _indexed_clusters = clusters
+    _legal_moves.clear()
+
+
+def _owner_changed(r, c, old, new):
+    if old in (1, 2):
+        _player_cells[old].discard((r, c))
+    if new in (1, 2):
+        _player_cells[new].add((r, c))
+    idx = _cell_cluster[r * BOARD_SIZE + c]
+    if idx >= 0 and (old in (1, 2) or new in (1, 2)):
+        counts = _cluster_counts[idx]
+        if old in (1, 2):
+            counts[old] -= 1
+        if new in (1, 2):
+            counts[new] += 1
+        _touched_clusters.add(idx)
+
+
+def _write_cell(r, c, owner, pol, mid):
+    """Set one cell in place, keeping the indexes current."""
+    old = board[r][c]
+    if _undo is not None:
+        _undo.append((r, c, old, polarities[r][c], magnet_ids[r][c]))
+    board[r][c] = owner
+    polarities[r][c] = pol
+    magnet_ids[r][c] = mid
+    if old != owner:
+        _owner_changed(r, c, old, owner)
+
+
+def _note_owner_changes(old_grid, cells):
+    """Index the owner changes at `cells` after `board` was replaced by an edited copy of `old_grid`."""
+    for (r, c) in cells:
+        old, new = old_grid[r][c], board[r][c]
+        if old != new:
+            _owner_changed(r, c, old, new)
+
+
+def _settle_cluster_owners(mark_acquirer):
+    """
+    Give each touched initial cluster to the one player whose pieces are
+    on it (if exactly one), updating neutral_cluster_owners and
+    acquired_clusters. `mark_acquirer` also records last_cluster_acquirer.
+    """
+    if _indexed_clusters is not game_state.get("initial_neutral_clusters"):
+        rebuild_indexes()  # game_state was swapped out from under us
+    owners = game_state["neutral_cluster_owners"]
+    acquired = game_state["acquired_clusters"]
+    for idx in sorted(_touched_clusters):
+        _, n1, n2 = _cluster_counts[idx]
+        if bool(n1) == bool(n2):
+            continue  # nobody, or both players, on the cluster
+        owner = 1 if n1 else 2
+        prev = owners.get(idx)
+        if prev != owner:
+            if prev in (1, 2):
+                acquired[prev] -= 1
+            owners[idx] = owner
+            acquired[owner] += 1
+            if mark_acquirer:
+                game_state["last_cluster_acquirer"] = owner
+    _touched_clusters.clear()
+
+
+def count_pieces(player):
+    """Number of cells `player` owns."""
+    return len(_player_cells[player])
+
+
 # ==============================================================
 #   WINNING LOGIC
 # ==============================================================
@@ -0,0 +1,302 @@
+"""
+Compact binary position encoding for FluxWars
+
+A position (owner, polarity and magnet-id planes plus every game_state
+field, dice and next_magnet_id) packs into about 130 bytes, or 150 with
+the initial neutral clusters, instead of ~3 KB of JSON. Used by the game
+store and the binary /sync transport.
+
+Layout (little endian, FORMAT_VERSION 1):
+
+    header   u8 version, u8 board size, u8 flags
+    state    14 bytes of packed scalar fields (see _STATE)
+    homes    2 x u16: present << 15 | orientation index << 8 | row << 4 | col
+    owners   2 bits per neutral cluster (0 = none, 1, 2)
+    plane    2 bits per cell: owner 0..3
+    plane    1 bit per cell: 1 = MINUS (only meaningful on occupied cells)
+    ids      magnet id of each occupied cell in row-major order
+             (u8, or u16 with FLAG_WIDE_IDS)
+    static   only with FLAG_STATIC: initial neutral clusters as
+             u8 count, then per cluster u8 size + u8 cell indices
+
+Both planes are fixed-width, so PositionView reads any cell straight from
+the buffer without decoding the rest.
+
+    data = encode_live()
+    view = PositionView(data)
+    view.owner(4, 3), view.polarity(4, 3), view.state["phase"]
+    decode_position(data)  # -> dict of engine-shaped grids and state
+"""
+
+import struct
+
+import board as board_module
+from board import BOARD_SIZE, MINUS, PLUS, empty_polarities
+
+FORMAT_VERSION = 1
+
+FLAG_STATIC = 0x01
+FLAG_WIDE_IDS = 0x02
+
+CELLS = BOARD_SIZE * BOARD_SIZE
+OWNER_BYTES = (CELLS * 2 + 7) // 8
+POLARITY_BYTES = (CELLS + 7) // 8
+
+PHASES = ("home_setup", "neutral_setup", "main", "ended")
+DIFFICULTIES = ("easy", "normal", "expert")
+ORIENTATIONS = (0, 90, 180, 270)
+
+_HEADER = struct.Struct("<BBB")
+# b0: current_player | phase << 2 | winner << 4
+# b1: dice | last_cluster_acquirer << 3 | steal_allowed_player << 5
+# main_turns, max_main_turns, acquired 1/2, neutral_counts 1/2,
+# total_neutral_clusters, settings (vs_ai | difficulty << 1 | ai_player << 3),
+# next_magnet_id (u16), neutral cluster count (u8)
+_STATE = struct.Struct("<BBBBBBBBBBHB")
+_HOMES = struct.Struct("<HH")
+_FIXED = _HEADER.size + _STATE.size + _HOMES.size
+
+
+def _player(value):
+    return value if value in (1, 2) else 0
+
+
+def _difficulty(value):
+    """Unknown difficulties (settings saved before they were validated) encode as "normal"."""
+    return DIFFICULTIES.index(value if value in DIFFICULTIES else "normal")
+
+
+def _winner_code(winner):
+    if winner in (1, 2):
+        return winner
+    return 3 if winner == "draw" else 0
+
+
+# ==============================================================
+#   ENCODE
+# ==============================================================
+
+def encode_position(grid, pols, ids, next_id, state, dice, static=True):
+    """Pack a position into bytes. `static` includes the initial neutral clusters."""
+    owners = state.get("neutral_cluster_owners", {})
+    n_clusters = len(owners)
+    wide = next_id > 0xFF
+    flags = (FLAG_STATIC if static else 0) | (FLAG_WIDE_IDS if wide else 0)
+
+    out = bytearray(_HEADER.pack(FORMAT_VERSION, BOARD_SIZE, flags))
+    out += _STATE.pack(
+        _player(state["current_player"]) | PHASES.index(state["phase"]) << 2 | _winner_code(state.get("winner")) << 4,
+        dice | _player(state.get("last_cluster_acquirer")) << 3 | _player(state.get("steal_allowed_player")) << 5,
+        state.get("main_turns", 0),
+        state.get("max_main_turns", 4),
+        state["acquired_clusters"][1],
+        state["acquired_clusters"][2],
+        state["neutral_counts"][1],
+        state["neutral_counts"][2],
+        state.get("total_neutral_clusters", 0),
+        bool(state.get("vs_ai")) | _difficulty(state.get("ai_difficulty")) << 1
+        | _player(state.get("ai_player")) << 3,
+        next_id,
+        n_clusters,
+    )
+    homes = []
+    for player in (1, 2):
+        home = state["homes"].get(player)
+        if home is None:
+            homes.append(0)
+        else:
+            row, col, orientation = home
+            homes.append(1 << 15 | ORIENTATIONS.index(orientation) << 8 | row << 4 | col)
+    out += _HOMES.pack(*homes)
+
+    packed = 0
+    for i in range(n_clusters):
+        packed |= _player(owners.get(i)) << (2 * i)
+    out += packed.to_bytes((n_clusters * 2 + 7) // 8, "little")
+
+    owner_bits = 0
+    pol_bits = 0
+    occupied_ids = []
+    i = 0
+    for grid_row, pol_row, id_row in zip(grid, pols, ids):
+        for owner, pol, mid in zip(grid_row, pol_row, id_row):
+            if owner:
+                owner_bits |= owner << (2 * i)
+                if pol < 0:
+                    pol_bits |= 1 << i
+                occupied_ids.append(mid)
+            i += 1
+    out += owner_bits.to_bytes(OWNER_BYTES, "little")
+    out += pol_bits.to_bytes(POLARITY_BYTES, "little")
+    out += struct.pack(f"<{len(occupied_ids)}{'H' if wide else 'B'}", *occupied_ids)
+
+    if static:
+        clusters = state.get("initial_neutral_clusters", [])
+        out.append(len(clusters))
+        for cluster in clusters:
+            cells = sorted(r * BOARD_SIZE + c for (r, c) in cluster)
+            out.append(len(cells))
+            out += bytes(cells)
+    return bytes(out)
+
+
+def encode_live(static=True):
+    """Encode the game currently held in board.py."""
+    b = board_module
+    return encode_position(b.board, b.polarities, b.magnet_ids, b.next_magnet_id,
+                           b.game_state, b.dice_value, static)
+
+
+# ==============================================================
+#   DECODE
+# ==============================================================
+
+class PositionView:
+    """
+    Read-only view over an encoded position. Cells are read straight
+    from the underlying buffer (bytes, bytearray, mmap slice ...) and
+    nothing is decoded until asked for.
+    """
+
+    __slots__ = ("buf", "flags", "_planes", "_pol", "_ids", "_id_index", "_state")
+
+    def __init__(self, buf):
+        self.buf = memoryview(buf)
+        version, size, self.flags = _HEADER.unpack_from(self.buf)
+        if version != FORMAT_VERSION or size != BOARD_SIZE:
+            raise ValueError(f"unsupported position encoding v{version} size {size}")
+        n_clusters = self.buf[_FIXED - 1 - _HOMES.size]
+        self._planes = _FIXED + (n_clusters * 2 + 7) // 8
+        self._pol = self._planes + OWNER_BYTES
+        self._ids = self._pol + POLARITY_BYTES
+        self._id_index = None
+        self._state = None
+
+    def owner(self, r, c):
+        i = r * BOARD_SIZE + c
+        return (self.buf[self._planes + (i >> 2)] >> ((i & 3) * 2)) & 3
+
+    def polarity(self, r, c):
+        """PLUS, MINUS, or 0 on an empty cell."""
+        if not self.owner(r, c):
+            return 0
+        i = r * BOARD_SIZE + c
+        return MINUS if (self.buf[self._pol + (i >> 3)] >> (i & 7)) & 1 else PLUS
+
+    def magnet_id(self, r, c):
+        if self._id_index is None:
+            self._index_ids()
+        return self._id_index.get(r * BOARD_SIZE + c, 0)
+
+    def _index_ids(self):
+        occupied = [i for i in range(CELLS) if (self.buf[self._planes + (i >> 2)] >> ((i & 3) * 2)) & 3]
+        fmt = "H" if self.flags & FLAG_WIDE_IDS else "B"
+        values = struct.unpack_from(f"<{len(occupied)}{fmt}", self.buf, self._ids)
+        self._id_index = dict(zip(occupied, values))
+
+    @property
+    def size(self):
+        """Encoded length in bytes."""
+        if self._id_index is None:
+            self._index_ids()
+        width = 2 if self.flags & FLAG_WIDE_IDS else 1
+        end = self._ids + width * len(self._id_index)
+        if self.flags & FLAG_STATIC:
+            count = self.buf[end]
+            end += 1
+            for _ in range(count):
+                end += 1 + self.buf[end]
+        return end
+
+    @property
+    def state(self):
+        if self._state is None:
+            self._state = self._decode_state()
+        return self._state
+
+    @property
+    def dice(self):
+        return self.buf[_HEADER.size + 1] & 7
+
+    @property
+    def next_magnet_id(self):
+        return _STATE.unpack_from(self.buf, _HEADER.size)[10]
+
+    def _decode_state(self):
+        (b0, b1, main_turns, max_turns, acq1, acq2, nc1, nc2, total, settings,
+         _, n_clusters) = _STATE.unpack_from(self.buf, _HEADER.size)
+        winner = (None, 1, 2, "draw")[b0 >> 4 & 7]
+        homes = {}
+        for player, packed in zip((1, 2), _HOMES.unpack_from(self.buf, _HEADER.size + _STATE.size)):
+            homes[player] = (packed >> 4 & 15, packed & 15, ORIENTATIONS[packed >> 8 & 3]) if packed >> 15 else None
+        owners_bits = int.from_bytes(self.buf[_FIXED:self._planes], "little")
+        owners = {i: (owners_bits >> (2 * i) & 3) or None for i in range(n_clusters)}
+        return {
+            "current_player": b0 & 3,
+            "phase": PHASES[b0 >> 2 & 3],
+            "homes": homes,
+            "neutral_counts": {1: nc1, 2: nc2},
+            "acquired_clusters": {1: acq1, 2: acq2},
+            "last_cluster_acquirer": (b1 >> 3 & 3) or None,
+            "total_neutral_clusters": total,
+            "initial_neutral_clusters": self.initial_neutral_clusters(),
+            "neutral_cluster_owners": owners,
+            "steal_allowed_player": (b1 >> 5 & 3) or None,
+            "winner": winner,
+            "main_turns": main_turns,
+            "max_main_turns": max_turns,
+            "vs_ai": bool(settings & 1),
+            "ai_difficulty": DIFFICULTIES[settings >> 1 & 3],
+            "ai_player": settings >> 3 & 3,
+        }
+
+    def initial_neutral_clusters(self):
+        """Frozensets of (row, col); empty unless encoded with static=True."""
+        if not self.flags & FLAG_STATIC:
+            return []
+        if self._id_index is None:
+            self._index_ids()
+        width = 2 if self.flags & FLAG_WIDE_IDS else 1
+        pos = self._ids + width * len(self._id_index)
+        clusters = []
+        for _ in range(self.buf[pos]):
+            size = self.buf[pos + 1]
+            cells = self.buf[pos + 2:pos + 2 + size]
+            clusters.append(frozenset(divmod(i, BOARD_SIZE) for i in cells))
+            pos += 1 + size
+        return clusters
+
+    def grids(self):
+        """(board, polarities, magnet_ids) shaped like the engine's planes."""
+        owner_bits = int.from_bytes(self.buf[self._planes:self._pol], "little")
+        pol_bits = int.from_bytes(self.buf[self._pol:self._ids], "little")
+        if self._id_index is None:
+            self._index_ids()
+        ids_at = self._id_index
+        grid, pols, ids = [], empty_polarities(), []
+        for r in range(BOARD_SIZE):
+            grid_row, pol_row, id_row = [], pols[r], []
+            for c in range(BOARD_SIZE):
+                i = r * BOARD_SIZE + c
+                owner = owner_bits >> (2 * i) & 3
+                grid_row.append(owner)
+                if owner:
+                    pol_row[c] = MINUS if pol_bits >> i & 1 else PLUS
+                id_row.append(ids_at.get(i, 0))
+            grid.append(grid_row)
+            ids.append(id_row)
+        return grid, pols, ids
+
+
+def decode_position(buf):
+    """Decode into {"board", "polarities", "magnet_ids", "next_magnet_id", "state", "dice"}."""
+    view = PositionView(buf)
+    grid, pols, ids = view.grids()
+    return {
+        "board": grid,
+        "polarities": pols,
+        "magnet_ids": ids,
+        "next_magnet_id": view.next_magnet_id,
+        "state": view.state,
+        "dice": view.dice,
+    }
@@ -0,0 +1,86 @@
+"""
+Server-sent events broadcaster for FluxWars
+
+Each connected browser holds one subscriber queue. publish() encodes an
+event once and drops the frame into every queue; the /events route in
+app.py drains its queue as a text/event-stream response. A client that
+falls too far behind gets its backlog replaced by a single "resync"
+event and reloads a full snapshot from /sync.
+
+    q = events.subscribe()
+    events.publish("board", {...}, event_id=version)
+    return Response(events.stream(q), mimetype="text/event-stream")
+"""
+
+import json
+import queue
+import threading
+
+MAX_PENDING = 256
+HEARTBEAT_SECONDS = 15
+
+_subscribers = set()
+_lock = threading.Lock()
+
+
+def format_event(event, data, event_id=None):
+    """One SSE frame: optional id, event name and a single-line JSON payload."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def subscribe():
+    q = queue.Queue(maxsize=MAX_PENDING)
+    with _lock:
+        _subscribers.add(q)
+    return q
+
+
+def unsubscribe(q):
+    with _lock:
+        _subscribers.discard(q)
+
+
+def subscriber_count():
+    return len(_subscribers)
+
+
+def publish(event, data, event_id=None):
+    """Send an event to every subscriber. Returns the number reached."""
+    if not _subscribers:
+        return 0
+    frame = format_event(event, data, event_id)
+    with _lock:
+        targets = list(_subscribers)
+    for q in targets:
+        try:
+            q.put_nowait(frame)
+        except queue.Full:
+            # Slow client: throw away its backlog and ask it to resync
+            # (again if another publisher refilled the queue in between)
+            while True:
+                while True:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        break
+                try:
+                    q.put_nowait(format_event("resync", {}))
+                    break
+                except queue.Full:
+                    continue
+    return len(targets)
+
+
+def stream(q, *first_frames):
+    """Generator for a streaming response; unsubscribes when the client goes away."""
+    try:
+        for frame in first_frames:
+            yield frame
+        while True:
+            try:
+                yield q.get(timeout=HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+    finally:
+        unsubscribe(q)
@@ -0,0 +1,311 @@
+"""
+LLM provider client for the expert AI
+
+One client per provider and API key is built on first use and reused,
+so calls share the SDK's connection pool. Calls run on a small thread
+pool. That pool caps how many are in flight, and complete() gives up
+after a deadline instead of holding the request thread. Transient
+failures (timeouts, dropped connections, 429 and 5xx) are retried with
+exponential backoff and full jitter. Replies are cached by prompt: the
+prompt is the serialized position (serialize_game_state_for_llm), so an
+identical position is answered from the cache. Identical prompts already
+in flight share one call.
+
+    reply = llm_client.complete(prompt, provider="openai", model="gpt-4")
+    future = llm_client.submit(prompt, provider="anthropic")   # non-blocking
+    reply = await llm_client.acomplete(prompt)                 # asyncio
+
+Providers: "openai" and "anthropic" (SDKs imported on first use) and
+"local", a network-free stand-in for tests and offline play. Settings
+come from the environment: LLM_TIMEOUT (seconds per attempt),
+LLM_DEADLINE (seconds complete() waits), LLM_MAX_RETRIES,
+LLM_MAX_CONCURRENCY and LLM_CACHE_LIMIT.
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "20"))
+DEADLINE = float(os.environ.get("LLM_DEADLINE", "45"))
+MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "2"))
+MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "4"))
+CACHE_LIMIT = int(os.environ.get("LLM_CACHE_LIMIT", "256"))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+
+_jitter = random.Random()  # not the global stream, which seeded games and arena runs rely on
+
+SYSTEM_PROMPT = ("You are an expert FluxWars player. Analyze the board and suggest the best move. "
+                 "Use format: MOVE (row,col) DIRECTION where DIRECTION is UP/DOWN/LEFT/RIGHT.")
+API_KEY_VARS = {"openai": "OPENAI_API_KEY", "anthropic": "ANTHROPIC_API_KEY"}
+
+
+# ==============================================================
+#   PROVIDERS
+# ==============================================================
+
+_sdks = {}  # provider -> imported SDK module, or None when it isn't installed
+
+
+def provider_sdk(name):
+    """
+    The SDK module for `name`. The SDKs are optional and slow to import,
+    so each is imported on first use only. Raises ImportError when it
+    isn't installed.
+    """
+    if name not in _sdks:
+        try:
+            _sdks[name] = importlib.import_module(name)
+        except ImportError:
+            _sdks[name] = None
+    sdk = _sdks[name]
+    if sdk is None:
+        raise ImportError(f"No module named {name!r}")
+    return sdk
+
+
+class OpenAIProvider:
+    name = "openai"
+    needs_key = True
+
+    def client(self, api_key):
+        # retries are ours (with jitter), so the SDK's own are off
+        return provider_sdk("openai").OpenAI(api_key=api_key, timeout=TIMEOUT, max_retries=0)
+
+    def complete(self, client, prompt, model):
+        response = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            max_tokens=500,
+            temperature=0.7,
+        )
+        return response.choices[0].message.content
+
+
+class AnthropicProvider:
+    name = "anthropic"
+    needs_key = True
+
+    def client(self, api_key):
+        return provider_sdk("anthropic").Anthropic(api_key=api_key, timeout=TIMEOUT, max_retries=0)
+
+    def complete(self, client, prompt, model):
+        response = client.messages.create(
+            model=model if "claude" in model else "claude-3-sonnet-20240229",
+            max_tokens=500,
+            messages=[
+                {"role": "user", "content": f"You are an expert FluxWars player. {prompt}\n\nSuggest your move using format: MOVE (row,col) DIRECTION where DIRECTION is UP/DOWN/LEFT/RIGHT."}
+            ],
+        )
+        return response.content[0].text
+
+
+class LocalProvider:
+    """
+    Network-free stand-in. By default it answers with a move of the first
+    cluster listed in the prompt. `reply` (a function of the prompt)
+    replaces that answer, `delay` simulates latency, and the next
+    `failures` calls raise a retryable error. `calls` counts the calls
+    that reached it.
+    """
+
+    name = "local"
+    needs_key = False
+
+    def __init__(self, reply=None, delay=0.0, failures=0):
+        self.reply = reply
+        self.delay = delay
+        self.failures = failures
+        self.calls = 0
+
+    def client(self, api_key):
+        return None
+
+    def complete(self, client, prompt, model):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("local provider: simulated failure")
+        if self.reply is not None:
+            return self.reply(prompt)
+        match = re.search(r"Cluster 1: \d+ pieces at \[\((\d+), (\d+)\)", prompt)
+        row, col = match.groups() if match else (7, 7)
+        return f"MOVE ({row},{col}) UP"
+
+
+_providers = {p.name: p for p in (OpenAIProvider(), AnthropicProvider(), LocalProvider())}
+
+
+def register_provider(provider):
+    """Add or replace a provider (anything with name, needs_key, client() and complete())."""
+    _providers[provider.name] = provider
+    _clients.pop(provider.name, None)
+
+
+# ==============================================================
+#   CLIENT POOL + RETRIES
+# ==============================================================
+
+_clients = {}  # provider -> {api_key: client}
+_lock = threading.Lock()
+_executor = None
+
+
+def _client(provider, api_key):
+    with _lock:
+        per_key = _clients.setdefault(provider.name, {})
+        if api_key not in per_key:
+            per_key[api_key] = provider.client(api_key)
+        return per_key[api_key]
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="fluxwars-llm")
+        return _executor
+
+
+def _retryable(exc):
+    """Timeouts, dropped connections, rate limits and server errors are worth another try."""
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    if type(exc).__name__ in ("APITimeoutError", "APIConnectionError"):
+        return True
+    status = getattr(exc, "status_code", None)
+    return status in (408, 409, 429) or (isinstance(status, int) and status >= 500)
+
+
+def _call(provider, api_key, prompt, model):
+    """One provider call with retries; full-jitter exponential backoff between attempts."""
+    client = _client(provider, api_key)
+    for attempt in range(MAX_RETRIES + 1):
+        start = time.perf_counter()
+        try:
+            reply = provider.complete(client, prompt, model)
+            metrics.observe("llm_seconds", time.perf_counter() - start, provider=provider.name)
+            return reply
+        except Exception as e:
+            metrics.observe("llm_seconds", time.perf_counter() - start, provider=provider.name)
+            if attempt == MAX_RETRIES or not _retryable(e):
+                raise
+            metrics.inc("llm_retries_total", provider=provider.name)
+            delay = _jitter.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+            logger.info("LLM: %s call failed (%s); retrying in %.2fs", provider.name, e, delay)
+            time.sleep(delay)
+
+
+# ==============================================================
+#   RESPONSE CACHE + ENTRY POINTS
+# ==============================================================
+
+_cache = OrderedDict()  # (provider, model, prompt) -> reply
+_inflight = {}          # (provider, model, prompt) -> Future
+
+
+def submit(prompt, provider="openai", model="gpt-4", api_key=None):
+    """
+    Start a call without waiting. Returns a concurrent.futures.Future for
+    the reply text, or None when the provider can't be used (unknown,
+    or no API key).
+    """
+    p = _providers.get(provider)
+    if p is None:
+        logger.warning("LLM: Unknown provider %r", provider)
+        return None
+    if p.needs_key:
+        api_key = api_key or os.environ.get(API_KEY_VARS.get(provider, ""))
+        if not api_key:
+            logger.warning("LLM: No API key found for %s. Set OPENAI_API_KEY or ANTHROPIC_API_KEY environment variable.", provider)
+            return None
+
+    key = (provider, model, prompt)
+    pool = _pool()
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            metrics.inc("llm_requests_total", provider=provider, result="cached")
+            future = Future()
+            future.set_result(_cache[key])
+            return future
+        future = _inflight.get(key)
+        if future is not None:
+            metrics.inc("llm_requests_total", provider=provider, result="joined")
+            return future
+        future = _inflight[key] = pool.submit(_call, p, api_key, prompt, model)
+    future.add_done_callback(lambda f: _finished(key, f))
+    return future
+
+
+def _finished(key, future):
+    provider = key[0]
+    with _lock:
+        _inflight.pop(key, None)
+        if future.exception() is None:
+            _cache[key] = future.result()
+            while len(_cache) > CACHE_LIMIT:
+                _cache.popitem(last=False)
+    metrics.inc("llm_requests_total", provider=provider, result="ok" if future.exception() is None else "error")
+
+
+def complete(prompt, provider="openai", model="gpt-4", api_key=None, deadline=None):
+    """
+    Reply text for `prompt`, or None if the provider is unavailable, the
+    call failed after its retries, or no reply came within `deadline`
+    seconds (default LLM_DEADLINE). A late reply is still cached.
+    """
+    future = submit(prompt, provider, model, api_key)
+    if future is None:
+        return None
+    try:
+        return future.result(timeout=DEADLINE if deadline is None else deadline)
+    except FutureTimeout:
+        metrics.inc("llm_requests_total", provider=provider, result="timeout")
+        logger.warning("LLM: %s gave no reply within the deadline", provider)
+    except ImportError:
+        logger.warning("LLM: Missing library for %s. Install with: pip install %s", provider, provider)
+    except Exception as e:
+        logger.warning("LLM: API call failed: %s", e)
+    return None
+
+
+async def acomplete(prompt, provider="openai", model="gpt-4", api_key=None, deadline=None):
+    """complete() for asyncio callers; the call runs on the client's thread pool."""
+    future = submit(prompt, provider, model, api_key)
+    if future is None:
+        return None
+    try:
+        # shielded: timing out must not cancel a call other callers share
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)),
+                                      DEADLINE if deadline is None else deadline)
+    except asyncio.TimeoutError:
+        metrics.inc("llm_requests_total", provider=provider, result="timeout")
+        logger.warning("LLM: %s gave no reply within the deadline", provider)
+        return None
+    except Exception as e:
+        logger.warning("LLM: API call failed: %s", e)
+        return None
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,182 @@
+"""
+Lightweight in-process metrics for FluxWars
+
+Counters, timers and gauges kept in plain dicts so the engine's hot paths
+pay one dict update per event. Updates take a lock, since Flask serves
+requests on threads and a read-modify-write could lose increments.
+/metrics in app.py renders everything in the Prometheus text exposition
+format. All metric names get a "fluxwars_" prefix on export.
+
+    metrics.inc("ai_rollouts_total")
+    with metrics.timer("engine_seconds", op="steal"):
+        ...
+
+    @metrics.timed("engine_seconds", op="move_cluster")
+    def move_cluster_cells(...):
+        ...
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = "fluxwars_"
+
+# key = (name, ((label, value), ...))
+_counters = {}
+_timers = {}   # key -> [count, total_seconds, max_seconds]
+_gauges = {}
+_help = {}
+_lock = threading.Lock()
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+
+def describe(name, text):
+    """Attach HELP text to a metric name."""
+    _help[name] = text
+
+
+def inc(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def set_gauge(name, value, **labels):
+    _gauges[_key(name, labels)] = value
+
+
+def observe(name, seconds, **labels):
+    _observe(_key(name, labels), seconds)
+
+
+def _observe(key, seconds):
+    with _lock:
+        t = _timers.get(key)
+        if t is None:
+            _timers[key] = [1, seconds, seconds]
+        else:
+            t[0] += 1
+            t[1] += seconds
+            if seconds > t[2]:
+                t[2] = seconds
+
+
+@contextmanager
+def timer(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def timed(name, **labels):
+    """Decorator recording the wall time of every call under `name`."""
+    key = _key(name, labels)
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _observe(key, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def value(name, **labels):
+    """Current value of a counter (0 if never incremented)."""
+    return _counters.get(_key(name, labels), 0)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+        _gauges.clear()
+
+
+# ==============================================================
+#   PROMETHEUS TEXT FORMAT
+# ==============================================================
+
+def _escape(value):
+    """Label value escaped for the exposition format (backslash, double quote, newline)."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + (list(extra) if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _group(store):
+    grouped = {}
+    for (name, labels), val in store.items():
+        grouped.setdefault(name, []).append((labels, val))
+    return sorted(grouped.items())
+
+
+def render_prometheus():
+    lines = []
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        timers = {key: tuple(t) for key, t in _timers.items()}
+
+    for name, series in _group(counters):
+        full = PREFIX + name
+        if name in _help:
+            lines.append(f"# HELP {full} {_help[name]}")
+        lines.append(f"# TYPE {full} counter")
+        for labels, val in series:
+            lines.append(f"{full}{_format_labels(labels)} {val}")
+
+    for name, series in _group(gauges):
+        full = PREFIX + name
+        if name in _help:
+            lines.append(f"# HELP {full} {_help[name]}")
+        lines.append(f"# TYPE {full} gauge")
+        for labels, val in series:
+            lines.append(f"{full}{_format_labels(labels)} {val}")
+
+    for name, series in _group(timers):
+        full = PREFIX + name
+        if name in _help:
+            lines.append(f"# HELP {full} {_help[name]}")
+        lines.append(f"# TYPE {full} summary")
+        for labels, (count, total, peak) in series:
+            lines.append(f"{full}_count{_format_labels(labels)} {count}")
+            lines.append(f"{full}_sum{_format_labels(labels)} {total:.9f}")
+        lines.append(f"# TYPE {full}_max gauge")
+        for labels, (count, total, peak) in series:
+            lines.append(f"{full}_max{_format_labels(labels)} {peak:.9f}")
+
+    return "\n".join(lines) + "\n"
+
+
+describe("engine_seconds", "Wall time spent in board.py engine calls.")
+describe("serialize_seconds", "Time spent building JSON-ready game state.")
+describe("player_clusters_bfs_total", "Player cluster searches (find_cluster).")
+describe("neutral_clusters_bfs_total", "Neutral cluster searches (get_cluster).")
+describe("legal_moves_cache_total", "Move-legality lookups by cache result.")
+describe("ai_moves_generated_total", "Candidate moves generated by MCTS nodes.")
+describe("ai_rollouts_total", "MCTS simulations run.")
+describe("ai_nodes_total", "Positions examined by the AIs.")
+describe("ai_decision_seconds", "Wall time of a full AI turn.")
+describe("http_request_seconds", "Flask request latency by endpoint.")
+describe("http_requests_total", "Flask requests by endpoint and status.")
+describe("llm_requests_total", "LLM completions by provider and result (ok, error, timeout, cached, joined).")
+describe("llm_retries_total", "LLM calls retried after a transient failure.")
+describe("llm_seconds", "Latency of individual LLM provider calls.")
+describe("startup_seconds", "Time from the start of app.py's imports until the app was ready.")
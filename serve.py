@@ -0,0 +1,322 @@
+"""
+Production server for FluxWars
+
+The engine keeps one game in module globals (board.py), so a process can
+only host one game and every request for that game must reach it. This
+runs a shared-nothing layout instead of one big process:
+
+    router  :PORT        -> hashes the request's game id to a worker
+    worker 0  :PORT+1    -> its own app, game and store (DATA_DIR/worker-0)
+    worker 1  :PORT+2    ...
+
+The game id comes from the X-Game-Id header, a ?game= query parameter or
+the fluxwars_game cookie. A browser without one gets a fresh id in that
+cookie on its first response, so its fetches and /events stream stick to
+one worker. Opening /?game=<id> joins the game on <id>'s worker.
+Rendezvous hashing keeps most games on their worker when --workers
+changes.
+
+Each worker holds one game, so the router hands a worker to the first
+game routed to it. A request naming another game whose id hashes to that
+worker gets 409 instead of silently sharing the board. A browser without
+a game id, or whose cookie's game lost its worker, gets a new id that
+lands on a free worker (503 when none is free).
+A worker whose game has sent no request for --idle-timeout seconds is
+reset and handed to the next game that needs it. A deployment hosts as
+many concurrent games as it has workers.
+
+Workers and the router use werkzeug's threaded server without the
+debugger or reloader. With --workers 1 the app is served directly, with
+no router. For a WSGI server of your own, see wsgi.py.
+
+Usage:
+    python serve.py                          # one worker per core on :8000
+    python serve.py --workers 4 --port 8080 --data-dir data
+    python serve.py --idle-timeout 600       # free abandoned games sooner
+    python app.py                            # development server (unchanged)
+"""
+
+import argparse
+import hashlib
+import http.client
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+logger = logging.getLogger("fluxwars.serve")
+
+GAME_COOKIE = "fluxwars_game"
+GAME_HEADER = "X-Game-Id"
+WORKER_HEADER = "X-FluxWars-Worker"
+
+# Not forwarded in either direction (RFC 9110 section 7.6.1)
+HOP_BY_HOP = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade",
+}
+
+# Seconds without a request before a game's worker may be handed to another game
+IDLE_TIMEOUT = 1800
+
+
+# ==============================================================
+#   GAME AFFINITY
+# ==============================================================
+
+def worker_for(game_id, workers):
+    """Worker index for `game_id` (rendezvous hashing, stable across processes)."""
+    best, best_score = 0, b""
+    for i in range(workers):
+        score = hashlib.blake2b(f"{i}:{game_id}".encode(), digest_size=8).digest()
+        if score > best_score:
+            best, best_score = i, score
+    return best
+
+
+def _cookie_game(environ):
+    if not environ.get("HTTP_COOKIE"):
+        return None
+    morsel = SimpleCookie(environ["HTTP_COOKIE"]).get(GAME_COOKIE)
+    return morsel.value if morsel else None
+
+
+def game_id_for(environ):
+    """The game id a request names (header, ?game=, then cookie), or None."""
+    return (environ.get("HTTP_X_GAME_ID")
+            or (parse_qs(environ.get("QUERY_STRING", "")).get("game") or [None])[0]
+            or _cookie_game(environ)
+            or None)
+
+
+# ==============================================================
+#   ROUTER
+# ==============================================================
+
+class AffinityRouter:
+    """
+    WSGI app that forwards each request to the worker owning its game,
+    on a fresh connection: werkzeug closes every connection after one
+    response, so there is nothing to keep alive. Responses are streamed,
+    so /events passes straight through.
+
+    `owners` records which game each worker is hosting and when that game
+    last sent a request; see claim().
+    """
+
+    def __init__(self, backends, timeout=30, idle_timeout=IDLE_TIMEOUT):
+        self.backends = backends  # [(host, port), ...] indexed by worker
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.owners = {}  # worker -> (game id, monotonic time of its last request)
+        self._lock = threading.Lock()
+
+    def claim(self, game, now=None):
+        """
+        Worker for `game`, recording the game as its owner. Returns
+        (worker, taken_over) where taken_over means an idle game was
+        evicted, or (None, False) when another game holds the worker.
+        """
+        now = time.monotonic() if now is None else now
+        worker = worker_for(game, len(self.backends))
+        with self._lock:
+            owner = self.owners.get(worker)
+            if owner is not None and owner[0] != game and now - owner[1] < self.idle_timeout:
+                return None, False
+            self.owners[worker] = (game, now)
+        return worker, owner is not None and owner[0] != game
+
+    def claim_new(self, now=None):
+        """A fresh game id on a free worker: (game, worker, taken_over), or (None, None, False)."""
+        for _ in range(32 * len(self.backends)):
+            game = uuid.uuid4().hex[:12]
+            worker, taken_over = self.claim(game, now)
+            if worker is not None:
+                return game, worker, taken_over
+        return None, None, False
+
+    def __call__(self, environ, start_response):
+        game = game_id_for(environ)
+        worker, taken_over = self.claim(game) if game else (None, False)
+        if worker is None and game and game != _cookie_game(environ):
+            start_response("409 Conflict", [("Content-Type", "text/plain")])
+            return [f"The worker for game {game} is hosting another game; pick another game id.\n".encode()]
+        if worker is None:
+            # no game yet, or the cookie's game lost its worker after going idle
+            game, worker, taken_over = self.claim_new()
+            if game is None:
+                start_response("503 Service Unavailable", [("Content-Type", "text/plain"), ("Retry-After", "60")])
+                return [b"Every game worker is hosting a game; try again later.\n"]
+
+        if taken_over:
+            # The evicted game's board must not leak into the new one
+            logger.info("Worker %d: idle game replaced by %s", worker, game)
+            try:
+                conn, resp = self._send(worker, "POST", "/reset", b"{}", {"Content-Type": "application/json"})
+                resp.read()
+                conn.close()
+            except OSError as e:
+                return self._unreachable(worker, e, start_response)
+
+        path = environ.get("PATH_INFO", "/")
+        if environ.get("QUERY_STRING"):
+            path += "?" + environ["QUERY_STRING"]
+        if environ.get("CONTENT_LENGTH"):
+            length = int(environ["CONTENT_LENGTH"])
+            body = environ["wsgi.input"].read(length) if length else None
+        elif environ.get("wsgi.input_terminated"):
+            # chunked upload: the server de-chunks it and signals the end of the body
+            body = environ["wsgi.input"].read() or None
+        else:
+            body = None
+        headers = {
+            key[5:].replace("_", "-").title(): value
+            for key, value in environ.items()
+            if key.startswith("HTTP_") and key[5:].replace("_", "-").lower() not in HOP_BY_HOP
+        }
+        if environ.get("CONTENT_TYPE"):
+            headers["Content-Type"] = environ["CONTENT_TYPE"]
+        headers[GAME_HEADER] = game
+
+        try:
+            conn, resp = self._send(worker, environ["REQUEST_METHOD"], path, body, headers)
+        except OSError as e:
+            return self._unreachable(worker, e, start_response)
+
+        out_headers = [(k, v) for k, v in resp.getheaders() if k.lower() not in HOP_BY_HOP]
+        out_headers.append((WORKER_HEADER, str(worker)))
+        if game != _cookie_game(environ) and not environ.get("HTTP_X_GAME_ID"):
+            # a new browser, or one joining another game: remember its game
+            out_headers.append(("Set-Cookie", f"{GAME_COOKIE}={game}; Path=/; SameSite=Lax"))
+        start_response(f"{resp.status} {resp.reason}", out_headers)
+        return self._stream(conn, resp)
+
+    def _send(self, worker, method, path, body, headers):
+        host, port = self.backends[worker]
+        conn = http.client.HTTPConnection(host, port, timeout=self.timeout)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            return conn, conn.getresponse()
+        except OSError:
+            conn.close()
+            raise
+
+    def _unreachable(self, worker, error, start_response):
+        logger.warning("Worker %d unreachable: %s", worker, error)
+        start_response("502 Bad Gateway", [("Content-Type", "text/plain")])
+        return [b"Game worker unavailable.\n"]
+
+    def _stream(self, conn, resp):
+        try:
+            while True:
+                chunk = resp.read1(65536)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            conn.close()
+
+
+# ==============================================================
+#   PROCESSES
+# ==============================================================
+
+def run_worker(index, host, port, data_dir):
+    """Serve the app for one worker. Each worker persists to its own directory."""
+    if data_dir:
+        os.environ["FLUXWARS_DATA_DIR"] = os.path.join(data_dir, f"worker-{index}")
+    from werkzeug.serving import make_server
+
+    import app as app_module
+
+    server = make_server(host, port, app_module.app, threaded=True)
+
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    logger.info("Worker %d serving on %s:%d", index, host, port)
+    try:
+        server.serve_forever()
+    finally:
+        if app_module.store is not None:
+            app_module.store.close()
+
+
+def _wait_for_port(host, port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def serve(host="127.0.0.1", port=8000, workers=None, data_dir="data", idle_timeout=IDLE_TIMEOUT):
+    """Start the workers and the router; returns when the router stops."""
+    from werkzeug.serving import make_server
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        run_worker(0, host, port, data_dir)
+        return
+
+    backends = [("127.0.0.1", port + 1 + i) for i in range(workers)]
+    procs = []
+    for i, (_, worker_port) in enumerate(backends):
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", str(i),
+               "--host", "127.0.0.1", "--port", str(worker_port), "--data-dir", data_dir or ""]
+        procs.append(subprocess.Popen(cmd))
+    server = None
+    try:
+        for i, (worker_host, worker_port) in enumerate(backends):
+            if not _wait_for_port(worker_host, worker_port, timeout=30):
+                raise RuntimeError(f"worker {i} did not start on port {worker_port}")
+        server = make_server(host, port, AffinityRouter(backends, idle_timeout=idle_timeout), threaded=True)
+        signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown, daemon=True).start())
+        logger.info("Router on %s:%d -> %d workers", host, port, workers)
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run FluxWars with one game worker per process.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--data-dir", default="data", help="store directory; empty disables persistence")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT,
+                        help="seconds without a request before a game's worker can host another game")
+    parser.add_argument("--worker", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=os.environ.get("FLUXWARS_LOG_LEVEL", "INFO").upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    if args.worker is not None:
+        run_worker(args.worker, args.host, args.port, args.data_dir)
+    else:
+        serve(args.host, args.port, args.workers, args.data_dir, args.idle_timeout)
+
+
+if __name__ == "__main__":
+    main()
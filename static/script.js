@@ -3,14 +3,20 @@ const orientations = [0, 90, 180, 270];
 let orientationIndex = 0;
 let ghostCells = [];
 let selectedCluster = [];
+let selectedHandle = null; // server-side selection handle for selectedCluster
+let selectedLegal = null;   // {directions, rotate} for selectedCluster, until an action is queued
+let selectedPreview = null; // /preview_moves outcome of each legal move, for hover previews
 let diceValue = 0;
 let currentPhase = "home_setup";
 let lastBoard = null; // snapshot for detecting conversions
+let lastPolarities = null;
+let boardVersion = null; // server state_version that lastBoard reflects
 window.gameState = null; // global game state for AI checking
 
 // ======================= MAIN SETUP =======================
 
 document.addEventListener("DOMContentLoaded", () => {
+    connectEvents();
     const rotateBtn = document.getElementById("rotateBtn");
     const orientationLabel = document.getElementById("orientationLabel");
     const boardDiv = document.getElementById("board");
@@ -175,30 +181,9 @@ document.addEventListener("DOMContentLoaded", () => {
             showModal('<h3>No moves remaining</h3><p>Roll the dice first.</p>');
             return;
         }
+        if (selectedLegal && !selectedLegal.rotate) return;
 
-        const res = await fetch('/rotate_cluster', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ cluster: selectedCluster, remaining_moves: diceValue - 1 })
-        });
-        const data = await res.json();
-        if (data.success) {
-            addHistoryEntry('Rotated piece');
-            if (data.board && data.polarities) updateBoard(data.board, data.polarities, data.state?.phase || currentPhase, data.state);
-            if (data.state) updateStatus(data.state);
-            // update selected cluster to server-provided new cluster
-            selectedCluster = data.new_cluster || [];
-            highlightCluster(selectedCluster);
-            diceValue -= 1;
-            const diceResult = document.getElementById('diceResult');
-            if (diceResult) diceResult.textContent = `🎲 Moves left: ${diceValue}`;
-            if (diceValue <= 0) {
-                selectedCluster = [];
-                showModal('<h3>Out of moves</h3><p>You have no moves left this turn.</p>');
-            }
-        } else {
-            showModal(`<h3>Rotation failed</h3><p>${data.message || 'Could not rotate this piece.'}</p>`);
-        }
+        queueAction({ type: "rotate" });
     });
 
     // --- BOARD CLICK (phase-dependent) ---
@@ -217,6 +202,8 @@ document.addEventListener("DOMContentLoaded", () => {
                 showModal('<h3>Roll required</h3><p>Roll the dice first!</p>');
                 return;
             }
+            // Moves queued for the old selection go out before switching clusters
+            await flushActions();
             const res = await fetch("/select_cluster", {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
@@ -225,6 +212,8 @@ document.addEventListener("DOMContentLoaded", () => {
             const data = await res.json();
             if (data.cluster?.length) {
                 selectedCluster = data.cluster;
+                selectedHandle = data.selection || null;
+                setLegalMoves(data.legal);
                 highlightCluster(selectedCluster);
             }
         } else {
@@ -232,12 +221,12 @@ document.addEventListener("DOMContentLoaded", () => {
             const res = await fetch("/toggle", {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
-                body: JSON.stringify({ row, col, orientation }),
+                body: withVersion({ row, col, orientation }),
             });
             const data = await res.json();
             if (data.success || data.ai_placed) {
                 updateStatus(data.state);
-                updateBoard(data.board, data.polarities, data.state.phase, data.state);
+                applyServerUpdate(data, data.state.phase, data.state);
                 window.gameState = data.state;
                 clearGhostPreview();
                 
@@ -252,23 +241,34 @@ document.addEventListener("DOMContentLoaded", () => {
         }
     });
 
-    // --- GHOST PREVIEW (setup only) ---
+    // --- GHOST PREVIEW (setup) / MOVE PREVIEW (main) ---
     boardDiv.addEventListener("mousemove", (e) => {
-        if (currentPhase === "main") return;
         const cell = e.target.closest(".cell");
         if (!cell) return;
         const row = parseInt(cell.dataset.row);
         const col = parseInt(cell.dataset.col);
-        showGhostPreview(row, col);
+        if (currentPhase === "main") showMovePreview(previewForCell(row, col));
+        else showGhostPreview(row, col);
+    });
+    boardDiv.addEventListener("mouseleave", () => {
+        clearGhostPreview();
+        clearMovePreview();
     });
-    boardDiv.addEventListener("mouseleave", clearGhostPreview);
+    rotateBtn.addEventListener("mouseenter", () => {
+        if (currentPhase === "main") showMovePreview(selectedPreview?.rotate);
+    });
+    rotateBtn.addEventListener("mouseleave", clearMovePreview);
 
     // --- ROLL DICE ---
     rollDiceBtn.addEventListener("click", async () => {
         const diceAnim = document.getElementById('diceAnim');
         diceAnim.classList.add('dice-rolling');
         // small delay to show animation for better UX
-        const res = await fetch("/roll_dice", { method: "POST" });
+        const res = await fetch("/roll_dice", {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: withVersion(),
+        });
         const data = await res.json();
         diceAnim.classList.remove('dice-rolling');
         if (data.success) {
@@ -279,7 +279,7 @@ document.addEventListener("DOMContentLoaded", () => {
             addHistoryEntry(`Player rolled ${diceValue}`);
             // Update UI to reflect new turn/board state returned by server
             if (data.state) updateStatus(data.state);
-            if (data.board && data.polarities) updateBoard(data.board, data.polarities, data.state?.phase || currentPhase, data.state);
+            applyServerUpdate(data, data.state?.phase || currentPhase, data.state);
             // If server indicates steal opportunity (rolled a 6), show steal UI
             if (data.steal_targets && data.steal_targets.length) {
                 showStealOptions(data.steal_targets);
@@ -302,50 +302,171 @@ document.addEventListener("DOMContentLoaded", () => {
         else if (e.key === "ArrowLeft") dc = -1;
         else if (e.key === "ArrowRight") dc = 1;
         else return;
+        if (selectedLegal && !selectedLegal.directions.some(([r, c]) => r === dr && c === dc)) {
+            addHistoryEntry('Blocked in that direction');
+            return;
+        }
 
-        const res = await fetch("/move_cluster", {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            // send remaining_moves so server knows when to switch turns
-            body: JSON.stringify({ cluster: selectedCluster, dr, dc, remaining_moves: diceValue - 1 }),
+        queueAction({ type: "move", dr, dc });
+    });
+});
+
+// ======================= BATCHED TURN SUBMISSION =======================
+
+// Arrow presses and rotations are queued and sent to /submit_turn together
+// once the player pauses or the dice runs out. The server applies a batch
+// all-or-nothing and follows the moved cluster from one action to the next.
+const BATCH_DELAY_MS = 150;
+let pendingActions = [];
+let batchTimer = null;
+let batchInFlight = null;
+
+function showMovesLeft() {
+    const diceResult = document.getElementById('diceResult');
+    if (diceResult) diceResult.textContent = `🎲 Moves left: ${diceValue}`;
+    const diceResultBubble = document.getElementById('diceResultBubble');
+    if (diceResultBubble) diceResultBubble.style.display = diceValue > 0 ? 'inline-flex' : 'none';
+}
+
+// Legal moves come with a selection; once an action is queued they are unknown until the server replies
+function setLegalMoves(legal) {
+    selectedLegal = legal || null;
+    selectedPreview = null;
+    clearMovePreview();
+    const rotateBtn = document.getElementById('rotateBtn');
+    if (rotateBtn) rotateBtn.disabled = currentPhase === 'main' && !!selectedLegal && !selectedLegal.rotate;
+    if (selectedLegal && (selectedLegal.directions.length || selectedLegal.rotate)) loadMovePreview(selectedLegal);
+}
+
+// Fetch what each legal move would do; dropped if the selection changed meanwhile
+async function loadMovePreview(legal) {
+    try {
+        const res = await fetch('/preview_moves', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(selectedHandle ? { selection: selectedHandle } : { cluster: selectedCluster })
         });
         const data = await res.json();
-        if (data.success) {
-            addHistoryEntry(`Moved cluster by (${dr},${dc})`);
-            updateBoard(data.board, data.polarities, data.state?.phase || "main", data.state);
-            if (data.state) {
-                updateStatus(data.state);
-                window.gameState = data.state;
-            }
-            // Auto-select the new cluster returned by server for next move
-            selectedCluster = data.new_cluster || [];
-            highlightCluster(selectedCluster);
-            diceValue -= 1;
-            diceResult.textContent = `🎲 Moves left: ${diceValue}`;
-            const diceResultBubble = document.getElementById('diceResultBubble');
-            if (diceResultBubble) diceResultBubble.style.display = diceValue > 0 ? 'inline-flex' : 'none';
-            if (diceValue <= 0) {
-                selectedCluster = [];
-                showModal('<h3>Out of moves</h3><p>You have no moves left this turn.</p>');
-                // Trigger AI if turn ended
-                await checkAndTriggerAI();
-            }
-        } else {
-            showModal(`<h3>Move blocked</h3><p>${data.message || 'Movement could not be completed.'}</p>`);
-        }
+        if (data.success && selectedLegal === legal) selectedPreview = data;
+    } catch (e) {
+        console.error('Could not load move preview:', e);
+    }
+}
+
+function queueAction(action) {
+    pendingActions.push(action);
+    setLegalMoves(null);
+    diceValue -= 1;
+    showMovesLeft();
+    clearTimeout(batchTimer);
+    if (diceValue <= 0) flushActions();
+    else batchTimer = setTimeout(flushActions, BATCH_DELAY_MS);
+}
+
+async function flushActions() {
+    clearTimeout(batchTimer);
+    batchTimer = null;
+    if (batchInFlight) await batchInFlight;
+    if (!pendingActions.length) return;
+
+    const actions = pendingActions;
+    pendingActions = [];
+    // Reference the server-side selection when we have one; coordinates otherwise
+    if (selectedHandle) actions[0].selection = selectedHandle;
+    else actions[0].cluster = selectedCluster;
+    batchInFlight = submitActions(actions, diceValue <= 0);
+    await batchInFlight;
+    batchInFlight = null;
+}
+
+async function submitActions(actions, endTurn) {
+    const res = await fetch('/submit_turn', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: expectingVersion({ actions, end_turn: endTurn }),
     });
-});
+    const data = await res.json();
+    if (data.stale_selection) {
+        // The board changed since the cluster was selected: resend with coordinates
+        selectedHandle = null;
+        delete actions[0].selection;
+        actions[0].cluster = selectedCluster;
+        return submitActions(actions, endTurn);
+    }
+    if (data.success) {
+        actions.forEach(a => addHistoryEntry(a.type === 'rotate' ? 'Rotated piece' : `Moved cluster by (${a.dr},${a.dc})`));
+        applyServerUpdate(data, data.state?.phase || "main", data.state);
+        if (data.state) {
+            updateStatus(data.state);
+            window.gameState = data.state;
+        }
+        // Auto-select the new cluster returned by server for next move
+        selectedCluster = data.new_cluster || [];
+        selectedHandle = data.selection || null;
+        if (!pendingActions.length) setLegalMoves(data.legal);
+        highlightCluster(selectedCluster);
+    } else if (data.stale) {
+        // The game moved on without us: take the server's board and dice
+        applyServerUpdate(data, data.state.phase, data.state);
+        updateStatus(data.state);
+        diceValue = data.dice;
+        pendingActions = [];
+        selectedCluster = [];
+        selectedHandle = null;
+        setLegalMoves(null);
+        showMovesLeft();
+        showModal(`<h3>Move not applied</h3><p>${data.message}</p>`);
+        return;
+    } else {
+        // Nothing was applied: give back the moves of this batch and anything queued behind it
+        diceValue += actions.length + pendingActions.length;
+        pendingActions = [];
+        setLegalMoves(null);
+        showMovesLeft();
+        if (data.traceback) console.error(data.traceback);
+        showModal(`<h3>Move blocked</h3><p>${data.message || 'Movement could not be completed.'}</p>`);
+        return;
+    }
+
+    if (diceValue <= 0 && !pendingActions.length) {
+        selectedCluster = [];
+        setLegalMoves(null);
+        showModal('<h3>Out of moves</h3><p>You have no moves left this turn.</p>');
+        // Trigger AI if turn ended
+        await checkAndTriggerAI();
+    }
+}
 
 // ======================= RENDER BOARD =======================
 
-function updateBoard(board, polarities, phase = "setup", state = null) {
-    const boardDiv = document.getElementById("board");
-    currentPhase = phase;
-    boardDiv.innerHTML = "";
+// Request body with the board version we hold, so the server can reply with a delta
+function withVersion(body = {}) {
+    if (lastBoard && boardVersion !== null) body.version = boardVersion;
+    return JSON.stringify(body);
+}
 
-    const isMainPhase = (phase === "main");
-    
-    // Get home piece locations from state if available
+// Same, and the request only applies if the game is still at that version
+// (otherwise the server answers 409 with a fresh snapshot)
+function expectingVersion(body = {}) {
+    if (boardVersion !== null) body.expected_version = boardVersion;
+    return withVersion(body);
+}
+
+// Apply a route response: either a delta against our board or a full snapshot
+function applyServerUpdate(data, phase, state) {
+    // A pushed event may already have brought us to (or past) this version
+    if (data.delta && boardVersion !== null && data.version <= boardVersion) return;
+    if (data.delta && lastBoard) {
+        patchBoard(data.delta, phase, state);
+    } else if (data.board && data.polarities) {
+        updateBoard(data.board, data.polarities, phase, state);
+    } else {
+        return;
+    }
+    if (data.version !== undefined) boardVersion = data.version;
+}
+
+function homeCellSet(state) {
     const homePieces = new Set();
     if (state && state.homes) {
         // Mark home pieces for both players
@@ -366,6 +487,55 @@ function updateBoard(board, polarities, phase = "setup", state = null) {
             }
         });
     }
+    return homePieces;
+}
+
+function renderCell(cell, value, polarity, isHome, isMainPhase) {
+    const c = Number(cell.dataset.col);
+    cell.className = "cell";
+    cell.innerHTML = "";
+
+    if (value === 1) cell.classList.add("player1");
+    else if (value === 2) cell.classList.add("player2");
+    else if (value === 3) cell.classList.add("neutral");
+
+    // Mark home pieces
+    if (isHome) {
+        cell.classList.add("home-piece");
+    }
+
+    if (!isMainPhase && c === 7) {
+        cell.classList.add("border-cell");
+    }
+
+    if (polarity === "+" || polarity === "-" || polarity === "–") {
+        const span = document.createElement("span");
+        span.textContent = polarity;
+        span.classList.add("polarity");
+        cell.appendChild(span);
+    }
+}
+
+function animateConversions(converted) {
+    converted.forEach(([r, c]) => {
+        const cell = document.querySelector(`.cell[data-row='${r}'][data-col='${c}']`);
+        if (cell) {
+            cell.classList.add('converted');
+            setTimeout(() => cell.classList.remove('converted'), 700);
+        }
+    });
+    if (converted.length) addHistoryEntry(`Captured ${converted.length} neutral piece(s)`);
+}
+
+function updateBoard(board, polarities, phase = "setup", state = null) {
+    const boardDiv = document.getElementById("board");
+    currentPhase = phase;
+    boardDiv.innerHTML = "";
+
+    const isMainPhase = (phase === "main");
+    
+    // Get home piece locations from state if available
+    const homePieces = homeCellSet(state);
 
     for (let r = 0; r < board.length; r++) {
         const rowDiv = document.createElement("div");
@@ -373,32 +543,9 @@ function updateBoard(board, polarities, phase = "setup", state = null) {
 
         for (let c = 0; c < board[r].length; c++) {
             const cell = document.createElement("div");
-            cell.classList.add("cell");
             cell.dataset.row = r;
             cell.dataset.col = c;
-
-            const value = board[r][c];
-            if (value === 1) cell.classList.add("player1");
-            else if (value === 2) cell.classList.add("player2");
-            else if (value === 3) cell.classList.add("neutral");
-
-            // Mark home pieces
-            if (homePieces.has(`${r},${c}`)) {
-                cell.classList.add("home-piece");
-            }
-
-            if (!isMainPhase && c === 7) {
-                cell.classList.add("border-cell");
-            }
-
-            const polarity = polarities[r][c];
-            if (polarity === "+" || polarity === "-" || polarity === "–") {
-                const span = document.createElement("span");
-                span.textContent = polarity;
-                span.classList.add("polarity");
-                cell.appendChild(span);
-            }
-
+            renderCell(cell, board[r][c], polarities[r][c], homePieces.has(`${r},${c}`), isMainPhase);
             rowDiv.appendChild(cell);
         }
         boardDiv.appendChild(rowDiv);
@@ -415,19 +562,94 @@ function updateBoard(board, polarities, phase = "setup", state = null) {
                 }
             }
         }
-        // animate converted cells
-        converted.forEach(([r, c]) => {
-            const cell = document.querySelector(`.cell[data-row='${r}'][data-col='${c}']`);
-            if (cell) {
-                cell.classList.add('converted');
-                setTimeout(() => cell.classList.remove('converted'), 700);
-            }
-        });
-        if (converted.length) addHistoryEntry(`Captured ${converted.length} neutral piece(s)`);
+        animateConversions(converted);
     }
 
     // update lastBoard snapshot
     lastBoard = board.map(row => row.slice());
+    lastPolarities = polarities.map(row => row.slice());
+}
+
+// Apply a server delta ({changes: [[r, c, owner, polarity, magnetId]], converted, pulls})
+// and re-render only the touched cells
+function patchBoard(delta, phase, state) {
+    const board = lastBoard.map(row => row.slice());
+    const polarities = lastPolarities.map(row => row.slice());
+    delta.changes.forEach(([r, c, owner, polarity]) => {
+        board[r][c] = owner;
+        polarities[r][c] = polarity;
+    });
+
+    // Phase changes restyle the middle column; fall back to a full render
+    if (phase !== currentPhase || !document.querySelector(".cell")) {
+        updateBoard(board, polarities, phase, state);
+        return;
+    }
+
+    const isMainPhase = (phase === "main");
+    const homePieces = homeCellSet(state);
+    delta.changes.forEach(([r, c, owner, polarity]) => {
+        const cell = document.querySelector(`.cell[data-row='${r}'][data-col='${c}']`);
+        if (cell) renderCell(cell, owner, polarity, homePieces.has(`${r},${c}`), isMainPhase);
+    });
+    animateConversions(delta.converted || []);
+
+    lastBoard = board;
+    lastPolarities = polarities;
+}
+
+// ======================= PUSH CHANNEL =======================
+
+// Subscribe to /events so moves made by the AI or another player show up
+// without polling. Own fetch responses and pushes are reconciled by version.
+function connectEvents() {
+    if (!window.EventSource) return;
+    const source = new EventSource('/events');
+
+    source.addEventListener('sync', ev => {
+        const data = JSON.parse(ev.data);
+        updateBoard(data.board, data.polarities, data.state.phase, data.state);
+        boardVersion = data.version;
+        updateStatus(data.state);
+    });
+
+    source.addEventListener('board', ev => {
+        const data = JSON.parse(ev.data);
+        if (boardVersion !== null && data.version <= boardVersion) return; // already applied
+        if (!lastBoard || data.since !== boardVersion) {
+            resync();
+            return;
+        }
+        patchBoard(data, data.state.phase, data.state);
+        boardVersion = data.version;
+        updateStatus(data.state);
+        const localMovesPending = pendingActions.length || batchInFlight;
+        if (data.kind === 'roll' || data.kind === 'turn' || (data.kind === 'batch' && !localMovesPending)) {
+            diceValue = data.dice;
+            const diceResultElem = document.getElementById("diceResult");
+            if (diceResultElem) diceResultElem.textContent = diceValue > 0 ? `Dice: ${diceValue}` : '';
+        }
+    });
+
+    source.addEventListener('ai', ev => {
+        const data = JSON.parse(ev.data);
+        const status = document.getElementById("status");
+        if (data.status === 'thinking' && status) status.textContent = "AI is thinking...";
+    });
+
+    source.addEventListener('resync', () => resync());
+}
+
+async function resync() {
+    try {
+        const res = await fetch('/sync');
+        const data = await res.json();
+        updateBoard(data.board, data.polarities, data.state.phase, data.state);
+        boardVersion = data.version;
+        updateStatus(data.state);
+    } catch (err) {
+        console.error('Resync failed:', err);
+    }
 }
 
 
@@ -452,14 +674,39 @@ function showStealOptions(targets) {
                 ev.dataTransfer.setData('text/plain', JSON.stringify({ r, c }));
                 ev.dataTransfer.effectAllowed = 'move';
                 cell.style.opacity = '0.5';
+                showStealPlacements(r, c);
             };
             cell.ondragend = () => {
                 cell.style.opacity = '1';
+                clearStealPlacements();
             };
         }
     });
 }
 
+// Highlight the cells the dragged magnet can land on
+async function showStealPlacements(r, c) {
+    clearStealPlacements();
+    try {
+        const res = await fetch('/steal_placements', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ source_row: r, source_col: c })
+        });
+        const json = await res.json();
+        (json.placements || []).forEach(({ target: [tr, tc] }) => {
+            const cell = document.querySelector(`.cell[data-row='${tr}'][data-col='${tc}']`);
+            if (cell) cell.classList.add('steal-target');
+        });
+    } catch (e) {
+        console.error('Could not load steal placements:', e);
+    }
+}
+
+function clearStealPlacements() {
+    document.querySelectorAll('.cell.steal-target').forEach(cel => cel.classList.remove('steal-target'));
+}
+
 // Allow dropping anywhere on the board to trigger steal
 document.addEventListener('dragover', (ev) => {
     const target = ev.target.closest('.cell');
@@ -493,7 +740,7 @@ document.addEventListener('drop', async (ev) => {
         const res = await fetch('/steal', {
             method: 'POST',
             headers: { 'Content-Type':'application/json' },
-            body: JSON.stringify({ 
+            body: withVersion({ 
                 source_row: parseInt(r), 
                 source_col: parseInt(c),
                 target_row: targetRow,
@@ -501,6 +748,7 @@ document.addEventListener('drop', async (ev) => {
             })
         });
         const json = await res.json();
+        clearStealPlacements();
         document.querySelectorAll('.cell.stealable').forEach(cel => {
             cel.classList.remove('stealable');
             cel.removeAttribute('draggable');
@@ -510,7 +758,7 @@ document.addEventListener('drop', async (ev) => {
         });
         if (json.success) {
             addHistoryEntry('Stole opponent magnet');
-            if (json.board && json.polarities) updateBoard(json.board, json.polarities, json.state?.phase || currentPhase, json.state);
+            applyServerUpdate(json, json.state?.phase || currentPhase, json.state);
             if (json.state) updateStatus(json.state);
         } else {
             showModal(`<h3>Steal failed</h3><p>${json.message || 'Unable to steal.'}</p>`);
@@ -621,10 +869,19 @@ document.addEventListener('DOMContentLoaded', () => {
     const endTurnBtn = document.getElementById('endTurnBtn');
     if (endTurnBtn) {
         endTurnBtn.addEventListener('click', async () => {
-            const res = await fetch('/end_turn', { method: 'POST' });
+            await flushActions();
+            const res = await fetch('/end_turn', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: expectingVersion(),
+            });
             const data = await res.json();
-            if (data.success) {
-                updateBoard(data.board, data.polarities, data.state.phase, data.state);
+            if (data.stale) {
+                // Already ended (e.g. a double click): just catch up
+                applyServerUpdate(data, data.state.phase, data.state);
+                updateStatus(data.state);
+            } else if (data.success) {
+                applyServerUpdate(data, data.state.phase, data.state);
                 updateStatus(data.state);
                 window.gameState = data.state;
                 addHistoryEntry('Player ended turn early');
@@ -696,7 +953,8 @@ function showWinnerAnimation(player) {
         const data = await res.json();
         if (data.success) {
             if (overlay.parentNode) overlay.remove();
-            updateBoard(data.board, data.polarities, data.state.phase, data.state);
+            setLegalMoves(null);
+            applyServerUpdate(data, data.state.phase, data.state);
             updateStatus(data.state);
         }
     };
@@ -729,6 +987,31 @@ function clearGhostPreview() {
     ghostCells = [];
 }
 
+// Hovering a cell next to the selected cluster previews the move towards it
+function previewForCell(row, col) {
+    if (!selectedPreview || !selectedCluster.length) return null;
+    if (selectedCluster.some(([r, c]) => r === row && c === col)) return null;
+    return selectedPreview.moves.find(({ dr, dc }) =>
+        selectedCluster.some(([r, c]) => r + dr === row && c + dc === col)) || null;
+}
+
+function showMovePreview(preview) {
+    clearMovePreview();
+    if (!preview) return;
+    const mark = ([r, c], cls) => {
+        const cell = document.querySelector(`.cell[data-row='${r}'][data-col='${c}']`);
+        if (cell) cell.classList.add(cls);
+    };
+    preview.cells.forEach(pos => mark(pos, 'preview-cell'));
+    preview.pulls.forEach(([, targets]) => targets.forEach(pos => mark(pos, 'preview-pull')));
+    preview.converted.forEach(pos => mark(pos, 'preview-convert'));
+}
+
+function clearMovePreview() {
+    document.querySelectorAll('.cell.preview-cell, .cell.preview-pull, .cell.preview-convert')
+        .forEach(cel => cel.classList.remove('preview-cell', 'preview-pull', 'preview-convert'));
+}
+
 function getPieceOffsets(orientation) {
     switch (orientation) {
         case 0: return [{ dr: 0, dc: 0, symbol: '+' }, { dr: 0, dc: 1, symbol: '-' }];
@@ -763,12 +1046,12 @@ async function aiSetupPiece() {
         const res = await fetch('/toggle', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ row: 0, col: 0, orientation: 0 })  // Dummy values, backend will use AI position
+            body: withVersion({ row: 0, col: 0, orientation: 0 })  // Dummy values, backend will use AI position
         });
         
         const data = await res.json();
         if (data.success || data.ai_placed) {
-            updateBoard(data.board, data.polarities, data.state.phase, data.state);
+            applyServerUpdate(data, data.state.phase, data.state);
             updateStatus(data.state);
             window.gameState = data.state;
             addHistoryEntry('AI placed home piece');
@@ -800,13 +1083,14 @@ async function checkAndTriggerAI() {
     try {
         const res = await fetch('/ai_move', {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' }
+            headers: { 'Content-Type': 'application/json' },
+            body: withVersion()
         });
         
         const data = await res.json();
         
         if (data.success) {
-            updateBoard(data.board, data.polarities, data.state.phase, data.state);
+            applyServerUpdate(data, data.state.phase, data.state);
             updateStatus(data.state);
             if (data.dice !== undefined && data.dice !== null) {
                 diceValue = data.dice;
@@ -0,0 +1,231 @@
+"""
+Persistent game store for FluxWars
+
+Keeps the live game in board.py recoverable across restarts. Every
+committed change (placements, rolls, moves, rotations, steals, turn
+changes; see board._commit) is appended to a per-game log as an
+after-image: the whole position in the compact binary encoding from
+encoding.py (~130 bytes), without the static initial neutral clusters.
+Recovery never re-runs game rules; it takes the last complete record.
+Every `snapshot_every` records, and whenever the static parts of a game
+change (reset, start position, neutral layout), a full snapshot is
+written atomically and the log is truncated.
+
+Nothing touches the disk on the request path: commits queue their
+record (or snapshot) in memory, and a background thread writes the
+queue and fsyncs the log every `fsync_interval` seconds. A crash loses
+at most that window, and persistence adds no per-move write or fsync.
+Starting a new game deletes the files of the previous ones.
+
+Layout of the data directory:
+    CURRENT            id of the game to recover
+    <game_id>.snap     u64 version, u32 game seed, u64 words drawn from
+                       each random stream (board.STREAMS), encoded
+                       position (with static part)
+    <game_id>.log      records committed after the snapshot:
+                       u32 length, u32 crc32, u64 version, u8 kind,
+                       u64 stream positions, position
+"""
+
+import logging
+import os
+import struct
+import threading
+import uuid
+import zlib
+
+import board
+from encoding import PositionView, decode_position, encode_live
+
+logger = logging.getLogger(__name__)
+
+# Commits that replace the position wholesale start a new game file
+NEW_GAME_KINDS = ("reset", "load")
+# Commits after which the static parts of game_state may have changed
+SNAPSHOT_KINDS = ("place",)
+
+KINDS = ("reset", "load", "place", "roll", "move", "rotate", "steal", "turn", "batch")
+
+# u64 draws from each of board.STREAMS, so recovered dice stay reproducible
+_POSITIONS = struct.Struct(f"<{len(board.STREAMS)}Q")
+_SNAP_HEAD = struct.Struct(f"<QI{len(board.STREAMS)}Q")  # version, game seed, stream positions
+_RECORD_HEAD = struct.Struct("<IIQB")
+_BODY_HEAD = struct.Struct("<QB")
+
+
+class GameStore:
+    def __init__(self, directory, snapshot_every=50, fsync_interval=0.05):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.fsync_interval = fsync_interval
+        self.game_id = None
+        self._log = None
+        self._records = 0
+        self._pending = []  # ("start" | "snap" | "rec", game_id, bytes) in commit order
+        self._lock = threading.Lock()     # guards _pending; held only briefly by commits
+        self._io_lock = threading.Lock()  # one writer of the files at a time
+        self._stop = threading.Event()
+        self._flusher = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    # --- Writing ---
+    #
+    # Commits run under board.game_lock, so _on_change only encodes the
+    # position and queues it. Every file write, fsync and snapshot happens
+    # in sync(), called by the flusher thread.
+
+    def attach(self):
+        """Start logging board commits. Recover (or start a game) first."""
+        if self.game_id is None:
+            with self._lock:
+                self._start_game()
+            self.sync()
+        board.add_change_listener(self._on_change)
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="fluxwars-store", daemon=True)
+            self._flusher.start()
+
+    def detach(self):
+        board.remove_change_listener(self._on_change)
+
+    def _on_change(self, version, kind, changes, effects):
+        with self._lock:
+            if kind in NEW_GAME_KINDS:
+                self._start_game()
+                return
+            if kind in SNAPSHOT_KINDS or self._records + 1 >= self.snapshot_every:
+                self._queue_snapshot()
+                return
+            position = encode_live(static=False)
+            body = _BODY_HEAD.pack(version, KINDS.index(kind)) + _POSITIONS.pack(*board.stream_positions()) + position
+            self._pending.append(("rec", self.game_id, struct.pack("<II", len(body), zlib.crc32(body)) + body))
+            self._records += 1
+
+    def _start_game(self):
+        self.game_id = uuid.uuid4().hex[:12]
+        self._queue_snapshot()
+        self._pending.append(("start", self.game_id, None))
+
+    def _queue_snapshot(self):
+        """Queue a snapshot of the live position; the log restarts after it."""
+        data = _SNAP_HEAD.pack(board.state_version, board.game_seed, *board.stream_positions()) + encode_live(static=True)
+        self._pending.append(("snap", self.game_id, data))
+        self._records = 0
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.fsync_interval):
+            try:
+                self.sync()
+            except OSError:
+                logger.exception("Store: write failed")
+
+    def sync(self):
+        """Write everything queued, then fsync the log (group commit)."""
+        with self._io_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            wrote = False
+            for op, game_id, data in pending:
+                if op == "rec":
+                    self._log.write(data)
+                    wrote = True
+                elif op == "snap":
+                    _atomic_write(self._path(f"{game_id}.snap"), data)
+                    if self._log is not None:
+                        self._log.close()
+                    self._log = open(self._path(f"{game_id}.log"), "wb")
+                    wrote = False
+                else:
+                    _atomic_write(self._path("CURRENT"), game_id.encode())
+                    self._prune(game_id)
+                    logger.info("Store: started game %s", game_id)
+            if wrote:
+                self._log.flush()
+                os.fsync(self._log.fileno())
+
+    def _prune(self, game_id):
+        """Delete the files of games before `game_id`; only CURRENT's game is ever recovered."""
+        for name in os.listdir(self.directory):
+            stem, ext = os.path.splitext(name)
+            if ext in (".snap", ".log", ".tmp") and stem.split(".")[0] != game_id:
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    pass
+
+    def close(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.detach()
+        self.sync()
+        with self._io_lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    # --- Recovery ---
+
+    def recover(self):
+        """
+        Load the CURRENT game into board.py: the latest snapshot, or the
+        last complete log record after it. Returns the recovered version,
+        or None when there is nothing to recover.
+        """
+        try:
+            with open(self._path("CURRENT"), "rb") as f:
+                game_id = f.read().decode().strip()
+            with open(self._path(f"{game_id}.snap"), "rb") as f:
+                snap = f.read()
+        except OSError:
+            return None
+        version, seed, *streams = _SNAP_HEAD.unpack_from(snap)
+        position = snap[_SNAP_HEAD.size:]
+        static_clusters = PositionView(position).initial_neutral_clusters()
+
+        replayed = 0
+        try:
+            with open(self._path(f"{game_id}.log"), "rb") as f:
+                log = f.read()
+        except FileNotFoundError:
+            log = b""
+        pos = 0
+        while pos + _RECORD_HEAD.size <= len(log):
+            length, crc = struct.unpack_from("<II", log, pos)
+            body = log[pos + 8:pos + 8 + length]
+            if len(body) < length or zlib.crc32(body) != crc:
+                break  # torn or corrupt tail
+            (record_version,) = struct.unpack_from("<Q", body)
+            if record_version > version:
+                version = record_version
+                streams = _POSITIONS.unpack_from(body, _BODY_HEAD.size)
+                position = body[_BODY_HEAD.size + _POSITIONS.size:]
+                replayed += 1
+            pos += 8 + length
+
+        decoded = decode_position(position)
+        state = decoded["state"]
+        state["initial_neutral_clusters"] = static_clusters
+        board.restore_position(decoded["board"], decoded["polarities"], decoded["magnet_ids"],
+                               decoded["next_magnet_id"], state, decoded["dice"], version)
+        board.restore_streams(seed, streams)
+        self.game_id = game_id
+        with self._lock:
+            # Fold the replayed tail into a fresh snapshot
+            self._queue_snapshot()
+        self.sync()
+        logger.info("Store: recovered game %s at version %d (%d log records)", game_id, version, replayed)
+        return version
+
+
+def _atomic_write(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
@@ -0,0 +1,20 @@
+"""Pass/fail bookkeeping shared by the test scripts"""
+
+failures = 0
+
+
+def check(ok, label):
+    global failures
+    if ok:
+        print(f"✓ {label}")
+    else:
+        print(f"✗ {label}")
+        failures += 1
+
+
+def report(summary):
+    """Print the closing PASS line with `summary`, or the number of failed checks."""
+    if failures:
+        print(f"\n❌ FAIL: {failures} problem(s) found")
+    else:
+        print(f"\n✅ PASS: {summary}")
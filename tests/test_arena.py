@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Test the headless self-play arena"""
+
+from arena import parse_tier, run_arena
+
+print("=== Testing Self-Play Arena ===\n")
+
+failures = 0
+tiers = ["easy", "normal:10"]
+
+results, summary = run_arena(tiers, games=6, workers=1, seed=3)
+print(f"Played {len(results)} games")
+for tier, row in summary.items():
+    print(f"  {tier}: W={row['wins']} L={row['losses']} D={row['draws']} "
+          f"elo={row['elo']} ms/dec={row['avg_decision_ms']:.1f} nodes/s={row['nodes_per_sec']:.0f}")
+
+if len(results) != 6:
+    print("✗ Wrong number of games played")
+    failures += 1
+
+if all(r["winner"] in (1, 2, "draw") for r in results):
+    print("✓ Every game finished with a result")
+else:
+    print("✗ Some games have no result")
+    failures += 1
+
+# Same seeds -> same games
+again, _ = run_arena(tiers, games=6, workers=1, seed=3)
+if [r["winner"] for r in again] == [r["winner"] for r in results]:
+    print("✓ Results are reproducible for a fixed seed")
+else:
+    print("✗ Results changed between identical runs")
+    failures += 1
+
+# Tier specs: only normal takes a simulation count
+rejected = []
+for spec in ("easy:5", "expert:5", "hard"):
+    try:
+        parse_tier(spec)
+    except ValueError:
+        rejected.append(spec)
+if parse_tier("normal:10") == ("normal", {"simulations": 10}) and rejected == ["easy:5", "expert:5", "hard"]:
+    print("✓ Tier specs parsed; arguments only accepted for normal")
+else:
+    print(f"✗ Tier spec parsing wrong (rejected {rejected})")
+    failures += 1
+
+if failures:
+    print(f"\n❌ FAIL: {failures} problem(s) found")
+else:
+    print("\n✅ PASS: Arena runs are valid and reproducible")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Test the engine under concurrent requests (game lock, expected_version)"""
+
+import threading
+
+import board
+import metrics
+from app import app
+from benchmarks import first_legal_move, load_position
+from checks import check, report
+
+print("=== Testing Concurrency ===\n")
+
+def run_threads(target, count):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+# A double-clicked End Turn: both requests carry the same expected_version
+load_position(3, current_player=1, dice=2)
+version = board.get_state_version()
+statuses = []
+
+
+def end_turn(_):
+    resp = app.test_client().post("/end_turn", json={"expected_version": version})
+    statuses.append(resp.status_code)
+
+
+run_threads(end_turn, 8)
+check(sorted(statuses) == [200] + [409] * 7, f"exactly one of 8 racing End Turns applied ({sorted(statuses)})")
+check(board.get_state()["current_player"] == 2 and board.get_state_version() == version + 1,
+      "turn passed once")
+resp = app.test_client().post("/end_turn", json={"expected_version": version}).get_json()
+check(resp["stale"] and resp["version"] == version + 1 and "board" in resp, "409 carries a fresh snapshot")
+version = board.get_state_version()
+statuses = [app.test_client().post(path, json=[1]).status_code for path in ("/toggle", "/end_turn", "/roll_dice")]
+check(statuses == [400] * 3 and board.get_state_version() == version, "non-object JSON bodies return 400")
+
+# Moves, turn changes and readers interleaving on threads keep the game consistent
+load_position(9, current_player=1, dice=0)
+tiles = sum(cell != 0 for row in board.board for cell in row)
+seen = []
+board.add_change_listener(lambda v, kind, changes, effects: seen.append(v))
+errors = []
+
+
+def player(_):
+    try:
+        for _ in range(30):
+            with board.game_lock:
+                if board.get_state()["phase"] == "ended":
+                    return
+                actor = board.get_state()["current_player"]
+                board.roll_dice()
+                move = first_legal_move(actor)
+                if move:
+                    cluster, dr, dc = move
+                    board.apply_turn([{"type": "move", "cluster": cluster, "dr": dr, "dc": dc}],
+                                     actor_player=actor, end_turn=True)
+                else:
+                    board.next_player()
+    except Exception as e:  # pragma: no cover - reported below
+        errors.append(e)
+
+
+def reader(_):
+    client = app.test_client()
+    try:
+        for _ in range(30):
+            data = client.get("/sync").get_json()
+            if sum(cell != 0 for row in data["board"] for cell in row) != tiles:
+                errors.append("torn board read")
+    except Exception as e:  # pragma: no cover - reported below
+        errors.append(e)
+
+
+threads = [threading.Thread(target=player, args=(i,)) for i in range(4)]
+threads += [threading.Thread(target=reader, args=(i,)) for i in range(4)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+check(not errors, f"no errors or torn reads ({errors[:3]})")
+check(seen == sorted(set(seen)) and len(seen) > 4, f"{len(seen)} commits, each version seen once and in order")
+check(sum(cell != 0 for row in board.board for cell in row) == tiles, "no tiles lost or duplicated")
+
+# Metric updates from request threads are not lost; label values are escaped
+metrics.describe("test_hits_total", "Test counter.")
+run_threads(lambda i: [metrics.inc("test_hits_total", label='a"b\\c\nd') for _ in range(20000)], 8)
+check(metrics.value("test_hits_total", label='a"b\\c\nd') == 160000, "no increments lost across threads")
+check('fluxwars_test_hits_total{label="a\\"b\\\\c\\nd"} 160000' in metrics.render_prometheus().splitlines(),
+      "label value escaped in the exposition output")
+
+report("Concurrent requests stay consistent")
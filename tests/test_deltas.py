@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Test versioned board deltas against full snapshots"""
+
+import json
+import random
+
+import ai_player
+import board
+from app import app
+from checks import check, report
+from generator import generate_start_position
+
+print("=== Testing Board Deltas ===\n")
+
+def apply_delta(grid, pols, delta):
+    for r, c, owner, pol, _ in delta["changes"]:
+        grid[r][c] = owner
+        pols[r][c] = pol
+
+
+# Client copy tracks the server through a game of AI moves
+random.seed(5)
+position = generate_start_position(5)
+board.load_start_position(position["homes"], position["neutrals"])
+version = board.get_state_version()
+client_board = [row[:] for row in board.board]
+client_pols = [row[:] for row in board.polarities]
+
+mismatches = 0
+for _ in range(12):
+    state = board.get_state()
+    if state["phase"] == "ended":
+        break
+    state["ai_player"] = state["current_player"]
+    ai_player.easy_ai_move()
+    delta = board.get_delta(version)
+    apply_delta(client_board, client_pols, delta)
+    version = delta["version"]
+    if client_board != board.board or client_pols != board.polarities:
+        mismatches += 1
+check(mismatches == 0, "deltas reproduce the server board move after move")
+
+# Up-to-date client gets an empty delta; unknown versions force a resync
+check(board.get_delta(board.get_state_version())["changes"] == [], "current version gives empty delta")
+check(board.get_delta(board.get_state_version() + 5) is None, "future version needs resync")
+for _ in range(board.HISTORY_LIMIT + 1):
+    board.reset_board()
+check(board.get_delta(0) is None, "version older than history needs resync")
+
+# Routes: delta when a version is sent, full snapshot otherwise
+client = app.test_client()
+board.load_start_position(position["homes"], position["neutrals"])
+full = client.post("/end_turn").get_json()
+check("board" in full and "delta" not in full, "no version -> full snapshot")
+resp = client.post("/roll_dice", json={"version": full["version"]}).get_json()
+check("delta" in resp and "board" not in resp, "known version -> delta")
+check(all(row_pols and set(row_pols) <= {"+", "-", ""} for row_pols in full["polarities"])
+      and all(change[3] in ("+", "-", "") for change in resp["delta"]["changes"]),
+      "polarities sent to the client as '+'/'-' strings")
+full_size = len(json.dumps({"board": full["board"], "polarities": full["polarities"]}))
+delta_size = len(json.dumps(resp["delta"]))
+print(f"  board payload {full_size} bytes -> delta {delta_size} bytes")
+check(delta_size < full_size / 5, "delta is much smaller than the snapshot")
+sync = client.get("/sync").get_json()
+check(sync["version"] == board.get_state_version() and sync["board"] == board.board, "/sync returns the current snapshot")
+
+report("Deltas match full snapshots")
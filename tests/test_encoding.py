@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Test the compact binary position encoding"""
+
+import json
+import random
+
+import ai_player
+import board
+import encoding
+from app import app
+from checks import check, report
+from generator import generate_start_position
+
+print("=== Testing Position Encoding ===\n")
+
+def live():
+    state = board.get_state()
+    return board.board, board.polarities, board.magnet_ids, board.next_magnet_id, state, board.dice_value
+
+
+# Round trip over a few played positions
+mismatches = 0
+sizes = []
+for seed in range(10):
+    random.seed(seed)
+    position = generate_start_position(seed)
+    board.load_start_position(position["homes"], position["neutrals"])
+    for _ in range(seed % 5):
+        if board.get_state()["phase"] == "ended":
+            break
+        board.get_state()["ai_player"] = board.get_state()["current_player"]
+        ai_player.easy_ai_move()
+    data = encoding.encode_live()
+    sizes.append(len(data))
+    decoded = encoding.decode_position(data)
+    grid, pols, ids, next_id, state, dice = live()
+    same = (decoded["board"] == grid and decoded["polarities"] == pols and decoded["magnet_ids"] == ids
+            and decoded["next_magnet_id"] == next_id and decoded["dice"] == dice)
+    same = same and all(decoded["state"][k] == v for k, v in state.items() if k != "initial_neutral_clusters")
+    same = same and sorted(map(sorted, decoded["state"]["initial_neutral_clusters"])) == \
+        sorted(map(sorted, state["initial_neutral_clusters"]))
+    mismatches += not same
+check(mismatches == 0, "decode(encode(position)) == position for 10 played games")
+
+json_size = len(json.dumps({"board": board.board, "polarities": board.polarity_strings(), "ids": board.magnet_ids}))
+check(max(sizes) < 200, f"encoded size {min(sizes)}-{max(sizes)} bytes (JSON grids alone: {json_size})")
+
+# Cells read straight from the buffer
+view = encoding.PositionView(encoding.encode_live())
+cells_ok = all(
+    view.owner(r, c) == board.board[r][c] and view.polarity(r, c) == board.polarities[r][c]
+    and view.magnet_id(r, c) == board.magnet_ids[r][c]
+    for r in range(board.BOARD_SIZE) for c in range(board.BOARD_SIZE)
+)
+check(cells_ok, "PositionView reads cells without decoding")
+check(view.size == len(view.buf), "view reports its encoded length")
+
+without_static = encoding.encode_live(static=False)
+check(encoding.PositionView(without_static).initial_neutral_clusters() == [], "static part optional")
+check(len(without_static) < len(view.buf), "dropping the static part saves space")
+
+try:
+    encoding.PositionView(b"\x09" + bytes(view.buf[1:]))
+    check(False, "unknown format version rejected")
+except ValueError:
+    check(True, "unknown format version rejected")
+
+# Binary transport
+resp = app.test_client().get("/sync?format=binary")
+check(resp.mimetype == "application/octet-stream", "/sync?format=binary returns bytes")
+check(int(resp.headers["X-State-Version"]) == board.get_state_version(), "binary sync carries the version")
+check(encoding.decode_position(resp.data)["board"] == board.board, "binary sync decodes to the live board")
+
+# Difficulty: unknown values are refused by the settings route and never break encoding
+client = app.test_client()
+resp = client.post("/update_settings", json={"vs_ai": True, "difficulty": "hard"})
+check(resp.status_code == 400 and board.get_state()["ai_difficulty"] != "hard", "unknown difficulty rejected")
+resp = client.post("/update_settings", json={"vs_ai": True, "difficulty": "expert"})
+check(resp.status_code == 200 and board.get_state()["ai_difficulty"] == "expert", "known difficulty accepted")
+board.get_state()["ai_difficulty"] = "hard"
+check(encoding.decode_position(encoding.encode_live())["state"]["ai_difficulty"] == "normal",
+      "unknown difficulty encodes as normal")
+check(client.get("/sync?format=binary").status_code == 200, "binary sync survives an unknown difficulty")
+board.get_state()["ai_difficulty"] = "normal"
+
+report("Positions encode compactly and losslessly")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Test the server-sent event push channel"""
+
+import json
+import queue
+
+import board
+import events
+from app import app
+from checks import check, report
+from generator import generate_start_position
+
+print("=== Testing Event Push Channel ===\n")
+
+def parse(frame):
+    fields = dict(line.split(": ", 1) for line in frame.strip().split("\n"))
+    return fields["event"], json.loads(fields["data"])
+
+
+position = generate_start_position(8)
+board.load_start_position(position["homes"], position["neutrals"])
+client = app.test_client()
+
+# The stream opens with a full snapshot
+resp = client.get("/events", buffered=False)
+first = next(resp.response)
+first = first.decode() if isinstance(first, bytes) else first
+name, data = parse(first)
+check(name == "sync" and data["version"] == board.get_state_version(), "stream starts with a sync snapshot")
+check(data["board"] == board.board, "sync carries the current board")
+resp.close()
+
+# Committed changes reach every subscriber in order
+q1, q2 = events.subscribe(), events.subscribe()
+start = board.get_state_version()
+client.post("/roll_dice")
+client.post("/end_turn")
+frames = []
+while True:
+    try:
+        frames.append(parse(q1.get_nowait()))
+    except queue.Empty:
+        break
+kinds = [d["kind"] for n, d in frames if n == "board"]
+check(kinds == ["roll", "turn"], f"roll and turn pushed in order ({kinds})")
+check([d["since"] for _, d in frames] == [start, start + 1], "events chain by version")
+check(frames[-1][1]["state"]["current_player"] == 2, "turn event carries the new player")
+check(q2.qsize() == 2, "second subscriber got the same events")
+
+# A subscriber that never reads gets its backlog replaced by a resync
+for _ in range(events.MAX_PENDING + 5):
+    board.reset_board()
+check(parse(q2.get_nowait())[0] == "resync", "slow subscriber is told to resync")
+events.unsubscribe(q1)
+events.unsubscribe(q2)
+
+
+class Refilled(queue.Queue):
+    """Full queue that another publisher refills right after it is drained, once."""
+
+    def get_nowait(self):
+        try:
+            return super().get_nowait()
+        except queue.Empty:
+            if not getattr(self, "refilled", False):
+                self.refilled = True
+                while not self.full():
+                    self.put_nowait("stale")
+            raise
+
+
+racer = Refilled(maxsize=events.MAX_PENDING)
+while not racer.full():
+    racer.put_nowait("backlog")
+events._subscribers.add(racer)
+events.publish("ai", {"status": "thinking"})
+events._subscribers.discard(racer)
+check(racer.qsize() == 1 and parse(racer.get_nowait())[0] == "resync", "resync delivered even if the queue refills meanwhile")
+check(events.subscriber_count() == 0, "subscribers removed")
+
+report("Events pushed correctly")
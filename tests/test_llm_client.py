@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Test the LLM client (pooling, retries, deadlines, response cache) with the local provider"""
+
+import asyncio
+import os
+import threading
+import time
+
+import ai_player
+import board
+import llm_client
+import metrics
+from benchmarks import load_position
+from checks import check, report
+
+print("=== Testing LLM Client ===\n")
+
+llm_client.BACKOFF_BASE = 0.01
+
+
+def use(**kwargs):
+    """Register a fresh local provider and start from an empty cache."""
+    provider = llm_client.LocalProvider(**kwargs)
+    llm_client.register_provider(provider)
+    llm_client.clear_cache()
+    return provider
+
+
+# Identical prompts are answered once
+local = use()
+first = llm_client.complete("position A", provider="local")
+check(first and first.startswith("MOVE"), "local provider answers")
+check(llm_client.complete("position A", provider="local") == first and local.calls == 1, "repeat prompt served from the cache")
+llm_client.complete("position B", provider="local")
+check(local.calls == 2, "a different prompt is a new call")
+
+# Concurrent identical prompts share one call
+local = use(delay=0.2)
+results = []
+threads = [threading.Thread(target=lambda: results.append(llm_client.complete("same", provider="local"))) for _ in range(5)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+check(local.calls == 1 and len(set(results)) == 1, "in-flight calls for one prompt are shared")
+
+# Transient failures are retried; others are not
+local = use(failures=2)
+retries = metrics.value("llm_retries_total", provider="local")
+check(llm_client.complete("flaky", provider="local") is not None and local.calls == 3, "transient failures retried")
+check(metrics.value("llm_retries_total", provider="local") == retries + 2, "retries counted")
+local = use(failures=10)
+check(llm_client.complete("down", provider="local") is None and local.calls == llm_client.MAX_RETRIES + 1,
+      "gives up after MAX_RETRIES")
+
+
+def broken(prompt):
+    raise ValueError("bad request")
+
+
+local = use(reply=broken)
+check(llm_client.complete("bad", provider="local") is None and local.calls == 1, "non-transient errors not retried")
+check(llm_client.complete("bad", provider="local") is None and local.calls == 2, "failures are not cached")
+
+# A slow provider doesn't hold the caller past the deadline; the late reply is kept
+local = use(delay=0.5)
+start = time.perf_counter()
+check(llm_client.complete("slow", provider="local", deadline=0.1) is None and time.perf_counter() - start < 0.4,
+      "deadline returns early")
+time.sleep(0.6)
+check(llm_client.complete("slow", provider="local") is not None and local.calls == 1, "late reply cached for next time")
+
+# Concurrency is capped
+active = [0, 0]  # now, peak
+lock = threading.Lock()
+
+
+def tracked(prompt):
+    with lock:
+        active[0] += 1
+        active[1] = max(active[1], active[0])
+    time.sleep(0.05)
+    with lock:
+        active[0] -= 1
+    return "MOVE (1,1) UP"
+
+
+use(reply=tracked)
+futures = [llm_client.submit(f"p{i}", provider="local") for i in range(12)]
+for f in futures:
+    f.result()
+check(0 < active[1] <= llm_client.MAX_CONCURRENCY, f"at most {llm_client.MAX_CONCURRENCY} calls in flight (peak {active[1]})")
+
+# One client per provider and key
+
+
+class Counting(llm_client.LocalProvider):
+    name = "counting"
+    built = 0
+
+    def client(self, api_key):
+        Counting.built += 1
+        return object()
+
+
+llm_client.register_provider(Counting())
+llm_client.complete("c1", provider="counting")
+llm_client.complete("c2", provider="counting")
+check(Counting.built == 1, "provider client built once and reused")
+
+# Missing key / unknown provider fail fast without a call
+saved = os.environ.pop("OPENAI_API_KEY", None)
+check(llm_client.submit("x", provider="openai") is None, "no API key: no call")
+if saved is not None:
+    os.environ["OPENAI_API_KEY"] = saved
+check(llm_client.complete("x", provider="nope") is None, "unknown provider refused")
+
+# asyncio callers
+use()
+check(asyncio.run(llm_client.acomplete("async", provider="local")).startswith("MOVE"), "acomplete works under asyncio")
+
+# An asyncio timeout doesn't cancel the call for others, even while it waits for a free slot
+local = use(delay=0.3)
+busy = [llm_client.submit(f"busy{i}", provider="local") for i in range(llm_client.MAX_CONCURRENCY)]
+check(asyncio.run(llm_client.acomplete("queued", provider="local", deadline=0.05)) is None, "acomplete times out")
+reply = llm_client.complete("queued", provider="local")
+check(reply is not None and reply.startswith("MOVE"), "queued call survives the timeout and still answers")
+
+# The expert AI plays through the client
+use()
+os.environ["LLM_PROVIDER"] = "local"
+load_position(9, current_player=2, dice=0)
+version = board.get_state_version()
+ai_player.expert_ai_move()
+check(board.get_state_version() > version and board.get_state()["current_player"] == 1, "expert AI moved with the local provider")
+
+# The /ai_move route lets go of the game lock while the LLM thinks
+from app import app
+
+client = app.test_client()
+
+
+def expert_turn():
+    load_position(9, current_player=2, dice=0)
+    state = board.get_state()
+    state.update(vs_ai=True, ai_player=2, ai_difficulty="expert")
+
+
+def ai_move_in_background():
+    responses = []
+    thread = threading.Thread(target=lambda: responses.append(client.post("/ai_move")))
+    thread.start()
+    time.sleep(0.1)
+    return thread, responses
+
+
+use(delay=0.5)
+expert_turn()
+thread, responses = ai_move_in_background()
+start = time.perf_counter()
+synced = client.get("/sync")
+waited = time.perf_counter() - start
+thread.join()
+check(synced.status_code == 200 and waited < 0.3, f"/sync answered during the LLM call ({waited * 1000:.0f} ms)")
+check(responses and responses[0].status_code == 200, "AI move applied after the call")
+
+use(delay=0.5)
+expert_turn()
+thread, responses = ai_move_in_background()
+load_position(9, current_player=2, dice=0)  # the game moves on meanwhile
+version = board.get_state_version()
+thread.join()
+check(responses and responses[0].status_code == 409 and responses[0].get_json()["stale"], "reply for a stale position refused")
+check(board.get_state_version() == version, "stale reply not applied")
+
+report("LLM calls are pooled, bounded and cached")
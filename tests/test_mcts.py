@@ -6,38 +6,45 @@ from ai_player import get_ai_move
 
 print("=== Testing MCTS AI ===\n")
 
-# Reset and setup
-reset_board()
-state = get_state()
-state["vs_ai"] = True
-state["ai_difficulty"] = "normal"
-state["ai_player"] = 2
 
-print("✓ Board reset, AI enabled (Normal difficulty)\n")
+def play(seed):
+    """Set up a game with a fixed seed and let the MCTS AI play one turn."""
+    # Reset and setup
+    reset_board(seed)
+    state = get_state()
+    state["vs_ai"] = True
+    state["ai_difficulty"] = "normal"
+    state["ai_player"] = 2
+
+    # Place pieces
+    toggle_piece(4, 3, 0)  # Player 1
+    toggle_piece(9, 10, 0)  # Player 2 (AI)
+
+    # Switch to AI player
+    state = get_state()
+    state["current_player"] = 2  # AI's turn
+    dice = roll_dice()
+
+    ai_func = get_ai_move("normal")
+    result = ai_func(simulations=50)  # Fewer simulations for testing
+    return dice, result, [row[:] for row in get_board()]
 
-# Place pieces
-print("--- Placing pieces ---")
-toggle_piece(4, 3, 0)  # Player 1
-toggle_piece(9, 10, 0)  # Player 2 (AI)
-print(f"Phase: {get_state()['phase']}")
-print(f"Current player: {get_state()['current_player']}\n")
 
-# Switch to AI player and test
+print("✓ Board reset, AI enabled (Normal difficulty)\n")
 print("--- Testing MCTS AI ---")
-state = get_state()
-state["current_player"] = 2  # AI's turn
-dice = roll_dice()
-print(f"Rolled dice: {dice}\n")
-
-# Get and execute AI move
-ai_func = get_ai_move("normal")
-print(f"AI function: {ai_func.__name__}")
-
 try:
-    result = ai_func(simulations=50)  # Fewer simulations for testing
-    print(f"\n✓ MCTS AI execution: {result}")
+    dice, result, first = play(2024)
+    print(f"Rolled dice: {dice}")
+    print(f"✓ MCTS AI execution: {result}")
     print(f"Final player: {get_state()['current_player']}")
     print(f"Final dice: {get_dice()}")
+
+    # The game's seed fixes the neutral layout, the dice and the search
+    again = play(2024)
+    if again == (dice, result, first):
+        print("✓ Same seed gives the same game")
+    else:
+        print("✗ Same seed gave a different game")
 except Exception as e:
     print(f"\n✗ MCTS AI error: {e}")
     import traceback
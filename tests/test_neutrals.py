@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Test neutral board generation (spacing, halves, counts)"""
+
+import random
+import time
+
+import board
+
+print("=== Testing Neutral Placement ===\n")
+
+failures = 0
+start = time.perf_counter()
+games = 200
+
+for seed in range(games):
+    random.seed(seed)
+    board.reset_board()
+    board.toggle_piece(4, 3, 0)   # Player 1 home
+    board.toggle_piece(9, 10, 0)  # Player 2 home -> neutrals placed
+
+    state = board.get_state()
+    if state["phase"] != "main":
+        print(f"✗ seed {seed}: setup did not reach main phase ({state['phase']})")
+        failures += 1
+        continue
+    if state["neutral_counts"] != {1: 4, 2: 4}:
+        print(f"✗ seed {seed}: unexpected neutral counts {state['neutral_counts']}")
+        failures += 1
+
+    # Tiles from different pieces must respect the minimum distance
+    tiles = [(r, c) for r in range(board.BOARD_SIZE) for c in range(board.BOARD_SIZE)
+             if board.board[r][c] == 3]
+    for i, (r1, c1) in enumerate(tiles):
+        if c1 == 7:
+            print(f"✗ seed {seed}: neutral on middle column at {(r1, c1)}")
+            failures += 1
+        for (r2, c2) in tiles[i + 1:]:
+            same_piece = board.magnet_ids[r1][c1] == board.magnet_ids[r2][c2]
+            if not same_piece and abs(r1 - r2) + abs(c1 - c2) < 4:
+                print(f"✗ seed {seed}: neutrals too close {(r1, c1)} {(r2, c2)}")
+                failures += 1
+
+    # Player 1's neutrals go on the right half, player 2's on the left
+    left = sum(1 for (_, c) in tiles if c < 7)
+    right = sum(1 for (_, c) in tiles if c > 7)
+    if left != 8 or right != 8:
+        print(f"✗ seed {seed}: unbalanced halves left={left} right={right}")
+        failures += 1
+
+elapsed = time.perf_counter() - start
+print(f"Generated {games} layouts in {elapsed:.3f}s ({elapsed / games * 1000:.2f} ms/game)")
+
+if failures:
+    print(f"\n❌ FAIL: {failures} problem(s) found")
+else:
+    print("\n✅ PASS: All layouts valid")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Test incremental cluster-ownership and player-piece indexes against a full rescan"""
+
+import ai_player
+import board
+import metrics
+from benchmarks import first_legal_move, load_position
+from checks import check, report
+
+print("=== Testing Cluster Ownership Accounting ===\n")
+
+def recount():
+    """Per-cluster player piece counts, straight from the board."""
+    counts = []
+    for cluster in board.game_state["initial_neutral_clusters"]:
+        owners = [board.board[r][c] for (r, c) in cluster]
+        counts.append([0, owners.count(1), owners.count(2)])
+    return counts
+
+
+def scan_cells(player):
+    return {(r, c) for r in range(board.BOARD_SIZE) for c in range(board.BOARD_SIZE) if board.board[r][c] == player}
+
+
+def scan_stealable(player):
+    """The original full-board steal-target scan."""
+    opponent = 2 if player == 1 else 1
+    if not scan_cells(player):
+        return []
+    home = board.game_state["homes"].get(opponent)
+    home_cells = {(home[0] + dr, home[1] + dc) for (dr, dc), _ in board.PIECES[home[2]]} if home else set()
+    return [(r, c) for (r, c) in sorted(scan_cells(opponent))
+            if (r, c) not in home_cells and board.polarities[r][c] != 0]
+
+
+def try_steal(actor):
+    """Steal the first opponent magnet that can be placed next to `actor`'s pieces."""
+    for source in board.get_stealable_neutrals_for_player(actor):
+        for r in range(board.BOARD_SIZE):
+            for c in range(board.BOARD_SIZE):
+                if board.board[r][c] == 0:
+                    ok, _, _ = board.steal_and_place_magnet(actor, tuple(source), (r, c))
+                    if ok:
+                        return True
+    return False
+
+
+# Counters follow every move, conversion, pull and steal
+mismatches = 0
+cell_mismatches = 0
+target_mismatches = 0
+steals = 0
+for seed in (2, 5, 9):
+    load_position(seed, current_player=1, dice=0)
+    for ply in range(12):
+        state = board.get_state()
+        if state["phase"] == "ended":
+            break
+        player = state["current_player"]
+        if ply % 3 == 2 and try_steal(player):
+            steals += 1
+        state["ai_player"] = player
+        ai_player.easy_ai_move()
+        mismatches += board._cluster_counts != recount()
+        cell_mismatches += any(board._player_cells[p] != scan_cells(p) for p in (1, 2))
+        target_mismatches += any(board.get_stealable_neutrals_for_player(p) != scan_stealable(p) for p in (1, 2))
+check(mismatches == 0, "counters match a full recount after every turn")
+check(cell_mismatches == 0, "player cell sets match the board after every turn")
+check(target_mismatches == 0, "indexed steal targets match a full scan")
+check(steals > 0, f"steals exercised ({steals})")
+
+# A cluster changes hands when a steal leaves only the stealer on it
+load_position(4, current_player=1, dice=0)
+index = 0
+cluster = sorted(board.game_state["initial_neutral_clusters"][index])
+for (r, c) in cluster:
+    board.board[r][c] = 2
+board.game_state["neutral_cluster_owners"][index] = 2
+board.game_state["acquired_clusters"][2] = 1
+board.rebuild_indexes()
+check(board._cluster_counts[index] == [0, 0, len(cluster)], "rebuild_indexes picks up direct board edits")
+board._write_cell(*cluster[0], 1, board.polarities[cluster[0][0]][cluster[0][1]], 0)
+board._settle_cluster_owners(mark_acquirer=True)
+check(board.game_state["neutral_cluster_owners"][index] == 2, "mixed cluster keeps its owner")
+for (r, c) in cluster[1:]:
+    board._write_cell(r, c, 1, board.polarities[r][c], 0)
+board._settle_cluster_owners(mark_acquirer=True)
+acquired = board.game_state["acquired_clusters"]
+check(board.game_state["neutral_cluster_owners"][index] == 1 and acquired[1] == 1 and acquired[2] == 0,
+      "cluster passes to the only player left on it")
+
+# Steal validation answers without enumerating targets
+home = board.game_state["homes"][2]
+ok, message, _ = board.steal_and_place_magnet(1, home[:2], (0, 0))
+check(not ok and message == "Cannot steal opponent's home piece", "home piece refused")
+ok, message, _ = board.steal_and_place_magnet(2, min(scan_cells(0)), (0, 0))
+check(not ok and message == "Requested piece not eligible for stealing", "empty source refused")
+check(board.count_pieces(1) == len(scan_cells(1)), "count_pieces reads the index")
+
+# The public query is the one locked and timed, once per call
+metrics.reset()
+for _ in range(2):
+    board.get_stealable_neutrals_for_player(1)
+samples = metrics._timers.get(metrics._key("engine_seconds", {"op": "stealable_neutrals"}), [0])[0]
+check(samples == 2, f"one stealable_neutrals sample per query ({samples})")
+
+# A rejected batch leaves the counters as they were
+load_position(11, current_player=1, dice=2)
+before = recount()
+cluster, dr, dc = first_legal_move(1)
+ok, _, _ = board.apply_turn([{"type": "move", "cluster": cluster, "dr": dr, "dc": dc},
+                             {"type": "move", "dr": 0, "dc": 99}], actor_player=1)
+check(not ok and board._cluster_counts == before == recount(), "rollback restores the counters")
+
+report("Board indexes match the board")
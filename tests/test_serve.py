@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Test the production server (game-affinity routing across worker processes)"""
+
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import serve
+from checks import check, report
+
+print("=== Testing Production Server ===\n")
+
+# Affinity: stable, spread out, and mostly unchanged when a worker is added
+games = [f"game-{i}" for i in range(2000)]
+placement = [serve.worker_for(g, 4) for g in games]
+check(placement == [serve.worker_for(g, 4) for g in games], "game ids map to the same worker every time")
+check(min(placement.count(w) for w in range(4)) > 400, "games spread over all workers")
+moved = sum(serve.worker_for(g, 5) != w for g, w in zip(games, placement))
+check(moved < len(games) * 0.3, f"adding a worker moves few games ({moved}/{len(games)})")
+
+# Ownership: a worker hosts one game until that game goes idle
+router = serve.AffinityRouter([("127.0.0.1", 1), ("127.0.0.1", 2)], idle_timeout=60)
+first, second = [g for g in games if serve.worker_for(g, 2) == 0][:2]
+check(router.claim(first, now=0) == (0, False) and router.claim(first, now=30) == (0, False), "first game claims its worker")
+check(router.claim(second, now=80) == (None, False), "another game can't share a busy worker")
+check(router.claim(second, now=91) == (0, True), "an idle game's worker is handed over")
+game, worker, _ = router.claim_new(now=95)
+check(worker == 1 and serve.worker_for(game, 2) == 1, "new game ids are placed on a free worker")
+check(router.claim_new(now=100) == (None, None, False), "no new game while every worker is busy")
+
+# Two workers behind the router
+with socket.socket() as s:
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+data_dir = tempfile.mkdtemp(prefix="fluxwars-serve-")
+proc = subprocess.Popen([sys.executable, "serve.py", "--workers", "2", "--port", str(port), "--data-dir", data_dir],
+                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                        env={**os.environ, "FLUXWARS_LOG_LEVEL": "WARNING"})
+
+
+def request(method, path, game=None, body=None, cookie=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    headers = {"Content-Type": "application/json"}
+    if game:
+        headers["X-Game-Id"] = game
+    if cookie:
+        headers["Cookie"] = cookie
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    resp = conn.getresponse()
+    data = resp.read()
+    conn.close()
+    return resp, data
+
+
+try:
+    game_a, other_a = [g for g in games if serve.worker_for(g, 2) == 0][:2]
+    game_b = next(g for g in games if serve.worker_for(g, 2) == 1)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            request("GET", "/get_dice", game=game_a)
+            break
+        except OSError:
+            time.sleep(0.1)
+
+    resp, _ = request("GET", "/")
+    cookie = resp.getheader("Set-Cookie") or ""
+    check(resp.status == 200 and cookie.startswith("fluxwars_game="), "new browser gets a game cookie")
+    game = cookie.split(";")[0].split("=", 1)[1]
+    check(resp.getheader("X-FluxWars-Worker") == "1", "new game placed on the free worker")
+    resp, _ = request("GET", "/get_dice", cookie=f"fluxwars_game={game}")
+    check(resp.getheader("X-FluxWars-Worker") == str(serve.worker_for(game, 2))
+          and resp.getheader("Set-Cookie") is None, "cookie routes to the game's worker")
+
+    check(request("GET", "/sync", game=game_b)[0].status == 409
+          and request("GET", f"/?game={other_a}")[0].status == 409, "a game id on a busy worker is refused")
+    check(request("GET", "/")[0].status == 503, "no new game while every worker is busy")
+    resp, _ = request("GET", f"/?game={game_a}")
+    check(f"fluxwars_game={game_a}" in (resp.getheader("Set-Cookie") or ""), "?game= joins another game")
+
+    before = json.loads(request("GET", "/sync", game=game)[1])["version"]
+    resp, _ = request("POST", "/reset", game=game_a, body={})
+    check(resp.getheader("X-FluxWars-Worker") == "0", "game id routed by hash")
+    check(json.loads(request("GET", "/sync", game=game)[1])["version"] == before, "workers share nothing")
+
+    # A chunked body (no Content-Length) reaches the worker intact
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request("POST", "/reset", body=iter([b'{"seed": ', b'77}']), encode_chunked=True,
+                 headers={"X-Game-Id": game_a, "Content-Type": "application/json", "Transfer-Encoding": "chunked"})
+    resp = conn.getresponse()
+    data = json.loads(resp.read())
+    conn.close()
+    check(resp.status == 200 and data["seed"] == 77, "chunked request body forwarded")
+
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request("GET", "/events", headers={"X-Game-Id": game_a})
+    resp = conn.getresponse()
+    first = resp.read1(65536).decode()
+    conn.close()
+    check(resp.getheader("Content-Type", "").startswith("text/event-stream") and "event: sync" in first,
+          "event stream passes through the router")
+    check(sorted(os.listdir(data_dir)) == ["worker-0", "worker-1"], "each worker has its own store")
+finally:
+    proc.terminate()
+    try:
+        proc.wait(timeout=20)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+    shutil.rmtree(data_dir, ignore_errors=True)
+check(proc.returncode is not None, "router and workers shut down")
+
+report("Games stick to their worker")
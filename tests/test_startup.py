@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Test application startup (deferred imports, startup time gauge)"""
+
+import os
+import subprocess
+import sys
+
+from checks import check, report
+
+print("=== Testing Startup ===\n")
+
+# Import the app in a fresh interpreter, as a cold container would
+code = f"""
+import sys; sys.path.insert(0, {os.getcwd()!r})
+import app
+print(",".join(m for m in ("ai_player", "openai", "anthropic", "store", "cProfile") if m in sys.modules))
+print(app.STARTUP_SECONDS)
+print(app.app.test_client().get("/metrics").get_data(as_text=True))
+"""
+env = {k: v for k, v in os.environ.items() if k not in ("FLUXWARS_DATA_DIR", "FLUXWARS_PROFILE")}
+out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env).stdout.splitlines()
+check(out and out[0] == "", f"AI, LLM providers, store and profiler not imported at startup ({out[0] if out else 'no output'})")
+check(len(out) > 1 and 0 < float(out[1]) < 30, "startup time measured")
+check(any(line.startswith("fluxwars_startup_seconds ") for line in out), "startup time exported on /metrics")
+
+# Provider SDKs load on first use only, and a missing one is remembered
+import llm_client
+
+check("openai" not in llm_client._sdks, "no provider loaded before the first call")
+for provider in ("openai", "anthropic"):
+    try:
+        sdk = llm_client.provider_sdk(provider)
+        check(llm_client.provider_sdk(provider) is sdk, f"{provider} SDK imported once")
+    except ImportError:
+        check(llm_client._sdks[provider] is None, f"missing {provider} SDK remembered")
+
+report("Startup defers what it can")
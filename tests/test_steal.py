@@ -20,22 +20,22 @@ board.game_state["current_player"] = 1
 # Manually place some test pieces:
 # Player 1: place a + at (5, 3) and - at (5, 4)
 board.board[5][3] = 1
-board.polarities[5][3] = "+"
+board.polarities[5][3] = board.PLUS
 board.board[5][4] = 1
-board.polarities[5][4] = "-"
+board.polarities[5][4] = board.MINUS
 
 # Player 2 (opponent): place pieces adjacent to Player 1 with opposite polarity
 # Place opponent - at (5, 2) (adjacent to Player 1's + at (5, 3))
 board.board[5][2] = 2
-board.polarities[5][2] = "-"
+board.polarities[5][2] = board.MINUS
 board.board[5][1] = 2
-board.polarities[5][1] = "+"
+board.polarities[5][1] = board.PLUS
 
 # Place opponent + at (6, 4) (adjacent to Player 1's - at (5, 4))
 board.board[6][4] = 2
-board.polarities[6][4] = "+"
+board.polarities[6][4] = board.PLUS
 board.board[6][5] = 2
-board.polarities[6][5] = "-"
+board.polarities[6][5] = board.MINUS
 
 # Create a fake initial cluster tracking (needed for steal detection)
 # Add these opponent cells to tracked clusters
@@ -44,6 +44,8 @@ cluster2 = frozenset([(6, 4), (6, 5)])
 board.game_state["initial_neutral_clusters"] = [cluster1, cluster2]
 board.game_state["total_neutral_clusters"] = 2
 board.game_state["neutral_cluster_owners"] = {0: 2, 1: 2}
+# The cells above were written directly, so re-derive the board indexes
+board.rebuild_indexes()
 
 print("=" * 60)
 print("TEST: Steal Target Detection")
@@ -56,7 +58,7 @@ for r in range(4, 8):
     row_str = f"Row {r}: "
     for c in range(0, 7):
         owner = board.board[r][c]
-        pol = board.polarities[r][c]
+        pol = board.POLARITY_SYMBOLS[board.polarities[r][c]]
         if owner == 0:
             row_str += "  .  "
         else:
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Test steal placement enumeration (get_steal_placements, /steal_placements)"""
+
+import ai_player
+import board
+from app import app
+from benchmarks import load_position, restore, snapshot
+from checks import check, report
+
+print("=== Testing Steal Placements ===\n")
+
+def trial_placements(player, source):
+    """Every (target, partner_target) steal_and_place_magnet accepts, found by trying them all."""
+    found = []
+    snap = snapshot()
+    for tr in range(board.BOARD_SIZE):
+        for tc in range(board.BOARD_SIZE):
+            for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                partner = (tr + dr, tc + dc)
+                if not (0 <= partner[0] < board.BOARD_SIZE and 0 <= partner[1] < board.BOARD_SIZE):
+                    continue
+                ok, _, _ = board.steal_and_place_magnet(player, source, (tr, tc), partner)
+                if ok:
+                    found.append(((tr, tc), partner))
+                    restore(snap)
+    return found
+
+
+# Enumeration agrees with trial steals, orientation included
+positions = 0
+mismatches = 0
+orientation_errors = 0
+example = None  # (position, player, source) with somewhere to put the stolen magnet
+for seed in (3, 8):
+    load_position(seed, current_player=1, dice=0)
+    for ply in range(6):
+        if board.get_state()["phase"] == "ended":
+            break
+        player = board.get_state()["current_player"]
+        for source in board.get_stealable_neutrals_for_player(player):
+            placements = board.get_steal_placements(player, source)
+            mismatches += [(t, p) for t, p, _ in placements] != trial_placements(player, source)
+            if placements:
+                snap = snapshot()
+                if example is None:
+                    example = (snap, player, source)
+                target, partner, orientation = placements[-1]
+                board.steal_and_place_magnet(player, source, target, partner)
+                (dr, dc), _ = board.PIECES[orientation][1]
+                plus = target if board.polarities[target[0]][target[1]] == board.PLUS else partner
+                minus = partner if plus == target else target
+                orientation_errors += (minus[0] - plus[0], minus[1] - plus[1]) != (dr, dc)
+                restore(snap)
+            positions += 1
+        board.get_state()["ai_player"] = player
+        ai_player.easy_ai_move()
+check(positions > 0 and mismatches == 0, f"placements match trial steals ({positions} sources)")
+check(orientation_errors == 0, "orientation describes the placed magnet")
+
+snap, player, source = example
+restore(snap)
+board.get_state()["current_player"] = player
+opponent = 2 if player == 1 else 1
+
+# Sources that can't be stolen have no placements
+home = board.get_state()["homes"][opponent]
+empty = next((r, c) for r in range(board.BOARD_SIZE) for c in range(board.BOARD_SIZE) if board.board[r][c] == 0)
+check(board.get_steal_placements(player, home[:2]) == [], "home piece has no placements")
+check(board.get_steal_placements(player, empty) == [], "empty cell has no placements")
+
+# A partner_target that isn't next to the target is refused
+target, partner, _ = board.get_steal_placements(player, source)[0]
+ok, message, _ = board.steal_and_place_magnet(player, source, target, (target[0] + 2, target[1]))
+check(not ok and "Partner" in message, "partner_target away from the target refused")
+
+# Route: placements for the UI, and a steal with the chosen partner cell
+client = app.test_client()
+data = client.post("/steal_placements", json={"source_row": source[0], "source_col": source[1]}).get_json()
+check(data["success"] and data["placements"][0]["target"] == list(target), "/steal_placements lists placements")
+check(client.post("/steal_placements", json={}).status_code == 400, "missing source returns 400")
+bad = [{"source_row": "x", "source_col": 1}, {"source_row": 99, "source_col": 0}, {"source_row": -1, "source_col": 0}]
+check(all(client.post("/steal_placements", json=body).status_code == 400 for body in bad),
+      "non-numeric or out-of-bounds source returns 400")
+board.get_state()["steal_allowed_player"] = player
+version = board.get_state_version()
+bad = [{"source_row": source[0], "source_col": source[1], "target_row": "x", "target_col": 0},
+       {"source_row": source[0], "source_col": source[1], "target_row": 0, "target_col": 0, "partner_row": 99}]
+check(all(client.post("/steal", json=body).status_code == 400 for body in bad)
+      and board.get_state_version() == version, "/steal rejects invalid coordinates with 400")
+target, partner, _ = board.get_steal_placements(player, source)[-1]
+board.get_state()["steal_allowed_player"] = player
+resp = client.post("/steal", json={"source_row": source[0], "source_col": source[1],
+                                   "target_row": target[0], "target_col": target[1],
+                                   "partner_row": partner[0], "partner_col": partner[1]})
+check(resp.status_code == 200 and board.board[partner[0]][partner[1]] == player, "/steal places the partner half where asked")
+check(board.last_action == ("steal", (player, source, target, partner)), "partner_target recorded for replay")
+
+report("Steal placements match the steal rules")
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Test batched turn submission (apply_turn, /submit_turn, selection handles, legal moves, previews)"""
+
+import ai_player
+import board
+from app import app
+import metrics
+from benchmarks import first_legal_move, load_position, player_cells, restore, snapshot
+from checks import check, report
+
+print("=== Testing Batched Turns ===\n")
+
+# Two moves in one batch: one version, two dice pips, cluster followed
+load_position(11, current_player=1, dice=3)
+cluster, dr, dc = first_legal_move(1)
+version = board.get_state_version()
+ok, message, new_cluster = board.apply_turn(
+    [{"type": "move", "cluster": cluster, "dr": dr, "dc": dc}, {"type": "move", "dr": -dr, "dc": -dc}],
+    actor_player=1,
+)
+check(ok, f"batch applied ({message})")
+check(board.get_state_version() == version + 1, "batch committed as a single version")
+check(board.dice_value == 1, "each action spent one dice pip")
+check(board.get_state()["current_player"] == 1, "turn kept while pips remain")
+check(sorted(map(tuple, new_cluster)) == sorted(map(tuple, board.find_cluster(*new_cluster[0]))), "new cluster returned")
+
+# A failing action rolls the whole batch back
+board.dice_value = 2
+before = snapshot()
+version = board.get_state_version()
+ok, message, _ = board.apply_turn(
+    [{"type": "move", "cluster": cluster, "dr": dr, "dc": dc}, {"type": "move", "dr": 0, "dc": 99}],
+    actor_player=1,
+)
+check(not ok and message.startswith("Move 2"), f"bad second move rejected ({message})")
+after = snapshot()
+check(after[:4] == before[:4] and after[5] == before[5], "board and dice untouched after rollback")
+check(after[4] == before[4], "game state untouched after rollback")
+check(board.get_state_version() == version, "no version committed for a rejected batch")
+
+# Too many actions for the dice
+ok, message, _ = board.apply_turn([{"type": "move", "cluster": cluster, "dr": dr, "dc": dc}] * 3, actor_player=1)
+check(not ok, "more actions than dice pips rejected")
+
+# Spending the last pip passes the turn
+board.dice_value = 1
+ok, _, _ = board.apply_turn([{"type": "move", "cluster": cluster, "dr": dr, "dc": dc}], actor_player=1)
+check(ok and board.get_state()["current_player"] == 2 and board.dice_value == 0, "last pip ends the turn")
+
+# Route: one request, one combined delta
+load_position(23, current_player=1, dice=2)
+cluster, dr, dc = first_legal_move(1)
+client = app.test_client()
+version = board.get_state_version()
+resp = client.post("/submit_turn", json={
+    "version": version,
+    "actions": [{"type": "move", "cluster": [list(x) for x in cluster], "dr": dr, "dc": dc},
+                {"type": "move", "dr": -dr, "dc": -dc}],
+})
+data = resp.get_json()
+check(resp.status_code == 200 and data["success"], f"/submit_turn accepted ({data['message']})")
+check(data["delta"]["since"] == version and data["version"] == version + 1, "route returns one combined delta")
+check(data["state"]["current_player"] == 2, "route passed the turn when dice ran out")
+resp = client.post("/submit_turn", json={"actions": [{"type": "jump", "cluster": [[0, 0]]}]})
+check(resp.status_code == 400, "invalid batch returns 400")
+version = board.get_state_version()
+malformed = [
+    {"actions": [{"type": "move", "cluster": [[99, 99]], "dr": 1, "dc": 0}]},
+    {"actions": [{"type": "move", "cluster": [[-1, 0]], "dr": 1, "dc": 0}]},
+    {"actions": [5]},
+    {"actions": {"type": "move"}},
+]
+responses = [client.post("/submit_turn", json=body) for body in malformed]
+check(all(r.status_code == 400 and "traceback" not in r.get_json() for r in responses)
+      and board.get_state_version() == version, "malformed actions return 400 without touching the game")
+
+# Selection handles: resolved once, valid only at the version they were issued for
+load_position(37, current_player=1, dice=3)
+cluster, dr, dc = first_legal_move(1)
+handle, selected = board.select_cluster(*cluster[0])
+check(handle is not None and sorted(map(tuple, selected)) == sorted(map(tuple, cluster)), "select_cluster returns a handle")
+ok, _, new_cluster = board.apply_turn([{"type": "move", "selection": handle, "dr": dr, "dc": dc}], actor_player=1)
+check(ok, "move by selection handle applied")
+ok, message, _ = board.apply_turn([{"type": "move", "selection": handle, "dr": -dr, "dc": -dc}], actor_player=1)
+check(not ok and message.endswith(board.SELECTION_EXPIRED), "handle is stale after the board changed")
+
+resp = client.post("/select_cluster", json={"row": new_cluster[0][0], "col": new_cluster[0][1]}).get_json()
+resp = client.post("/submit_turn", json={"actions": [{"type": "move", "selection": resp["selection"], "dr": -dr, "dc": -dc}]})
+data = resp.get_json()
+check(data["success"] and data["selection"], "route moves by handle and returns a fresh one")
+resp = client.post("/submit_turn", json={"actions": [{"type": "move", "selection": "0.0", "dr": dr, "dc": dc}]})
+check(resp.status_code == 400 and resp.get_json()["stale_selection"], "unknown handle reported as stale")
+
+# Legal moves: what the engine would accept, cached until the position changes
+load_position(9, current_player=1, dice=0)
+for _ in range(3):  # the fourth turn ends the game
+    board.get_state()["ai_player"] = board.get_state()["current_player"]
+    ai_player.easy_ai_move()
+mismatches = 0
+checked = 0
+for player in (1, 2):
+    board.get_state()["current_player"] = player
+    board.dice_value = 3
+    clusters = [board.find_cluster(r, c) for (r, c) in player_cells(player)]
+    clusters += [board.get_cluster(r, c) for (r, c) in player_cells(3)]
+    for cluster in clusters:
+        legal = board.legal_moves(cluster)
+        snap = snapshot()
+        for d in board.DIRECTIONS:
+            ok = board.move_cluster_cells(cluster, *d, actor_player=player)[0]
+            mismatches += ok != (d in legal["directions"])
+            restore(snap)
+        ok = board.rotate_cluster_cells(cluster, actor_player=player)[0]
+        mismatches += ok != legal["rotate"]
+        restore(snap)
+        checked += 1
+check(checked and mismatches == 0, f"legal_moves agrees with move/rotate ({checked} clusters)")
+
+load_position(9, current_player=1, dice=3)
+cluster, dr, dc = first_legal_move(1)
+board.legal_moves(cluster)
+hits = metrics.value("legal_moves_cache_total", result="hit")
+board.legal_moves(cluster)
+check(metrics.value("legal_moves_cache_total", result="hit") == hits + 1, "repeat lookup served from the cache")
+board.move_cluster_cells(cluster, dr, dc, actor_player=1)
+board.legal_moves(cluster)
+check(metrics.value("legal_moves_cache_total", result="hit") == hits + 1, "a committed move invalidates the entry")
+
+load_position(9, current_player=1, dice=3)
+cluster, dr, dc = first_legal_move(1)
+data = client.post("/select_cluster", json={"row": cluster[0][0], "col": cluster[0][1]}).get_json()
+check([dr, dc] in data["legal"]["directions"] and "rotate" in data["legal"], "/select_cluster returns legal moves")
+data = client.post("/submit_turn", json={"actions": [{"type": "move", "selection": data["selection"], "dr": dr, "dc": dc}]}).get_json()
+expected = board.legal_moves(data["new_cluster"])
+check(data["success"] and data["legal"]["directions"] == [list(d) for d in expected["directions"]]
+      and data["legal"]["rotate"] == expected["rotate"], "/submit_turn returns legal moves for the new cluster")
+
+# Move previews: what committing each legal move would change, with the board left alone
+previewed = 0
+mismatches = 0
+effects_seen = 0
+untouched = True
+for seed in (3, 9, 11):
+    load_position(seed, current_player=1, dice=0)
+    for ply in range(3):
+        player = board.get_state()["current_player"]
+        board.dice_value = 3
+        for (r, c) in player_cells(player):
+            cluster = board.find_cluster(r, c)
+            before = (board._cell_snapshot(), repr(board.get_state()), board.get_state_version())
+            preview = board.preview_moves(cluster)
+            untouched &= before == (board._cell_snapshot(), repr(board.get_state()), board.get_state_version())
+            snap = snapshot()
+            for entry in preview["moves"] + [preview["rotate"]] * bool(preview["rotate"]):
+                if "dr" in entry:
+                    board.move_cluster_cells(cluster, entry["dr"], entry["dc"], actor_player=player)
+                else:
+                    board.rotate_cluster_cells(cluster, actor_player=player)
+                effects = board._history[-1][3]
+                mismatches += (entry["converted"], entry["pulls"]) != (effects["converted"], effects["pulls"])
+                mismatches += any(board.board[r][c] == 0 for r, c in entry["cells"])
+                effects_seen += bool(effects["converted"] or effects["pulls"])
+                restore(snap)
+                previewed += 1
+        board.get_state()["ai_player"] = player
+        ai_player.easy_ai_move()
+check(previewed and mismatches == 0, f"previews match committed moves ({previewed} moves, {effects_seen} with effects)")
+check(effects_seen > 0, "some previews predict conversions or pulls")
+check(untouched, "previewing leaves board, state and version unchanged")
+
+load_position(9, current_player=1, dice=3)
+cluster, dr, dc = first_legal_move(1)
+version = board.get_state_version()
+data = client.post("/preview_moves", json={"cluster": cluster}).get_json()
+check(data["success"] and [dr, dc] in [[m["dr"], m["dc"]] for m in data["moves"]]
+      and data["version"] == version == board.get_state_version(), "/preview_moves previews without committing")
+check(client.post("/preview_moves", json={}).status_code == 400, "missing cluster returns 400")
+bad = [[[99, 99]], "x", [[-1, -1]], [[1, 2, 3]], [[1, True]], [[4, 4], [4, 4]]]
+check(all(client.post("/preview_moves", json={"cluster": c}).status_code == 400 for c in bad),
+      "malformed or out-of-bounds clusters return 400")
+handle = client.post("/select_cluster", json={"row": cluster[0][0], "col": cluster[0][1]}).get_json()["selection"]
+by_handle = client.post("/preview_moves", json={"selection": handle}).get_json()
+check(by_handle["success"] and by_handle["moves"] == data["moves"], "/preview_moves accepts a selection handle")
+resp = client.post("/preview_moves", json={"selection": "0.0"})
+check(resp.status_code == 400 and resp.get_json()["stale_selection"], "expired handle reported")
+
+report("Batched turns behave atomically")
@@ -0,0 +1,13 @@
+"""
+WSGI entry point for FluxWars
+
+    gunicorn --workers 1 --threads 8 wsgi:application
+
+The game lives in this process's memory, so a WSGI server must run a
+single worker process (threads are fine: routes hold board.game_lock).
+To use several cores, run serve.py, which gives each game its own worker
+process behind a game-affinity router. Set FLUXWARS_DATA_DIR to persist
+the game across restarts.
+"""
+
+from app import app as application